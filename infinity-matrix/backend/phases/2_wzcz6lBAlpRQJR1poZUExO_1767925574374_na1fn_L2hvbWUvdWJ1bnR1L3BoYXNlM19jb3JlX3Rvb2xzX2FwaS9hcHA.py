@@ -2,6 +2,8 @@
 from flask import Flask, request, jsonify
 from datetime import datetime
 import uuid
+import heapq
+import itertools
 import logging
 
 logging.basicConfig(level=logging.INFO, format=\'%(asctime)s - %(levelname)s - %(message)s\')
@@ -17,13 +19,16 @@ def requires_role(role):
            # In a production environment, this would integrate with an authentication system (e.g., Firebase Authentication, Google Identity Platform).
             # User roles would be extracted from a validated JWT or session token.
             # For this example, we simulate roles being passed in the 'X-User-Roles' header for demonstration purposes.
-            user_roles = request.headers.get("X-User-Roles", "").split(",")
-            if role not in user_roles and "admin" not in user_roles:
+            if not _has_role(role):
                 return jsonify({"error": "Unauthorized: Insufficient permissions"}), 403
             return f(*args, **kwargs)
         return decorated_function
     return decorator
 
+def _has_role(role):
+    user_roles = request.headers.get("X-User-Roles", "").split(",")
+    return role in user_roles or "admin" in user_roles
+
 @app.after_request
 def add_security_headers(response):
     response.headers["Strict-Transport-Security"] = "max-age=31536000; includeSubDomains"
@@ -51,6 +56,95 @@ except ValueError:
 
 db = firestore.client()
 
+# All core tool documents live in an "entities" subcollection under a per-type
+# parent document (core_tools/{entity_type}/entities/{id}) and carry an
+# "entity_type" field, so a single collection group query serves list reads
+# for every type. Requires a composite index on (entity_type, created_at).
+# Documents written before this layout still live in the legacy top-level
+# collections; reads fall back to them and updates move them across, and
+# `flask --app app migrate-legacy-entities` moves the rest in one pass.
+CORE_TOOLS_COLLECTION = "core_tools"
+ENTITIES_SUBCOLLECTION = "entities"
+ENTITY_TYPES = ("problem", "simulation", "decision", "prediction")
+LEGACY_COLLECTIONS = {
+    "problem": "problems",
+    "simulation": "simulations",
+    "decision": "decisions",
+    "prediction": "predictions",
+}
+DEFAULT_LIST_LIMIT = 100
+MAX_LIST_LIMIT = 1000
+FIRESTORE_BATCH_LIMIT = 500
+
+def _entity_collection(entity_type):
+    return db.collection(CORE_TOOLS_COLLECTION).document(entity_type).collection(ENTITIES_SUBCOLLECTION)
+
+def _legacy_collection(entity_type):
+    return db.collection(LEGACY_COLLECTIONS[entity_type])
+
+def _get_entity(entity_type, entity_id):
+    """Return the entity snapshot, falling back to the legacy collection."""
+    entity = _entity_collection(entity_type).document(entity_id).get()
+    if entity.exists:
+        return entity
+    return _legacy_collection(entity_type).document(entity_id).get()
+
+def _save_entity(entity_type, entity_id, entity):
+    """Write the entity to the new layout and drop any legacy copy."""
+    entity["entity_type"] = entity_type
+    batch = db.batch()
+    batch.set(_entity_collection(entity_type).document(entity_id), entity)
+    batch.delete(_legacy_collection(entity_type).document(entity_id))
+    batch.commit()
+
+def _list_entities(entity_type, limit):
+    query = (db.collection_group(ENTITIES_SUBCOLLECTION)
+             .where("entity_type", "==", entity_type)
+             .order_by("created_at")
+             .limit(limit))
+    legacy_query = _legacy_collection(entity_type).order_by("created_at").limit(limit)
+    # Either layout may hold the oldest documents, so take the first `limit`
+    # of each and merge them by created_at
+    entities = heapq.merge((doc.to_dict() for doc in query.stream()),
+                           (doc.to_dict() for doc in legacy_query.stream()),
+                           key=lambda entity: entity["created_at"])
+    return list(itertools.islice(entities, limit))
+
+def _list_entities_response(entity_type):
+    try:
+        limit = min(int(request.args.get("limit", DEFAULT_LIST_LIMIT)), MAX_LIST_LIMIT)
+    except ValueError:
+        return jsonify({"error": "limit must be an integer"}), 400
+
+    try:
+        return jsonify(_list_entities(entity_type, limit))
+    except Exception as e:
+        logging.error(f"Error: {e}")
+        return jsonify({"error": str(e)}), 500
+
+def migrate_legacy_entities():
+    """Move every document from the legacy per-type collections into core_tools."""
+    migrated = 0
+    for entity_type in ENTITY_TYPES:
+        legacy = _legacy_collection(entity_type)
+        while True:
+            docs = list(legacy.limit(FIRESTORE_BATCH_LIMIT // 2).stream())
+            if not docs:
+                break
+            batch = db.batch()
+            for doc in docs:
+                batch.set(_entity_collection(entity_type).document(doc.id), {**doc.to_dict(), "entity_type": entity_type})
+                batch.delete(doc.reference)
+            batch.commit()
+            migrated += len(docs)
+    logging.info(f"Migrated {migrated} legacy core tool documents")
+    return migrated
+
+@app.cli.command("migrate-legacy-entities")
+def migrate_legacy_entities_command():
+    """Move legacy core tool documents into core_tools."""
+    print(f"Migrated {migrate_legacy_entities()} legacy core tool documents")
+
 def _add_firestore_metadata(data):
     data["schema_version"] = "1.0.0"
     data["created_at"] = datetime.utcnow()
@@ -74,17 +168,27 @@ def _generate_evidence_pack(doc_type, doc):
         "data": processed_doc
     }
 
+# Entity List Endpoint
+@app.route("/entities", methods=["GET"])
+def get_entities():
+    entity_type = request.args.get("type")
+    if entity_type not in ENTITY_TYPES:
+        return jsonify({"error": f"Invalid type. Must be one of {list(ENTITY_TYPES)}"}), 400
+    if not _has_role(f"{entity_type}_viewer"):
+        return jsonify({"error": "Unauthorized: Insufficient permissions"}), 403
+    return _list_entities_response(entity_type)
+
 # Problem Solver Endpoints
 @app.route("/problems", methods=["POST"])
 @requires_role("problem_creator")
 def create_problem():
     data = request.json
     problem_id = str(uuid.uuid4())
-    problem = {"problem_id": problem_id, **data}
+    problem = {"problem_id": problem_id, **data, "entity_type": "problem"}
     problem = _add_firestore_metadata(problem)
     
     try:
-        db.collection("problems").document(problem_id).set(problem)
+        _entity_collection("problem").document(problem_id).set(problem)
         return jsonify(problem), 201
     except Exception as e:
         logging.error(f"Error: {e}")
@@ -93,19 +197,13 @@ def create_problem():
 @app.route("/problems", methods=["GET"])
 @requires_role("problem_viewer")
 def get_problems():
-    try:
-        problems = [doc.to_dict() for doc in db.collection("problems").stream()]
-        return jsonify(problems)
-    except Exception as e:
-        logging.error(f"Error: {e}")
-        return jsonify({"error": str(e)}), 500
+    return _list_entities_response("problem")
 
 @app.route("/problems/<problem_id>", methods=["GET"])
 @requires_role("problem_viewer")
 def get_problem(problem_id):
     try:
-        problem_ref = db.collection("problems").document(problem_id)
-        problem = problem_ref.get()
+        problem = _get_entity("problem", problem_id)
         if not problem.exists:
             return jsonify({"error": "Problem not found"}), 404
         return jsonify(problem.to_dict())
@@ -117,8 +215,7 @@ def get_problem(problem_id):
 @requires_role("problem_viewer")
 def get_problem_evidence_pack(problem_id):
     try:
-        problem_ref = db.collection("problems").document(problem_id)
-        problem = problem_ref.get()
+        problem = _get_entity("problem", problem_id)
         if not problem.exists:
             return jsonify({"error": "Problem not found"}), 404
         return jsonify(_generate_evidence_pack("problem", problem.to_dict()))
@@ -130,8 +227,7 @@ def get_problem_evidence_pack(problem_id):
 @requires_role("problem_editor")
 def update_problem(problem_id):
     data = request.json
-    problem_ref = db.collection("problems").document(problem_id)
-    problem = problem_ref.get()
+    problem = _get_entity("problem", problem_id)
     if not problem.exists:
         return jsonify({"error": "Problem not found"}), 404
     
@@ -140,7 +236,7 @@ def update_problem(problem_id):
     updated_problem = _update_firestore_metadata(updated_problem)
     
     try:
-        problem_ref.set(updated_problem)
+        _save_entity("problem", problem_id, updated_problem)
         return jsonify(updated_problem)
     except Exception as e:
         logging.error(f"Error: {e}")
@@ -152,11 +248,11 @@ def update_problem(problem_id):
 def create_simulation():
     data = request.json
     simulation_id = str(uuid.uuid4())
-    simulation = {"simulation_id": simulation_id, **data}
+    simulation = {"simulation_id": simulation_id, **data, "entity_type": "simulation"}
     simulation = _add_firestore_metadata(simulation)
     
     try:
-        db.collection("simulations").document(simulation_id).set(simulation)
+        _entity_collection("simulation").document(simulation_id).set(simulation)
         return jsonify(simulation), 201
     except Exception as e:
         logging.error(f"Error: {e}")
@@ -165,19 +261,13 @@ def create_simulation():
 @app.route("/simulations", methods=["GET"])
 @requires_role("simulation_viewer")
 def get_simulations():
-    try:
-        simulations = [doc.to_dict() for doc in db.collection("simulations").stream()]
-        return jsonify(simulations)
-    except Exception as e:
-        logging.error(f"Error: {e}")
-        return jsonify({"error": str(e)}), 500
+    return _list_entities_response("simulation")
 
 @app.route("/simulations/<simulation_id>", methods=["GET"])
 @requires_role("simulation_viewer")
 def get_simulation(simulation_id):
     try:
-        simulation_ref = db.collection("simulations").document(simulation_id)
-        simulation = simulation_ref.get()
+        simulation = _get_entity("simulation", simulation_id)
         if not simulation.exists:
             return jsonify({"error": "Simulation not found"}), 404
         return jsonify(simulation.to_dict())
@@ -189,8 +279,7 @@ def get_simulation(simulation_id):
 @requires_role("simulation_viewer")
 def get_simulation_evidence_pack(simulation_id):
     try:
-        simulation_ref = db.collection("simulations").document(simulation_id)
-        simulation = simulation_ref.get()
+        simulation = _get_entity("simulation", simulation_id)
         if not simulation.exists:
             return jsonify({"error": "Simulation not found"}), 404
         return jsonify(_generate_evidence_pack("simulation", simulation.to_dict()))
@@ -202,8 +291,7 @@ def get_simulation_evidence_pack(simulation_id):
 @requires_role("simulation_editor")
 def update_simulation(simulation_id):
     data = request.json
-    simulation_ref = db.collection("simulations").document(simulation_id)
-    simulation = simulation_ref.get()
+    simulation = _get_entity("simulation", simulation_id)
     if not simulation.exists:
         return jsonify({"error": "Simulation not found"}), 404
     
@@ -212,7 +300,7 @@ def update_simulation(simulation_id):
     updated_simulation = _update_firestore_metadata(updated_simulation)
     
     try:
-        simulation_ref.set(updated_simulation)
+        _save_entity("simulation", simulation_id, updated_simulation)
         return jsonify(updated_simulation)
     except Exception as e:
         logging.error(f"Error: {e}")
@@ -224,11 +312,11 @@ def update_simulation(simulation_id):
 def create_decision():
     data = request.json
     decision_id = str(uuid.uuid4())
-    decision = {"decision_id": decision_id, **data}
+    decision = {"decision_id": decision_id, **data, "entity_type": "decision"}
     decision = _add_firestore_metadata(decision)
     
     try:
-        db.collection("decisions").document(decision_id).set(decision)
+        _entity_collection("decision").document(decision_id).set(decision)
         return jsonify(decision), 201
     except Exception as e:
         logging.error(f"Error: {e}")
@@ -237,19 +325,13 @@ def create_decision():
 @app.route("/decisions", methods=["GET"])
 @requires_role("decision_viewer")
 def get_decisions():
-    try:
-        decisions = [doc.to_dict() for doc in db.collection("decisions").stream()]
-        return jsonify(decisions)
-    except Exception as e:
-        logging.error(f"Error: {e}")
-        return jsonify({"error": str(e)}), 500
+    return _list_entities_response("decision")
 
 @app.route("/decisions/<decision_id>", methods=["GET"])
 @requires_role("decision_viewer")
 def get_decision(decision_id):
     try:
-        decision_ref = db.collection("decisions").document(decision_id)
-        decision = decision_ref.get()
+        decision = _get_entity("decision", decision_id)
         if not decision.exists:
             return jsonify({"error": "Decision not found"}), 404
         return jsonify(decision.to_dict())
@@ -261,8 +343,7 @@ def get_decision(decision_id):
 @requires_role("decision_viewer")
 def get_decision_evidence_pack(decision_id):
     try:
-        decision_ref = db.collection("decisions").document(decision_id)
-        decision = decision_ref.get()
+        decision = _get_entity("decision", decision_id)
         if not decision.exists:
             return jsonify({"error": "Decision not found"}), 404
         return jsonify(_generate_evidence_pack("decision", decision.to_dict()))
@@ -274,8 +355,7 @@ def get_decision_evidence_pack(decision_id):
 @requires_role("decision_editor")
 def update_decision(decision_id):
     data = request.json
-    decision_ref = db.collection("decisions").document(decision_id)
-    decision = decision_ref.get()
+    decision = _get_entity("decision", decision_id)
     if not decision.exists:
         return jsonify({"error": "Decision not found"}), 404
     
@@ -284,7 +364,7 @@ def update_decision(decision_id):
     updated_decision = _update_firestore_metadata(updated_decision)
     
     try:
-        decision_ref.set(updated_decision)
+        _save_entity("decision", decision_id, updated_decision)
         return jsonify(updated_decision)
     except Exception as e:
         logging.error(f"Error: {e}")
@@ -296,11 +376,11 @@ def update_decision(decision_id):
 def create_prediction():
     data = request.json
     prediction_id = str(uuid.uuid4())
-    prediction = {"prediction_id": prediction_id, **data}
+    prediction = {"prediction_id": prediction_id, **data, "entity_type": "prediction"}
     prediction = _add_firestore_metadata(prediction)
     
     try:
-        db.collection("predictions").document(prediction_id).set(prediction)
+        _entity_collection("prediction").document(prediction_id).set(prediction)
         return jsonify(prediction), 201
     except Exception as e:
         logging.error(f"Error: {e}")
@@ -309,19 +389,13 @@ def create_prediction():
 @app.route("/predictions", methods=["GET"])
 @requires_role("prediction_viewer")
 def get_predictions():
-    try:
-        predictions = [doc.to_dict() for doc in db.collection("predictions").stream()]
-        return jsonify(predictions)
-    except Exception as e:
-        logging.error(f"Error: {e}")
-        return jsonify({"error": str(e)}), 500
+    return _list_entities_response("prediction")
 
 @app.route("/predictions/<prediction_id>", methods=["GET"])
 @requires_role("prediction_viewer")
 def get_prediction(prediction_id):
     try:
-        prediction_ref = db.collection("predictions").document(prediction_id)
-        prediction = prediction_ref.get()
+        prediction = _get_entity("prediction", prediction_id)
         if not prediction.exists:
             return jsonify({"error": "Prediction not found"}), 404
         return jsonify(prediction.to_dict())
@@ -333,8 +407,7 @@ def get_prediction(prediction_id):
 @requires_role("prediction_viewer")
 def get_prediction_evidence_pack(prediction_id):
     try:
-        prediction_ref = db.collection("predictions").document(prediction_id)
-        prediction = prediction_ref.get()
+        prediction = _get_entity("prediction", prediction_id)
         if not prediction.exists:
             return jsonify({"error": "Prediction not found"}), 404
         return jsonify(_generate_evidence_pack("prediction", prediction.to_dict()))
@@ -346,8 +419,7 @@ def get_prediction_evidence_pack(prediction_id):
 @requires_role("prediction_editor")
 def update_prediction(prediction_id):
     data = request.json
-    prediction_ref = db.collection("predictions").document(prediction_id)
-    prediction = prediction_ref.get()
+    prediction = _get_entity("prediction", prediction_id)
     if not prediction.exists:
         return jsonify({"error": "Prediction not found"}), 404
     
@@ -356,7 +428,7 @@ def update_prediction(prediction_id):
     updated_prediction = _update_firestore_metadata(updated_prediction)
     
     try:
-        prediction_ref.set(updated_prediction)
+        _save_entity("prediction", prediction_id, updated_prediction)
         return jsonify(updated_prediction)
     except Exception as e:
         logging.error(f"Error: {e}")
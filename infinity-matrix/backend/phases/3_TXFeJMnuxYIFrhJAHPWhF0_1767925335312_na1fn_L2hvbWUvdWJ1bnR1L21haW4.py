@@ -1,20 +1,64 @@
 
+import asyncio
+import contextlib
 import datetime
-import json
+import gzip
+import hashlib
+import itertools
 import logging
+import math
 import os
+import threading
+import time
 import uuid
-from functools import wraps
+from functools import cache, lru_cache
 
 import jwt
-from flask import Flask, jsonify, request
-from google.cloud import firestore
-
-# Initialize Flask App
-app = Flask(__name__)
-
-# Initialize Firestore DB
-db = firestore.Client()
+import orjson
+from cachetools import TTLCache
+from google.api_core.exceptions import NotFound
+from google.cloud import firestore, pubsub_v1, storage
+from quart import Quart, request
+
+# Initialize Quart App (Flask-compatible API served over ASGI)
+app = Quart(__name__)
+
+# Async Firestore clients are pooled per process and created lazily on first
+# use, so that each worker opens its own gRPC channels on its own event loop.
+# Handlers round-robin over the pool to spread RPCs across several HTTP/2
+# connections.
+FIRESTORE_POOL_SIZE = int(os.environ.get('FS_POOL', '4'))
+_db_clients = None
+_db_clients_lock = threading.Lock()
+
+def get_db():
+    global _db_clients
+    if _db_clients is None:
+        with _db_clients_lock:
+            if _db_clients is None:
+                _db_clients = itertools.cycle([firestore.AsyncClient() for _ in range(FIRESTORE_POOL_SIZE)])
+    return next(_db_clients)
+
+# CollectionReferences are cached per pooled client instead of being rebuilt
+# (and their paths re-validated) on every request
+@cache
+def get_collection(db, collection_name):
+    return db.collection(collection_name)
+
+_storage_client = None
+_publisher = None
+
+def get_storage_client():
+    global _storage_client
+    if _storage_client is None:
+        _storage_client = storage.Client()
+    return _storage_client
+
+def get_publisher():
+    global _publisher
+    if _publisher is None:
+        _publisher = pubsub_v1.PublisherClient()
+    return _publisher
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format=
@@ -26,57 +70,255 @@ TRADE_HISTORY_SUBCOLLECTION = 'x1_trade_history'
 LEADERBOARD_COLLECTION = 'x1_leaderboard'
 DAILY_PICKS_COLLECTION = 'x1_daily_picks'
 
+# Fields returned by /leaderboard
+LEADERBOARD_DISPLAY_FIELDS = ['user_id', 'portfolio_id', 'accuracy_score', 'profit_score', 'combined_score', 'last_updated']
+
+# New portfolio ids are '{user_id}__{uuid hex}', so ownership can be decided
+# from the id alone. Ids without the separator predate this scheme and still
+# need an ownership read.
+PORTFOLIO_ID_SEPARATOR = '__'
+
+# Pub/Sub topic for executed trades. Leaderboard scores are maintained by a
+# separate subscriber, keeping score computation off the trade path.
+TRADE_EVENTS_TOPIC = os.environ.get('TRADE_EVENTS_TOPIC', 'x1-trade-events')
+GCP_PROJECT = os.environ.get('GOOGLE_CLOUD_PROJECT')
+
+# Cloud Storage bucket for evidence packs. When unset, packs are written to the
+# local evidence_packs directory (local development only).
+EVIDENCE_BUCKET = os.environ.get('EVIDENCE_BUCKET')
+EVIDENCE_URL_EXPIRATION = datetime.timedelta(hours=1)
+# Serialized pack bytes buffered before each write is handed to a worker thread
+EVIDENCE_WRITE_BUFFER_BYTES = 1024 * 1024
+# Documents each evidence pack query may read ahead of the writer
+EVIDENCE_PREFETCH_DOCS = 500
+
+# Cursor pagination for list endpoints
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 500
+
 # Secret key for JWT (should be loaded from environment variables in production)
 app.config['SECRET_KEY'] = os.environ.get('JWT_SECRET_KEY', 'super-secret-key')
 
-# --- RBAC and Security Hardening ---
+# JWT verification key, prepared once so PyJWT does not normalize it per call.
+# Setting JWKS_URL verifies asymmetric tokens against the key named by their
+# 'kid' header; setting JWT_PUBLIC_KEY (PEM) verifies Ed25519 (EdDSA) tokens.
+JWKS_URL = os.environ.get('JWKS_URL')
+JWKS_CACHE_SECONDS = 3600
+# Minimum spacing between JWKS fetches, so tokens with unknown kids cannot
+# trigger a fetch per request
+JWKS_MIN_REFETCH_SECONDS = 60
+
+if JWKS_URL:
+    _JWT_KEY = None
+    _JWT_ALGORITHMS = ['RS256', 'ES256', 'EdDSA']
+elif os.environ.get('JWT_PUBLIC_KEY'):
+    from cryptography.hazmat.primitives import serialization
+
+    _JWT_KEY = serialization.load_pem_public_key(os.environ['JWT_PUBLIC_KEY'].encode())
+    _JWT_ALGORITHMS = ['EdDSA']
+else:
+    _JWT_KEY = app.config['SECRET_KEY'].encode()
+    _JWT_ALGORITHMS = ['HS256']
+
+# Claims every token must carry. When JWT_AUDIENCE is unset, tokens scoped to
+# an audience are rejected.
+JWT_AUDIENCE = os.environ.get('JWT_AUDIENCE')
+JWT_REQUIRED_CLAIMS = ['exp']
+JWT_NUMERIC_CLAIMS = ('exp', 'iat', 'nbf')
+
+@lru_cache(maxsize=1)
+def _get_jwks_client():
+    # Keys are cached in _jwks_keys, not by the client
+    return jwt.PyJWKClient(JWKS_URL, cache_keys=False, cache_jwk_set=False)
+
+# Keys from the last JWKS fetch by kid, and kids that were missing from it.
+# Missing kids are rejected without taking the fetch lock until they expire.
+_jwks_keys = {}
+_JWKS_MISSING_KIDS = TTLCache(maxsize=1024, ttl=JWKS_MIN_REFETCH_SECONDS)
+_jwks_fetched_at = -math.inf
+_jwks_lock = asyncio.Lock()
+
+def _fetch_jwks_keys():
+    return {jwk.key_id: jwk.key for jwk in _get_jwks_client().get_jwk_set().keys if jwk.key_id}
+
+async def _load_jwks_key(kid):
+    """Returns the key for kid, refreshing the JWKS off the event loop when needed.
+
+    The set is refetched once JWKS_CACHE_SECONDS old (picking up rotations), or
+    for an unknown kid at most once per JWKS_MIN_REFETCH_SECONDS.
+    """
+    global _jwks_keys, _jwks_fetched_at
+    age = time.monotonic() - _jwks_fetched_at
+    if kid in _jwks_keys and age < JWKS_CACHE_SECONDS:
+        return _jwks_keys[kid]
+    if kid in _JWKS_MISSING_KIDS:
+        return None
+    async with _jwks_lock:
+        # Another request may have refreshed the set while this one waited
+        age = time.monotonic() - _jwks_fetched_at
+        if age >= JWKS_MIN_REFETCH_SECONDS and (kid not in _jwks_keys or age >= JWKS_CACHE_SECONDS):
+            try:
+                _jwks_keys = await asyncio.to_thread(_fetch_jwks_keys)
+            finally:
+                # A failed fetch keeps the previous keys and is rate limited too
+                _jwks_fetched_at = time.monotonic()
+        key = _jwks_keys.get(kid)
+        if key is None:
+            _JWKS_MISSING_KIDS[kid] = True
+        return key
+
+async def get_verification_key(token):
+    if not JWKS_URL:
+        return _JWT_KEY
+    kid = jwt.get_unverified_header(token).get('kid')
+    key = await _load_jwks_key(kid)
+    if key is None:
+        raise jwt.InvalidTokenError(f'Unable to find a signing key that matches: {kid}')
+    return key
+
+async def decode_token_claims(token):
+    """Verifies a token's signature and registered claims and returns its claims.
+
+    exp is required, and the time claims must be numeric so that
+    cached claims can be compared against the clock. Every failure raises a
+    jwt.InvalidTokenError subclass.
+    """
+    claims = jwt.decode(token, await get_verification_key(token), algorithms=_JWT_ALGORITHMS,
+                        audience=JWT_AUDIENCE, options={'require': JWT_REQUIRED_CLAIMS})
+    for claim in JWT_NUMERIC_CLAIMS:
+        value = claims.get(claim, 0)
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            raise jwt.InvalidTokenError(f'The {claim} claim must be a number')
+    # Roles are converted once here (and cached as such) so role checks are a
+    # single set operation
+    if isinstance(claims.get('roles'), list):
+        claims['roles'] = frozenset(claims['roles'])
+    return claims
+
+# Decoded JWT claims keyed by the SHA-256 of the raw token. Only successfully
+# verified, unexpired tokens are cached; failures always go through jwt.decode.
+_JWT_CACHE = TTLCache(maxsize=10000, ttl=30)
+_JWT_CACHE_LOCK = threading.Lock()
 
-def token_required(f):
-    @wraps(f)
-    def decorated(*args, **kwargs):
-        token = None
-        if 'Authorization' in request.headers:
-            token = request.headers['Authorization'].split(' ')[1]
-
-        if not token:
-            logging.warning('Authentication attempt without token.')
-            return jsonify({'code': 'UNAUTHORIZED', 'message': 'Authentication Token is missing!'}), 401
+# --- RBAC and Security Hardening ---
 
+# Roles accepted per endpoint. Every listed endpoint requires a valid token and
+# at least one of its roles; endpoints that are not listed are public.
+_ENDPOINT_ROLES = {
+    'create_portfolio': frozenset({'portfolio_manager'}),
+    'get_portfolio': frozenset({'portfolio_viewer', 'portfolio_manager'}),
+    'update_portfolio': frozenset({'portfolio_manager'}),
+    'delete_portfolio': frozenset({'portfolio_manager'}),
+    'place_trade': frozenset({'portfolio_manager'}),
+    'get_trade_history': frozenset({'portfolio_viewer', 'portfolio_manager'}),
+    'get_leaderboard': frozenset({'leaderboard_viewer'}),
+    'get_daily_picks': frozenset({'daily_picks_viewer'}),
+    'generate_evidence_pack': frozenset({'admin', 'auditor'}),
+}
+
+@app.before_request
+async def authenticate_request():
+    """Authenticates the bearer token and checks endpoint roles in one pass.
+
+    Replaces the per-view token/role decorator stack, so each request decodes
+    its token at most once. Returning a response aborts the request.
+    """
+    roles = _ENDPOINT_ROLES.get(request.endpoint)
+    if roles is None:
+        return None
+
+    # A malformed header ('Bearer' alone, no scheme) yields no token and a 401
+    token = request.headers.get('Authorization', '').partition(' ')[2]
+
+    if not token:
+        logging.warning('Authentication attempt without token.')
+        return json_response({'code': 'UNAUTHORIZED', 'message': 'Authentication Token is missing!'}, 401)
+
+    cache_key = hashlib.sha256(token.encode()).digest()
+    with _JWT_CACHE_LOCK:
+        data = _JWT_CACHE.get(cache_key)
+    # The cache TTL can outlive a token that is about to expire
+    if data is not None and data.get('exp', math.inf) <= time.time():
+        data = None
+
+    if data is None:
         try:
-            data = jwt.decode(token, app.config['SECRET_KEY'], algorithms=['HS256'])
-            request.user = data # Attach user info to request object
+            data = await decode_token_claims(token)
         except jwt.ExpiredSignatureError:
             logging.warning('Authentication attempt with expired token.')
-            return jsonify({'code': 'UNAUTHORIZED', 'message': 'Token has expired!'}), 401
+            return json_response({'code': 'UNAUTHORIZED', 'message': 'Token has expired!'}, 401)
         except jwt.InvalidTokenError:
             logging.warning('Authentication attempt with invalid token.')
-            return jsonify({'code': 'UNAUTHORIZED', 'message': 'Token is invalid!'}), 401
+            return json_response({'code': 'UNAUTHORIZED', 'message': 'Token is invalid!'}, 401)
         except Exception as e:
             logging.error(f'JWT decoding error: {e}')
-            return jsonify({'code': 'UNAUTHORIZED', 'message': 'Token processing error!'}), 401
-
-        return f(*args, **kwargs)
-    return decorated
-
-def roles_required(roles):
-    def decorator(f):
-        @wraps(f)
-        def decorated_function(*args, **kwargs):
-            if not hasattr(request, 'user') or 'roles' not in request.user:
-                logging.warning(f'Authorization failed: User roles not found for endpoint {request.path}')
-                return jsonify({'code': 'FORBIDDEN', 'message': 'User roles not found.'}), 403
-
-            user_roles = request.user['roles']
-            if not any(role in user_roles for role in roles):
-                logging.warning(f'Authorization failed: User {request.user.get("user_id", "unknown")} lacks required roles {roles} for endpoint {request.path}')
-                return jsonify({'code': 'FORBIDDEN', 'message': 'Insufficient permissions.'}), 403
-            return f(*args, **kwargs)
-        return decorated_function
-    return decorator
+            return json_response({'code': 'UNAUTHORIZED', 'message': 'Token processing error!'}, 401)
+
+        if data.get('exp', math.inf) > time.time():
+            with _JWT_CACHE_LOCK:
+                _JWT_CACHE[cache_key] = data
+
+    request.user = data # Attach user info to request object
+
+    if 'roles' not in data:
+        logging.warning(f'Authorization failed: User roles not found for endpoint {request.path}')
+        return json_response({'code': 'FORBIDDEN', 'message': 'User roles not found.'}, 403)
+
+    if roles.isdisjoint(data['roles']):
+        logging.warning(f'Authorization failed: User {data.get("user_id", "unknown")} lacks required roles {sorted(roles)} for endpoint {request.path}')
+        return json_response({'code': 'FORBIDDEN', 'message': 'Insufficient permissions.'}, 403)
+    return None
+
+def _utc_iso():
+    return datetime.datetime.now(datetime.UTC).isoformat().replace('+00:00', 'Z')
+
+# Serializes Firestore Timestamps (returned as datetime subclasses, which orjson
+# does not encode natively) for JSON output
+def _json_default(value):
+    if isinstance(value, datetime.datetime):
+        return value.isoformat()
+    raise TypeError(f'Object of type {type(value).__name__} is not JSON serializable')
+
+def json_dumps(obj):
+    return orjson.dumps(obj, default=_json_default, option=orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS)
+
+# orjson-encoded replacement for jsonify
+def json_response(obj, status=200):
+    return app.response_class(json_dumps(obj), status=status, mimetype='application/json')
+
+# Helper function to read one page of a query using ?limit=&cursor= request args.
+# The cursor is the id of the last document of the previous page.
+async def get_page(collection_ref, query):
+    limit = min(max(request.args.get('limit', DEFAULT_PAGE_SIZE, type=int), 1), MAX_PAGE_SIZE)
+    cursor = request.args.get('cursor')
+
+    query = query.limit(limit)
+    if cursor:
+        cursor_snapshot = await collection_ref.document(cursor).get()
+        if not cursor_snapshot.exists:
+            raise ValueError(f'Invalid cursor: {cursor}')
+        query = query.start_after(cursor_snapshot)
+
+    items = [{'id': doc.id, **doc.to_dict()} async for doc in query.stream()]
+    return {'items': items, 'next_cursor': items[-1]['id'] if len(items) == limit else None}
+
+# Helper function to get the owner encoded in a portfolio id (None for legacy ids)
+def portfolio_owner_from_id(portfolio_id):
+    owner, separator, _ = portfolio_id.rpartition(PORTFOLIO_ID_SEPARATOR)
+    return owner if separator else None
+
+# Helpers for timestamps stored as ISO 8601 strings ('...Z') before they were
+# stored as Firestore Timestamps
+def _iso_z(value):
+    return value.replace(tzinfo=None).isoformat() + 'Z'
+
+def _parse_iso(value):
+    parsed = datetime.datetime.fromisoformat(value)
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=datetime.UTC)
 
 # Helper function to add common Firestore fields
 def add_common_firestore_fields(data, schema_version=1, provenance='system'):
-    now = datetime.datetime.utcnow().isoformat() + 'Z'
+    now = datetime.datetime.now(datetime.UTC)
     data['schema_version'] = schema_version
     data['created_at'] = now
     data['updated_at'] = now
@@ -85,27 +327,26 @@ def add_common_firestore_fields(data, schema_version=1, provenance='system'):
 
 # Helper function to update common Firestore fields
 def update_common_firestore_fields(data):
-    now = datetime.datetime.utcnow().isoformat() + 'Z'
+    now = datetime.datetime.now(datetime.UTC)
     data['updated_at'] = now
     return data
 
 # --- Portfolio Management Endpoints ---
 
 @app.route('/portfolios', methods=['POST'])
-@token_required
-@roles_required(['portfolio_manager'])
-def create_portfolio():
+async def create_portfolio():
+    db = get_db()
     try:
-        data = request.get_json()
+        data = await request.get_json()
         user_id = request.user.get('user_id') # Get user_id from authenticated token
         portfolio_name = data.get('portfolio_name')
         cash_balance = data.get('cash_balance', 0.0)
 
         if not user_id or not portfolio_name:
             logging.error(f'BAD_REQUEST: Missing user_id or portfolio_name in create_portfolio for user {user_id}')
-            return jsonify({'code': 'BAD_REQUEST', 'message': 'User ID and portfolio name are required'}), 400
+            return json_response({'code': 'BAD_REQUEST', 'message': 'User ID and portfolio name are required'}, 400)
 
-        portfolio_id = str(uuid.uuid4())
+        portfolio_id = f'{user_id}{PORTFOLIO_ID_SEPARATOR}{uuid.uuid4().hex}'
         portfolio_data = {
             'user_id': user_id,
             'portfolio_name': portfolio_name,
@@ -116,52 +357,51 @@ def create_portfolio():
         }
         portfolio_data = add_common_firestore_fields(portfolio_data, provenance='user_input')
 
-        db.collection(PORTFOLIOS_COLLECTION).document(portfolio_id).set(portfolio_data)
+        await get_collection(db, PORTFOLIOS_COLLECTION).document(portfolio_id).set(portfolio_data)
         logging.info(f'Portfolio {portfolio_id} created for user {user_id}')
-        return jsonify({'id': portfolio_id, **portfolio_data}), 201
+        return json_response({'id': portfolio_id, **portfolio_data}, 201)
     except Exception as e:
         logging.error(f'Error creating portfolio for user {request.user.get("user_id", "unknown")}: {e}')
-        return jsonify({'code': 'INTERNAL_SERVER_ERROR', 'message': str(e)}), 500
+        return json_response({'code': 'INTERNAL_SERVER_ERROR', 'message': str(e)}, 500)
 
 @app.route('/portfolios/<string:portfolio_id>', methods=['GET'])
-@token_required
-@roles_required(['portfolio_viewer', 'portfolio_manager'])
-def get_portfolio(portfolio_id):
+async def get_portfolio(portfolio_id):
+    db = get_db()
     try:
-        portfolio_ref = db.collection(PORTFOLIOS_COLLECTION).document(portfolio_id)
-        portfolio = portfolio_ref.get()
+        owner_id = portfolio_owner_from_id(portfolio_id)
+        if owner_id is not None and owner_id != request.user.get('user_id') and 'portfolio_manager' not in request.user.get('roles', []):
+            logging.warning(f'FORBIDDEN: User {request.user.get("user_id", "unknown")} attempted to access unauthorized portfolio {portfolio_id}')
+            return json_response({'code': 'FORBIDDEN', 'message': 'Access to this portfolio is forbidden.'}, 403)
+
+        portfolio_ref = get_collection(db, PORTFOLIOS_COLLECTION).document(portfolio_id)
+        portfolio = await portfolio_ref.get()
 
         if not portfolio.exists:
             logging.warning(f'NOT_FOUND: Portfolio {portfolio_id} not found for user {request.user.get("user_id", "unknown")}')
-            return jsonify({'code': 'NOT_FOUND', 'message': 'Portfolio not found'}), 404
+            return json_response({'code': 'NOT_FOUND', 'message': 'Portfolio not found'}, 404)
 
         # Ensure user can only access their own portfolios
         if portfolio.to_dict().get('user_id') != request.user.get('user_id') and 'portfolio_manager' not in request.user.get('roles', []):
             logging.warning(f'FORBIDDEN: User {request.user.get("user_id", "unknown")} attempted to access unauthorized portfolio {portfolio_id}')
-            return jsonify({'code': 'FORBIDDEN', 'message': 'Access to this portfolio is forbidden.'}), 403
+            return json_response({'code': 'FORBIDDEN', 'message': 'Access to this portfolio is forbidden.'}, 403)
 
-        return jsonify({'id': portfolio.id, **portfolio.to_dict()}), 200
+        return json_response({'id': portfolio.id, **portfolio.to_dict()}, 200)
     except Exception as e:
         logging.error(f'Error getting portfolio {portfolio_id} for user {request.user.get("user_id", "unknown")}: {e}')
-        return jsonify({'code': 'INTERNAL_SERVER_ERROR', 'message': str(e)}), 500
+        return json_response({'code': 'INTERNAL_SERVER_ERROR', 'message': str(e)}, 500)
 
 @app.route('/portfolios/<string:portfolio_id>', methods=['PUT'])
-@token_required
-@roles_required(['portfolio_manager'])
-def update_portfolio(portfolio_id):
+async def update_portfolio(portfolio_id):
+    db = get_db()
     try:
-        data = request.get_json()
-        portfolio_ref = db.collection(PORTFOLIOS_COLLECTION).document(portfolio_id)
-        portfolio = portfolio_ref.get()
-
-        if not portfolio.exists:
-            logging.warning(f'NOT_FOUND: Portfolio {portfolio_id} not found for user {request.user.get("user_id", "unknown")}')
-            return jsonify({'code': 'NOT_FOUND', 'message': 'Portfolio not found'}), 404
+        data = await request.get_json()
+        portfolio_ref = get_collection(db, PORTFOLIOS_COLLECTION).document(portfolio_id)
 
         # Ensure user can only update their own portfolios
-        if portfolio.to_dict().get('user_id') != request.user.get('user_id'):
+        owner_id = portfolio_owner_from_id(portfolio_id)
+        if owner_id is not None and owner_id != request.user.get('user_id'):
             logging.warning(f'FORBIDDEN: User {request.user.get("user_id", "unknown")} attempted to update unauthorized portfolio {portfolio_id}')
-            return jsonify({'code': 'FORBIDDEN', 'message': 'Access to this portfolio is forbidden.'}), 403
+            return json_response({'code': 'FORBIDDEN', 'message': 'Access to this portfolio is forbidden.'}, 403)
 
         update_data = {}
         if 'portfolio_name' in data:
@@ -171,49 +411,184 @@ def update_portfolio(portfolio_id):
 
         if not update_data:
             logging.warning(f'BAD_REQUEST: No fields to update for portfolio {portfolio_id} by user {request.user.get("user_id", "unknown")}')
-            return jsonify({'code': 'BAD_REQUEST', 'message': 'No fields to update'}), 400
+            return json_response({'code': 'BAD_REQUEST', 'message': 'No fields to update'}, 400)
 
         update_data = update_common_firestore_fields(update_data)
-        portfolio_ref.update(update_data)
+        if owner_id is None:
+            # Legacy ids need the stored owner; the same read supplies the
+            # rest of the portfolio for the response
+            portfolio = await portfolio_ref.get()
+            if not portfolio.exists:
+                logging.warning(f'NOT_FOUND: Portfolio {portfolio_id} not found for user {request.user.get("user_id", "unknown")}')
+                return json_response({'code': 'NOT_FOUND', 'message': 'Portfolio not found'}, 404)
+            if portfolio.to_dict().get('user_id') != request.user.get('user_id'):
+                logging.warning(f'FORBIDDEN: User {request.user.get("user_id", "unknown")} attempted to update unauthorized portfolio {portfolio_id}')
+                return json_response({'code': 'FORBIDDEN', 'message': 'Access to this portfolio is forbidden.'}, 403)
+
+        try:
+            # The exists precondition reports a missing portfolio without a prior read
+            await portfolio_ref.update(update_data, option=db.write_option(exists=True))
+        except NotFound:
+            logging.warning(f'NOT_FOUND: Portfolio {portfolio_id} not found for user {request.user.get("user_id", "unknown")}')
+            return json_response({'code': 'NOT_FOUND', 'message': 'Portfolio not found'}, 404)
+
+        if owner_id is not None:
+            # The response is the full stored portfolio, so it is read once
+            # after the write
+            portfolio = await portfolio_ref.get()
+            response = {'id': portfolio.id, **portfolio.to_dict()}
+        else:
+            response = {'id': portfolio.id, **portfolio.to_dict(), **update_data}
         logging.info(f'Portfolio {portfolio_id} updated by user {request.user.get("user_id", "unknown")}.')
-        updated_portfolio = portfolio_ref.get().to_dict()
-        return jsonify({'id': portfolio_id, **updated_portfolio}), 200
+        return json_response(response, 200)
     except Exception as e:
         logging.error(f'Error updating portfolio {portfolio_id} for user {request.user.get("user_id", "unknown")}: {e}')
-        return jsonify({'code': 'INTERNAL_SERVER_ERROR', 'message': str(e)}), 500
+        return json_response({'code': 'INTERNAL_SERVER_ERROR', 'message': str(e)}, 500)
 
 @app.route('/portfolios/<string:portfolio_id>', methods=['DELETE'])
-@token_required
-@roles_required(['portfolio_manager'])
-def delete_portfolio(portfolio_id):
+async def delete_portfolio(portfolio_id):
+    db = get_db()
     try:
-        portfolio_ref = db.collection(PORTFOLIOS_COLLECTION).document(portfolio_id)
-        portfolio = portfolio_ref.get()
+        portfolio_ref = get_collection(db, PORTFOLIOS_COLLECTION).document(portfolio_id)
+        owner_id = portfolio_owner_from_id(portfolio_id)
+        if owner_id is None:
+            owner_snapshot = await portfolio_ref.get(field_paths=['user_id'])
 
-        if not portfolio.exists:
-            logging.warning(f'NOT_FOUND: Portfolio {portfolio_id} not found for user {request.user.get("user_id", "unknown")}')
-            return jsonify({'code': 'NOT_FOUND', 'message': 'Portfolio not found'}), 404
+            if not owner_snapshot.exists:
+                logging.warning(f'NOT_FOUND: Portfolio {portfolio_id} not found for user {request.user.get("user_id", "unknown")}')
+                return json_response({'code': 'NOT_FOUND', 'message': 'Portfolio not found'}, 404)
+            owner_id = owner_snapshot.to_dict().get('user_id')
 
         # Ensure user can only delete their own portfolios
-        if portfolio.to_dict().get('user_id') != request.user.get('user_id'):
+        if owner_id != request.user.get('user_id'):
             logging.warning(f'FORBIDDEN: User {request.user.get("user_id", "unknown")} attempted to delete unauthorized portfolio {portfolio_id}')
-            return jsonify({'code': 'FORBIDDEN', 'message': 'Access to this portfolio is forbidden.'}), 403
+            return json_response({'code': 'FORBIDDEN', 'message': 'Access to this portfolio is forbidden.'}, 403)
 
-        portfolio_ref.delete()
+        try:
+            # The exists precondition reports a missing portfolio without a prior read
+            await portfolio_ref.delete(option=db.write_option(exists=True))
+        except NotFound:
+            logging.warning(f'NOT_FOUND: Portfolio {portfolio_id} not found for user {request.user.get("user_id", "unknown")}')
+            return json_response({'code': 'NOT_FOUND', 'message': 'Portfolio not found'}, 404)
         logging.info(f'Portfolio {portfolio_id} deleted by user {request.user.get("user_id", "unknown")}.')
         return '', 204
     except Exception as e:
         logging.error(f'Error deleting portfolio {portfolio_id} for user {request.user.get("user_id", "unknown")}: {e}')
-        return jsonify({'code': 'INTERNAL_SERVER_ERROR', 'message': str(e)}), 500
+        return json_response({'code': 'INTERNAL_SERVER_ERROR', 'message': str(e)}, 500)
 
 # --- Trade Management Endpoints ---
 
+class TradeRejectedError(Exception):
+    """Raised inside a trade transaction to abort it with an API error."""
+
+    def __init__(self, status, code, message, log_message):
+        super().__init__(message)
+        self.status = status
+        self.code = code
+        self.message = message
+        self.log_message = log_message
+
+@firestore.async_transactional
+async def _apply_trade(transaction, portfolio_ref, user_id, trade_id, trade):
+    """Applies a trade to a portfolio and records it in the trade history.
+
+    Runs as a Firestore transaction so the portfolio read, the balance/holdings
+    update and the trade history write commit atomically, and are retried if
+    the portfolio changes concurrently.
+    """
+    # Only the fields the trade needs; skips performance_metrics and the rest
+    portfolio = await portfolio_ref.get(field_paths=['user_id', 'cash_balance', 'holdings'], transaction=transaction)
+
+    if not portfolio.exists:
+        raise TradeRejectedError(404, 'NOT_FOUND', 'Portfolio not found', 'Portfolio not found')
+
+    portfolio_data = portfolio.to_dict()
+
+    # Ensure user can only place trades in their own portfolios
+    if portfolio_data.get('user_id') != user_id:
+        raise TradeRejectedError(403, 'FORBIDDEN', 'Access to this portfolio is forbidden.', 'Attempted to place trade in unauthorized portfolio')
+
+    symbol = trade['symbol']
+    trade_type = trade['trade_type']
+    quantity = trade['quantity']
+    price = trade['price']
+    cash_balance = portfolio_data.get('cash_balance', 0.0)
+    holdings = portfolio_data.get('holdings', {})
+
+    trade_amount = quantity * price
+    realized_pnl = 0.0
+
+    if trade_type == 'BUY':
+        if cash_balance < trade_amount:
+            raise TradeRejectedError(400, 'BAD_REQUEST', 'Insufficient cash balance', 'Insufficient cash for BUY trade')
+        cash_balance -= trade_amount
+        if symbol in holdings:
+            current_quantity = holdings[symbol]['quantity']
+            current_avg_price = holdings[symbol]['average_price']
+            new_quantity = current_quantity + quantity
+            new_avg_price = ((current_quantity * current_avg_price) + trade_amount) / new_quantity
+            holdings[symbol] = {'quantity': new_quantity, 'average_price': new_avg_price}
+        else:
+            holdings[symbol] = {'quantity': quantity, 'average_price': price}
+    elif trade_type == 'SELL':
+        if symbol not in holdings or holdings[symbol]['quantity'] < quantity:
+            raise TradeRejectedError(400, 'BAD_REQUEST', 'Insufficient shares to sell', 'Insufficient shares for SELL trade')
+        cash_balance += trade_amount
+        realized_pnl = (price - holdings[symbol]['average_price']) * quantity
+        holdings[symbol]['quantity'] -= quantity
+        if holdings[symbol]['quantity'] == 0:
+            del holdings[symbol]
+    else:
+        raise TradeRejectedError(400, 'BAD_REQUEST', 'Invalid trade_type. Must be BUY or SELL.', f'Invalid trade_type {trade_type}')
+
+    portfolio_updates = update_common_firestore_fields({'cash_balance': cash_balance, 'holdings': holdings})
+    transaction.update(portfolio_ref, portfolio_updates)
+
+    trade_history_data = {
+        'portfolio_id': portfolio_ref.id,
+        **trade,
+        'trade_timestamp': datetime.datetime.now(datetime.UTC),
+        'status': 'EXECUTED',
+        'realized_pnl': realized_pnl
+    }
+    trade_history_data = add_common_firestore_fields(trade_history_data, provenance='user_input')
+    transaction.set(portfolio_ref.collection(TRADE_HISTORY_SUBCOLLECTION).document(trade_id), trade_history_data)
+    return trade_history_data
+
+def publish_trade_executed(trade_id, portfolio_id, user_id, trade_history_data):
+    """Publishes a TradeExecuted event for the leaderboard subscriber.
+
+    Fire-and-forget: publishing is batched in the background by the client, and
+    a failed publish is only logged since the trade itself is already committed.
+    """
+    if not GCP_PROJECT:
+        return
+    publisher = get_publisher()
+    message = json_dumps({
+        'event': 'TradeExecuted',
+        'trade_id': trade_id,
+        'portfolio_id': portfolio_id,
+        'user_id': user_id,
+        'symbol': trade_history_data['symbol'],
+        'trade_type': trade_history_data['trade_type'],
+        'quantity': trade_history_data['quantity'],
+        'price': trade_history_data['price'],
+        'pnl': trade_history_data['realized_pnl'],
+        'confidence_score': trade_history_data['confidence_score']
+    })
+    future = publisher.publish(publisher.topic_path(GCP_PROJECT, TRADE_EVENTS_TOPIC), message)
+
+    def log_failure(future):
+        if future.exception():
+            logging.error(f'Failed to publish TradeExecuted event for trade {trade_id}: {future.exception()}')
+
+    future.add_done_callback(log_failure)
+
 @app.route('/portfolios/<string:portfolio_id>/trades', methods=['POST'])
-@token_required
-@roles_required(['portfolio_manager'])
-def place_trade(portfolio_id):
+async def place_trade(portfolio_id):
+    db = get_db()
     try:
-        data = request.get_json()
+        data = await request.get_json()
         symbol = data.get('symbol')
         trade_type = data.get('trade_type')
         quantity = data.get('quantity')
@@ -223,160 +598,274 @@ def place_trade(portfolio_id):
 
         if not all([symbol, trade_type, quantity, price]):
             logging.error(f'BAD_REQUEST: Missing trade parameters for portfolio {portfolio_id} by user {request.user.get("user_id", "unknown")}')
-            return jsonify({'code': 'BAD_REQUEST', 'message': 'Symbol, trade_type, quantity, and price are required'}), 400
-
-        portfolio_ref = db.collection(PORTFOLIOS_COLLECTION).document(portfolio_id)
-        portfolio = portfolio_ref.get()
-
-        if not portfolio.exists:
-            logging.warning(f'NOT_FOUND: Portfolio {portfolio_id} not found for user {request.user.get("user_id", "unknown")}')
-            return jsonify({'code': 'NOT_FOUND', 'message': 'Portfolio not found'}), 404
+            return json_response({'code': 'BAD_REQUEST', 'message': 'Symbol, trade_type, quantity, and price are required'}, 400)
 
-        # Ensure user can only place trades in their own portfolios
-        if portfolio.to_dict().get('user_id') != request.user.get('user_id'):
+        # Ensure user can only place trades in their own portfolios (legacy ids
+        # are checked inside the transaction)
+        owner_id = portfolio_owner_from_id(portfolio_id)
+        if owner_id is not None and owner_id != request.user.get('user_id'):
             logging.warning(f'FORBIDDEN: User {request.user.get("user_id", "unknown")} attempted to place trade in unauthorized portfolio {portfolio_id}')
-            return jsonify({'code': 'FORBIDDEN', 'message': 'Access to this portfolio is forbidden.'}), 403
-
-        portfolio_data = portfolio.to_dict()
-        current_cash = portfolio_data.get('cash_balance', 0.0)
-        holdings = portfolio_data.get('holdings', {})
-
-        trade_amount = quantity * price
-
-        if trade_type == 'BUY':
-            if current_cash < trade_amount:
-                logging.warning(f'BAD_REQUEST: Insufficient cash for BUY trade in portfolio {portfolio_id} by user {request.user.get("user_id", "unknown")}')
-                return jsonify({'code': 'BAD_REQUEST', 'message': 'Insufficient cash balance'}), 400
-            portfolio_data['cash_balance'] -= trade_amount
-            if symbol in holdings:
-                current_quantity = holdings[symbol]['quantity']
-                current_avg_price = holdings[symbol]['average_price']
-                new_quantity = current_quantity + quantity
-                new_avg_price = ((current_quantity * current_avg_price) + trade_amount) / new_quantity
-                holdings[symbol] = {'quantity': new_quantity, 'average_price': new_avg_price}
-            else:
-                holdings[symbol] = {'quantity': quantity, 'average_price': price}
-        elif trade_type == 'SELL':
-            if symbol not in holdings or holdings[symbol]['quantity'] < quantity:
-                logging.warning(f'BAD_REQUEST: Insufficient shares for SELL trade in portfolio {portfolio_id} by user {request.user.get("user_id", "unknown")}')
-                return jsonify({'code': 'BAD_REQUEST', 'message': 'Insufficient shares to sell'}), 400
-            portfolio_data['cash_balance'] += trade_amount
-            holdings[symbol]['quantity'] -= quantity
-            if holdings[symbol]['quantity'] == 0:
-                del holdings[symbol]
-        else:
-            logging.warning(f'BAD_REQUEST: Invalid trade_type {trade_type} for portfolio {portfolio_id} by user {request.user.get("user_id", "unknown")}')
-            return jsonify({'code': 'BAD_REQUEST', 'message': 'Invalid trade_type. Must be BUY or SELL.'}), 400
-
-        portfolio_data['holdings'] = holdings
-        portfolio_data = update_common_firestore_fields(portfolio_data)
-        portfolio_ref.update(portfolio_data)
+            return json_response({'code': 'FORBIDDEN', 'message': 'Access to this portfolio is forbidden.'}, 403)
 
+        portfolio_ref = get_collection(db, PORTFOLIOS_COLLECTION).document(portfolio_id)
         trade_id = str(uuid.uuid4())
-        trade_history_data = {
+        trade = {
             'symbol': symbol,
             'trade_type': trade_type,
             'quantity': quantity,
             'price': price,
-            'trade_timestamp': datetime.datetime.utcnow().isoformat() + 'Z',
-            'status': 'EXECUTED',
             'confidence_score': confidence_score,
             'gated_by_high_confidence': gated_by_high_confidence
         }
-        trade_history_data = add_common_firestore_fields(trade_history_data, provenance='user_input')
 
-        db.collection(PORTFOLIOS_COLLECTION).document(portfolio_id).collection(TRADE_HISTORY_SUBCOLLECTION).document(trade_id).set(trade_history_data)
+        try:
+            trade_history_data = await _apply_trade(db.transaction(), portfolio_ref, request.user.get('user_id'), trade_id, trade)
+        except TradeRejectedError as e:
+            logging.warning(f'{e.code}: {e.log_message} for portfolio {portfolio_id} by user {request.user.get("user_id", "unknown")}')
+            return json_response({'code': e.code, 'message': e.message}, e.status)
+
         logging.info(f'Trade {trade_id} placed for portfolio {portfolio_id} by user {request.user.get("user_id", "unknown")}.')
 
-        # TODO: Update leaderboard scores asynchronously (e.g., via Pub/Sub trigger)
+        publish_trade_executed(trade_id, portfolio_id, request.user.get('user_id'), trade_history_data)
 
-        return jsonify({'id': trade_id, **trade_history_data}), 201
+        return json_response({'id': trade_id, **trade_history_data}, 201)
     except Exception as e:
         logging.error(f'Error placing trade for portfolio {portfolio_id} by user {request.user.get("user_id", "unknown")}: {e}')
-        return jsonify({'code': 'INTERNAL_SERVER_ERROR', 'message': str(e)}), 500
+        return json_response({'code': 'INTERNAL_SERVER_ERROR', 'message': str(e)}, 500)
 
 @app.route('/portfolios/<string:portfolio_id>/trades', methods=['GET'])
-@token_required
-@roles_required(['portfolio_viewer', 'portfolio_manager'])
-def get_trade_history(portfolio_id):
+async def get_trade_history(portfolio_id):
+    db = get_db()
     try:
-        portfolio_ref = db.collection(PORTFOLIOS_COLLECTION).document(portfolio_id)
-        portfolio = portfolio_ref.get()
+        portfolio_ref = get_collection(db, PORTFOLIOS_COLLECTION).document(portfolio_id)
+        owner_id = portfolio_owner_from_id(portfolio_id)
+        if owner_id is None:
+            owner_snapshot = await portfolio_ref.get(field_paths=['user_id'])
 
-        if not portfolio.exists:
-            logging.warning(f'NOT_FOUND: Portfolio {portfolio_id} not found for user {request.user.get("user_id", "unknown")}')
-            return jsonify({'code': 'NOT_FOUND', 'message': 'Portfolio not found'}), 404
+            if not owner_snapshot.exists:
+                logging.warning(f'NOT_FOUND: Portfolio {portfolio_id} not found for user {request.user.get("user_id", "unknown")}')
+                return json_response({'code': 'NOT_FOUND', 'message': 'Portfolio not found'}, 404)
+            owner_id = owner_snapshot.to_dict().get('user_id')
 
         # Ensure user can only access trade history for their own portfolios
-        if portfolio.to_dict().get('user_id') != request.user.get('user_id') and 'portfolio_manager' not in request.user.get('roles', []):
+        if owner_id != request.user.get('user_id') and 'portfolio_manager' not in request.user.get('roles', []):
             logging.warning(f'FORBIDDEN: User {request.user.get("user_id", "unknown")} attempted to access unauthorized trade history for portfolio {portfolio_id}')
-            return jsonify({'code': 'FORBIDDEN', 'message': 'Access to this portfolio\'s trade history is forbidden.'}), 403
+            return json_response({'code': 'FORBIDDEN', 'message': 'Access to this portfolio\'s trade history is forbidden.'}, 403)
 
-        trades_ref = portfolio_ref.collection(TRADE_HISTORY_SUBCOLLECTION).order_by('trade_timestamp', direction=firestore.Query.DESCENDING).stream()
-        trade_history = []
-        for trade in trades_ref:
-            trade_history.append({'id': trade.id, **trade.to_dict()})
+        trades_ref = portfolio_ref.collection(TRADE_HISTORY_SUBCOLLECTION)
+        try:
+            trade_history = await get_page(trades_ref, trades_ref.order_by('trade_timestamp', direction=firestore.Query.DESCENDING))
+        except ValueError as e:
+            return json_response({'code': 'BAD_REQUEST', 'message': str(e)}, 400)
 
-        return jsonify(trade_history), 200
+        return json_response(trade_history, 200)
     except Exception as e:
         logging.error(f'Error getting trade history for portfolio {portfolio_id} for user {request.user.get("user_id", "unknown")}: {e}')
-        return jsonify({'code': 'INTERNAL_SERVER_ERROR', 'message': str(e)}), 500
+        return json_response({'code': 'INTERNAL_SERVER_ERROR', 'message': str(e)}, 500)
 
 # --- Leaderboard Endpoints ---
 
 @app.route('/leaderboard', methods=['GET'])
-@token_required
-@roles_required(['leaderboard_viewer'])
-def get_leaderboard():
+async def get_leaderboard():
+    db = get_db()
     try:
-        leaderboard_ref = db.collection(LEADERBOARD_COLLECTION).order_by('combined_score', direction=firestore.Query.DESCENDING).stream()
-        leaderboard = []
-        for entry in leaderboard_ref:
-            leaderboard.append({'id': entry.id, **entry.to_dict()})
+        leaderboard_ref = get_collection(db, LEADERBOARD_COLLECTION)
+        try:
+            leaderboard = await get_page(leaderboard_ref, leaderboard_ref.select(LEADERBOARD_DISPLAY_FIELDS).order_by('combined_score', direction=firestore.Query.DESCENDING))
+        except ValueError as e:
+            return json_response({'code': 'BAD_REQUEST', 'message': str(e)}, 400)
         logging.info(f'Leaderboard accessed by user {request.user.get("user_id", "unknown")}.')
-        return jsonify(leaderboard), 200
+        return json_response(leaderboard, 200)
     except Exception as e:
         logging.error(f'Error getting leaderboard for user {request.user.get("user_id", "unknown")}: {e}')
-        return jsonify({'code': 'INTERNAL_SERVER_ERROR', 'message': str(e)}), 500
+        return json_response({'code': 'INTERNAL_SERVER_ERROR', 'message': str(e)}, 500)
 
 # --- Daily Picks Endpoints ---
 
 @app.route('/daily-picks', methods=['GET'])
-@token_required
-@roles_required(['daily_picks_viewer'])
-def get_daily_picks():
+async def get_daily_picks():
+    db = get_db()
     try:
         # For simplicity, let's just get picks for today. In a real scenario, this might involve a date parameter.
-        today_start = datetime.datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+        today_start = datetime.datetime.now(datetime.UTC).replace(hour=0, minute=0, second=0, microsecond=0)
         today_end = today_start + datetime.timedelta(days=1)
 
-        picks_ref = db.collection(DAILY_PICKS_COLLECTION)
-        # Firestore timestamp comparison needs to be careful with string formats. It's better to store as Firestore Timestamps.
-        # For now, assuming ISO format strings are comparable, but this should be improved.
-        query = picks_ref.where('pick_date', '>=', today_start.isoformat() + 'Z').where('pick_date', '<', today_end.isoformat() + 'Z').stream()
+        picks_ref = get_collection(db, DAILY_PICKS_COLLECTION)
+        # pick_date is a Firestore Timestamp, so the range is compared natively and
+        # index-backed. Picks stored before that hold ISO 8601 strings, which
+        # Firestore orders as a separate type, so they are matched by a second
+        # range query on the string form until migrate-timestamps has run.
+        bounds = [(today_start, today_end), (_iso_z(today_start), _iso_z(today_end))]
 
-        daily_picks = []
-        for pick in query:
-            daily_picks.append({'id': pick.id, **pick.to_dict()})
+        async def read_picks(start, end):
+            query = picks_ref.where('pick_date', '>=', start).where('pick_date', '<', end)
+            return [{'id': pick.id, **pick.to_dict()} async for pick in query.stream()]
+
+        daily_picks = list(itertools.chain.from_iterable(
+            await asyncio.gather(*(read_picks(start, end) for start, end in bounds))))
         logging.info(f'Daily picks accessed by user {request.user.get("user_id", "unknown")}.')
-        return jsonify(daily_picks), 200
+        return json_response(daily_picks, 200)
     except Exception as e:
         logging.error(f'Error getting daily picks for user {request.user.get("user_id", "unknown")}: {e}')
-        return jsonify({'code': 'INTERNAL_SERVER_ERROR', 'message': str(e)}), 500
+        return json_response({'code': 'INTERNAL_SERVER_ERROR', 'message': str(e)}, 500)
 
 # --- Evidence Pack Generation ---
 
+class _OffloopWriter:
+    """Buffers writes to a blocking file object and flushes them in a worker thread.
+
+    Lets the pack be serialized on the event loop while documents stream in,
+    with compression and storage IO kept off it. Memory is bounded by
+    EVIDENCE_WRITE_BUFFER_BYTES rather than the size of the pack.
+    """
+
+    def __init__(self, f):
+        self._file = f
+        self._buffer = bytearray()
+
+    async def write(self, data):
+        self._buffer += data
+        if len(self._buffer) >= EVIDENCE_WRITE_BUFFER_BYTES:
+            await self.flush()
+
+    async def flush(self):
+        if self._buffer:
+            data = bytes(self._buffer)
+            self._buffer.clear()
+            await asyncio.to_thread(self._file.write, data)
+
+_STREAM_END = object()
+
+class _Prefetcher:
+    """Reads an async document stream ahead of its consumer in a task.
+
+    Lets every evidence pack query run concurrently while the pack is written
+    one collection at a time, holding at most EVIDENCE_PREFETCH_DOCS documents
+    per query.
+    """
+
+    def __init__(self, stream):
+        self._queue = asyncio.Queue(maxsize=EVIDENCE_PREFETCH_DOCS)
+        self._error = None
+        self._task = asyncio.create_task(self._pump(stream))
+
+    async def _pump(self, stream):
+        try:
+            async for doc in stream:
+                await self._queue.put(doc)
+        except Exception as e:
+            self._error = e
+        await self._queue.put(_STREAM_END)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        doc = await self._queue.get()
+        if doc is _STREAM_END:
+            self._queue.put_nowait(_STREAM_END)
+            if self._error:
+                raise self._error
+            raise StopAsyncIteration
+        return doc
+
+    def cancel(self):
+        self._task.cancel()
+
+async def _write_evidence_pack(db, out, pack_header, collection_names):
+    # Serialize document by document as the queries stream, rather than
+    # loading collections into memory or building the pack as one dict.
+    # All queries start at once, so later collections are read while earlier
+    # ones are written.
+    streams = {}
+    try:
+        for collection_name in collection_names:
+            query = get_collection(db, collection_name)
+            if collection_name == PORTFOLIOS_COLLECTION:
+                # Portfolios are merged with the trade history in document id order
+                query = query.order_by(firestore.FieldPath.document_id())
+            streams[collection_name] = _Prefetcher(query.stream())
+        # All trade history is read with one collection group query ordered by
+        # portfolio_id, instead of one subcollection query per portfolio
+        trades = _Prefetcher(db.collection_group(TRADE_HISTORY_SUBCOLLECTION).order_by('portfolio_id').stream())
+        streams[TRADE_HISTORY_SUBCOLLECTION] = trades
+
+        await out.write(b'{')
+        for key, value in pack_header.items():
+            await out.write(json_dumps(key) + b': ' + json_dumps(value) + b', ')
+        await out.write(b'"collections_data": {')
+        for index, collection_name in enumerate(collection_names):
+            if index:
+                await out.write(b', ')
+            await out.write(json_dumps(collection_name) + b': [')
+            if collection_name == PORTFOLIOS_COLLECTION:
+                await _write_portfolios(out, streams[collection_name], trades)
+            else:
+                doc_index = 0
+                async for doc in streams[collection_name]:
+                    if doc_index:
+                        await out.write(b', ')
+                    doc_index += 1
+                    doc_data = doc.to_dict()
+                    doc_data['id'] = doc.id
+                    await out.write(json_dumps(doc_data))
+            await out.write(b']')
+        await out.write(b'}}')
+        await out.flush()
+    finally:
+        for stream in streams.values():
+            stream.cancel()
+
+async def _write_portfolios(out, portfolios, trades):
+    # Merges the trade history, ordered by portfolio_id, into the portfolios
+    trade_doc = await anext(trades, None)
+    doc_index = 0
+    async for doc in portfolios:
+        if doc_index:
+            await out.write(b', ')
+        doc_index += 1
+        doc_data = doc.to_dict()
+        doc_data['id'] = doc.id
+        # doc_data always holds 'id', so its closing brace can be reopened
+        await out.write(json_dumps(doc_data)[:-1] + b', ' + json_dumps(TRADE_HISTORY_SUBCOLLECTION) + b': [')
+        # Skip trades whose portfolio no longer exists
+        while trade_doc is not None and trade_doc.get('portfolio_id') < doc.id:
+            trade_doc = await anext(trades, None)
+        trade_index = 0
+        while trade_doc is not None and trade_doc.get('portfolio_id') == doc.id:
+            if trade_index:
+                await out.write(b', ')
+            trade_index += 1
+            trade_data = trade_doc.to_dict()
+            trade_data['id'] = trade_doc.id
+            await out.write(json_dumps(trade_data))
+            trade_doc = await anext(trades, None)
+        await out.write(b']}')
+
+def _discard_evidence_pack(files, blob, file_path):
+    """Removes a pack whose write failed, so a truncated pack is never kept.
+
+    A blob writer cannot abandon its upload: closing it (or garbage collecting
+    it) finalizes whatever was written, so the finalized blob is deleted.
+    """
+    with contextlib.suppress(Exception):
+        files.close()
+    if blob is not None:
+        with contextlib.suppress(NotFound):
+            blob.delete()
+    else:
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(file_path)
+
 @app.route('/evidence-pack', methods=['POST'])
-@token_required
-@roles_required(['admin', 'auditor'])
-def generate_evidence_pack():
+async def generate_evidence_pack():
+    db = get_db()
     try:
         pack_id = str(uuid.uuid4())
-        evidence_data = {
+        pack_header = {
             'pack_id': pack_id,
-            'generated_at': datetime.datetime.utcnow().isoformat() + 'Z',
-            'generated_by_user': request.user.get('user_id', 'unknown'),
-            'collections_data': {}
+            'generated_at': _utc_iso(),
+            'generated_by_user': request.user.get('user_id', 'unknown')
         }
 
         # Collect data from all relevant collections
@@ -386,49 +875,120 @@ def generate_evidence_pack():
             DAILY_PICKS_COLLECTION
         ]
 
-        for collection_name in collections_to_collect:
-            docs = []
-            for doc in db.collection(collection_name).stream():
-                doc_data = doc.to_dict()
-                doc_data['id'] = doc.id
-                # Handle nested sub-collections like trade history
-                if collection_name == PORTFOLIOS_COLLECTION:
-                    portfolio_id = doc.id
-                    trades = []
-                    trade_history_ref = db.collection(PORTFOLIOS_COLLECTION).document(portfolio_id).collection(TRADE_HISTORY_SUBCOLLECTION).stream()
-                    for trade_doc in trade_history_ref:
-                        trade_data = trade_doc.to_dict()
-                        trade_data['id'] = trade_doc.id
-                        trades.append(trade_data)
-                    doc_data[TRADE_HISTORY_SUBCOLLECTION] = trades
-                docs.append(doc_data)
-            evidence_data['collections_data'][collection_name] = docs
-
-        # Define a directory for evidence packs (e.g., 'evidence_packs')
-        evidence_dir = 'evidence_packs'
-        os.makedirs(evidence_dir, exist_ok=True)
-        file_path = os.path.join(evidence_dir, f'evidence_pack_{pack_id}.json')
-
-        with open(file_path, 'w') as f:
-            json.dump(evidence_data, f, indent=4)
-
-        logging.info(f'Evidence pack {pack_id} generated by user {request.user.get("user_id", "unknown")} and saved to {file_path}.')
-        # In a real GCP environment, this would be uploaded to Cloud Storage
-        return jsonify({
+        files = contextlib.ExitStack()
+        blob = file_path = None
+        if EVIDENCE_BUCKET:
+            # Stream gzip-compressed JSON straight into a resumable upload, so
+            # nothing touches local disk and packs are not bounded by memory
+            blob = get_storage_client().bucket(EVIDENCE_BUCKET).blob(f'evidence_packs/{pack_id}.json.gz')
+            raw = files.enter_context(blob.open('wb', ignore_flush=True, content_type='application/gzip'))
+            f = files.enter_context(gzip.open(raw, 'wb'))
+        else:
+            # Define a directory for evidence packs (e.g., 'evidence_packs')
+            evidence_dir = 'evidence_packs'
+            os.makedirs(evidence_dir, exist_ok=True)
+            file_path = os.path.join(evidence_dir, f'evidence_pack_{pack_id}.json')
+            f = files.enter_context(open(file_path, 'wb'))
+        try:
+            await _write_evidence_pack(db, _OffloopWriter(f), pack_header, collections_to_collect)
+        except BaseException:
+            await asyncio.to_thread(_discard_evidence_pack, files, blob, file_path)
+            raise
+        # Closing flushes the gzip trailer and finalizes the upload
+        await asyncio.to_thread(files.close)
+        if EVIDENCE_BUCKET:
+            file_path = await asyncio.to_thread(blob.generate_signed_url, expiration=EVIDENCE_URL_EXPIRATION)
+
+        logging.info(f'Evidence pack {pack_id} generated by user {request.user.get("user_id", "unknown")} and saved to {EVIDENCE_BUCKET or file_path}.')
+        return json_response({
             'code': 'SUCCESS',
             'message': 'Evidence pack generated successfully',
             'pack_id': pack_id,
-            'file_path': file_path # In production, this would be a Cloud Storage URL
-        }), 200
+            'file_path': file_path # Signed Cloud Storage URL when EVIDENCE_BUCKET is set
+        }, 200)
     except Exception as e:
         logging.error(f'Error generating evidence pack for user {request.user.get("user_id", "unknown")}: {e}')
-        return jsonify({'code': 'INTERNAL_SERVER_ERROR', 'message': str(e)}), 500
-
-# Example of how to run the Flask app locally for testing
+        return json_response({'code': 'INTERNAL_SERVER_ERROR', 'message': str(e)}, 500)
+
+# --- Maintenance Commands ---
+
+# Writes per Firestore batch commit
+FIRESTORE_BATCH_LIMIT = 500
+
+# Timestamp fields that older documents hold as ISO 8601 strings, by collection
+# (trade history is read as a collection group)
+LEGACY_TIMESTAMP_FIELDS = {
+    PORTFOLIOS_COLLECTION: ['created_at', 'updated_at'],
+    TRADE_HISTORY_SUBCOLLECTION: ['created_at', 'updated_at', 'trade_timestamp'],
+    DAILY_PICKS_COLLECTION: ['pick_date'],
+}
+
+async def _apply_updates(db, updates):
+    """Commits (document reference, fields) updates in batches; returns how many were written."""
+    batch, pending, updated = db.batch(), 0, 0
+    async for doc_ref, fields in updates:
+        batch.update(doc_ref, fields)
+        pending += 1
+        if pending == FIRESTORE_BATCH_LIMIT:
+            await batch.commit()
+            batch, updated, pending = db.batch(), updated + pending, 0
+    if pending:
+        await batch.commit()
+    return updated + pending
+
+async def backfill_trade_portfolio_ids():
+    """Stores portfolio_id on trades written before it was recorded.
+
+    Evidence packs read trade history ordered by portfolio_id, which leaves out
+    trades without the field. Returns the number of trades updated.
+    """
+    db = get_db()
+
+    async def updates():
+        async for trade_doc in db.collection_group(TRADE_HISTORY_SUBCOLLECTION).select(['portfolio_id']).stream():
+            if 'portfolio_id' not in trade_doc.to_dict():
+                yield trade_doc.reference, {'portfolio_id': trade_doc.reference.parent.parent.id}
+
+    return await _apply_updates(db, updates())
+
+async def migrate_timestamps():
+    """Rewrites timestamps stored as ISO 8601 strings as Firestore Timestamps.
+
+    Strings and Timestamps are ordered as different types, so until this has
+    run, range queries and ordering on these fields mix or miss older
+    documents. Returns the number of documents updated.
+    """
+    db = get_db()
+
+    async def updates():
+        for collection_name, field_names in LEGACY_TIMESTAMP_FIELDS.items():
+            if collection_name == TRADE_HISTORY_SUBCOLLECTION:
+                query = db.collection_group(collection_name)
+            else:
+                query = get_collection(db, collection_name)
+            async for doc in query.select(field_names).stream():
+                fields = {name: _parse_iso(value) for name, value in doc.to_dict().items() if isinstance(value, str)}
+                if fields:
+                    yield doc.reference, fields
+
+    return await _apply_updates(db, updates())
+
+@app.cli.command('backfill-trade-portfolio-ids')
+def backfill_trade_portfolio_ids_command():
+    """Store portfolio_id on legacy trade history documents."""
+    print(f'Updated {asyncio.run(backfill_trade_portfolio_ids())} trades')
+
+@app.cli.command('migrate-timestamps')
+def migrate_timestamps_command():
+    """Convert ISO 8601 string timestamps to Firestore Timestamps."""
+    print(f'Updated {asyncio.run(migrate_timestamps())} documents')
+
+# Example of how to run the app locally for testing. In production, serve it
+# with an ASGI server, e.g.: hypercorn main:app --worker-class uvloop --workers $(nproc)
 if __name__ == '__main__':
     # Set environment variable for Google Cloud credentials if running locally
     # os.environ['GOOGLE_APPLICATION_CREDENTIALS'] = '/path/to/your/service-account-key.json'
     # For local testing, you can generate a simple JWT token with a tool like jwt.io
-    # Example payload: {'user_id': 'test_user', 'roles': ['portfolio_manager', 'leaderboard_viewer', 'daily_picks_viewer', 'admin', 'auditor']}
+    # Example payload: {'user_id': 'test_user', 'roles': ['portfolio_manager', 'leaderboard_viewer', 'daily_picks_viewer', 'admin', 'auditor'], 'exp': <Unix time in the future>}
     # Use 'super-secret-key' as the secret for signing.
     app.run(debug=True, host='0.0.0.0', port=int(os.environ.get('PORT', 8080)))
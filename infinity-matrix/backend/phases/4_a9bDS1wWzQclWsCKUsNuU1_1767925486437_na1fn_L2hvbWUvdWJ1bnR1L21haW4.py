@@ -1,58 +1,144 @@
 
-import json
+import asyncio
+import itertools
 import logging
 import os
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
 from datetime import datetime
-from functools import wraps
 
-from flask import Flask, abort, g, jsonify, request
+import orjson
+from cachetools import TTLCache
+from fastapi import Depends, FastAPI, HTTPException, Request
+from fastapi.responses import Response, StreamingResponse
+from google.api_core.exceptions import GoogleAPICallError
 from google.auth.exceptions import DefaultCredentialsError
 from google.cloud import firestore
-
-# Initialize Flask app
-app = Flask(__name__)
+from google.cloud.firestore import SERVER_TIMESTAMP
+from starlette.exceptions import HTTPException as StarletteHTTPException
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
-# Initialize Firestore client
-try:
-    db = firestore.Client()
-    logging.info("Firestore client initialized successfully.")
-except DefaultCredentialsError as e:
-    logging.error(f"Failed to initialize Firestore client: {e}. Ensure GOOGLE_APPLICATION_CREDENTIALS is set or running on GCP.")
-    # In a production environment, you might want to exit or handle this more gracefully
-    # For now, we'll let the app start but Firestore operations will fail.
-    db = None
+# Async Firestore clients, so handlers await RPCs on the event loop instead of
+# blocking a worker thread. Each client owns its own gRPC channel, and concurrent
+# requests are spread across FIRESTORE_CHANNEL_POOL_SIZE of them rather than
+# multiplexing every stream over a single HTTP/2 connection. The pool is created
+# lazily on first use, so each worker process opens its own channels after any
+# fork and on its own event loop.
+FIRESTORE_CHANNEL_POOL_SIZE = int(os.environ.get('FIRESTORE_CHANNEL_POOL_SIZE', 4))
+_db_clients = None
+_db_pool = None
+_db_clients_lock = threading.Lock()
+
+def get_db_clients():
+    """Returns this process's client pool, which is empty if credentials are missing."""
+    global _db_clients, _db_pool
+    if _db_clients is None:
+        with _db_clients_lock:
+            if _db_clients is None:
+                try:
+                    clients = [firestore.AsyncClient() for _ in range(FIRESTORE_CHANNEL_POOL_SIZE)]
+                    logging.info(f"Firestore client pool of {len(clients)} initialized successfully.")
+                except DefaultCredentialsError as e:
+                    logging.error(f"Failed to initialize Firestore client: {e}. Ensure GOOGLE_APPLICATION_CREDENTIALS is set or running on GCP.")
+                    # In a production environment, you might want to exit or handle this more gracefully
+                    # For now, we'll let the app start but Firestore operations will fail.
+                    clients = []
+                _db_pool = itertools.cycle(clients)
+                _db_clients = clients
+    return _db_clients
+
+def get_db():
+    # Round-robin over the pooled clients
+    get_db_clients()
+    return next(_db_pool)
 
 # Configuration for collections
 AGENT_TEMPLATES_COLLECTION = 'agent_templates'
 AGENT_INSTANCES_COLLECTION = 'agent_instances'
 USERS_COLLECTION = 'users'
 
+# Roles each role satisfies, and the accepted autonomy modes
+ROLE_HIERARCHY = {
+    'admin': frozenset({'admin', 'developer', 'viewer'}),
+    'developer': frozenset({'developer', 'viewer'}),
+    'viewer': frozenset({'viewer'}),
+}
+VALID_AUTONOMY_MODES = frozenset({'Full Auto', 'Hybrid', 'Manual'})
+# Instance fields clients may change through PATCH
+UPDATABLE_INSTANCE_FIELDS = frozenset({'name', 'custom_parameters', 'autonomy_mode', 'persistent_memory', 'status'})
+# Listed for error messages in a stable order
+_VALID_AUTONOMY_MODES_TEXT = ', '.join(sorted(VALID_AUTONOMY_MODES))
+
+# Evidence packs are built and logged off the request path
+_EVIDENCE_EXECUTOR = ThreadPoolExecutor(max_workers=4, thread_name_prefix='evidence')
+
+# Seeding normally runs once per deploy via `python main.py seed`; set this to
+# 1 for local development to seed when the app starts instead
+SEED_ON_STARTUP = os.environ.get('SEED_ON_STARTUP') == '1'
+
+# Page size bounds for list endpoints
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 500
+
+# Role lookups are cached per user id so repeat callers skip the users document read.
+# This service has no role-changing endpoints; roles edited elsewhere (e.g. the
+# admin control plane) take effect here within USER_ROLE_CACHE_TTL seconds, which
+# bounds how long a revoked role keeps working.
+USER_ROLE_CACHE_TTL = int(os.environ.get('USER_ROLE_CACHE_TTL', 15))
+_USER_ROLE_CACHE = TTLCache(maxsize=10000, ttl=USER_ROLE_CACHE_TTL)
+
+# Templates are read-mostly, so the list and individual templates are cached
+# under 'list' and their template ids respectively
+TEMPLATE_CACHE_TTL = int(os.environ.get('TEMPLATE_CACHE_TTL', 300))
+_TEMPLATE_CACHE = TTLCache(maxsize=1024, ttl=TEMPLATE_CACHE_TTL)
+_TEMPLATE_LIST_KEY = 'list'
+
 # --- Utility Functions ---
 
+# Client-side clock, only used for evidence packs; stored documents are
+# stamped by Firestore via SERVER_TIMESTAMP
 def _get_timestamp():
     return datetime.utcnow()
 
 def _add_firestore_metadata(data, schema_version='1.0', provenance='InfinityXAI-Phase5'):
-    now = _get_timestamp()
     data['schema_version'] = schema_version
-    data['created_at'] = now
-    data['updated_at'] = now
+    data['created_at'] = SERVER_TIMESTAMP
+    data['updated_at'] = SERVER_TIMESTAMP
     data['provenance'] = provenance
     return data
 
 def _update_firestore_metadata(data):
-    data['updated_at'] = _get_timestamp()
+    data['updated_at'] = SERVER_TIMESTAMP
     return data
 
+def _resolve_server_timestamps(data, write_time):
+    # Server timestamps are set to the commit time, which the write result reports
+    return {key: write_time if value is SERVER_TIMESTAMP else value for key, value in data.items()}
+
+def _json_default(value):
+    # orjson only serializes exact datetime instances, not subclasses such as
+    # the DatetimeWithNanoseconds values Firestore returns
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+def json_dumps(obj):
+    return orjson.dumps(obj, default=_json_default, option=orjson.OPT_NAIVE_UTC)
+
+# orjson-encoded response; skips FastAPI's jsonable_encoder pass over the payload
+def json_response(obj, status_code=200):
+    return Response(json_dumps(obj), status_code=status_code, media_type='application/json')
+
 def _generate_evidence_pack(action, entity_type, entity_id, payload, result, user_id):
     # Placeholder for evidence pack generation logic
     # In a real scenario, this would store detailed audit logs, request/response payloads,
     # and potentially snapshots of relevant data to a secure storage (e.g., Cloud Storage).
     evidence = {
-        'timestamp': _get_timestamp().isoformat(),
+        'timestamp': _get_timestamp(),
         'action': action,
         'entity_type': entity_type,
         'entity_id': entity_id,
@@ -61,157 +147,246 @@ def _generate_evidence_pack(action, entity_type, entity_id, payload, result, use
         'user_id': user_id,
         'status': 'success' if result else 'failure'
     }
-    logging.info(f"Evidence pack generated: {json.dumps(evidence)}")
+    logging.info(f"Evidence pack generated: {json_dumps(evidence).decode()}")
     # Example: Store evidence in a dedicated Firestore collection or Cloud Storage
     # db.collection('evidence_packs').add(evidence)
     return evidence
 
+def _log_evidence_failure(future):
+    if future.exception() is not None:
+        logging.error(f"Evidence pack generation failed: {future.exception()}")
+
+def submit_evidence_pack(action, entity_type, entity_id, payload, result, user_id):
+    """Queues _generate_evidence_pack on the evidence executor without waiting for it."""
+    future = _EVIDENCE_EXECUTOR.submit(_generate_evidence_pack, action, entity_type, entity_id, payload, result, user_id)
+    future.add_done_callback(_log_evidence_failure)
+
+def _is_valid_autonomy_mode(mode):
+    # JSON lists/objects are unhashable and would raise on frozenset membership
+    return isinstance(mode, str) and mode in VALID_AUTONOMY_MODES
+
+async def json_body(request: Request):
+    """Parses the request body with orjson, returning None unless it is a JSON object.
+
+    Malformed bodies are treated like missing ones, so handlers answer with
+    their own 400 rather than FastAPI's validation error.
+    """
+    try:
+        data = orjson.loads(await request.body())
+    except orjson.JSONDecodeError:
+        return None
+    return data if isinstance(data, dict) else None
+
 # --- RBAC and Security Hardening ---
 
-def _get_user_role(user_id):
+async def _get_user_role(user_id):
     # In a real application, this would query a user management system or Firestore 'users' collection
     # For demonstration, we'll use a mock user store.
-    if not db:
+    if not get_db_clients():
         logging.error("Firestore client not initialized, cannot get user role.")
         return None
+    role = _USER_ROLE_CACHE.get(user_id)
+    if role is not None:
+        return role
     try:
-        user_ref = db.collection(USERS_COLLECTION).document(user_id).get()
+        # Only the role is needed, so skip transferring the rest of the profile
+        user_ref = await get_db().collection(USERS_COLLECTION).document(user_id).get(field_paths=['role'])
         if user_ref.exists:
-            return user_ref.to_dict().get('role')
-        return 'viewer' # Default role if user not found
+            role = user_ref.to_dict().get('role')
+        else:
+            role = 'viewer' # Default role if user not found
     except Exception as e:
         logging.error(f"Error fetching user role for {user_id}: {e}")
         return None
+    # Failed lookups are not cached so the next request retries Firestore
+    if role is not None:
+        _USER_ROLE_CACHE[user_id] = role
+    return role
+
+def invalidate_user_role(user_id):
+    """Drops the cached role for user_id; call whenever a user's role changes."""
+    _USER_ROLE_CACHE.pop(user_id, None)
 
 def requires_role(required_role):
-    def decorator(f):
-        @wraps(f)
-        def decorated_function(*args, **kwargs):
-            # Mock authentication: In a real app, this would come from JWT, session, etc.
-            # For simplicity, we'll assume user_id is passed in a header or context.
-            user_id = request.headers.get('X-User-ID', 'anonymous')
-            g.user_id = user_id # Store user_id in Flask's global context
-
-            if user_id == 'anonymous':
-                abort(401, description="Authentication required.")
-
-            user_role = _get_user_role(user_id)
-            if user_role is None:
-                abort(500, description="Could not determine user role.")
-
-            # Define role hierarchy or direct match
-            role_hierarchy = {
-                'admin': ['admin', 'developer', 'viewer'],
-                'developer': ['developer', 'viewer'],
-                'viewer': ['viewer']
-            }
-
-            if required_role not in role_hierarchy.get(user_role, []):
-                abort(403, description=f"Insufficient permissions. Required role: {required_role}")
-            return f(*args, **kwargs)
-        return decorated_function
-    return decorator
+    """Returns a dependency that authorizes the caller and resolves to their user id."""
+    async def dependency(request: Request):
+        # Mock authentication: In a real app, this would come from JWT, session, etc.
+        # For simplicity, we'll assume user_id is passed in a header or context.
+        user_id = request.headers.get('X-User-ID', 'anonymous')
+
+        if user_id == 'anonymous':
+            raise HTTPException(401, detail="Authentication required.")
+
+        user_role = await _get_user_role(user_id)
+        if user_role is None:
+            raise HTTPException(500, detail="Could not determine user role.")
+        # Handlers reuse the resolved role for ownership checks
+        request.state.user_role = user_role
+
+        if required_role not in ROLE_HIERARCHY.get(user_role, frozenset()):
+            raise HTTPException(403, detail=f"Insufficient permissions. Required role: {required_role}")
+        return user_id
+    return dependency
+
+# --- Agent Template Cache ---
+
+async def _get_agent_templates():
+    templates = _TEMPLATE_CACHE.get(_TEMPLATE_LIST_KEY)
+    if templates is None:
+        templates = [template.to_dict() async for template in get_db().collection(AGENT_TEMPLATES_COLLECTION).stream()]
+        _TEMPLATE_CACHE[_TEMPLATE_LIST_KEY] = templates
+    return templates
+
+async def _get_agent_template(template_id):
+    """Returns the template document as a dict, or None if it does not exist."""
+    template_data = _TEMPLATE_CACHE.get(template_id)
+    if template_data is None:
+        template_ref = await get_db().collection(AGENT_TEMPLATES_COLLECTION).document(template_id).get()
+        if not template_ref.exists:
+            # Misses are not cached so newly added templates show up immediately
+            return None
+        template_data = template_ref.to_dict()
+        _TEMPLATE_CACHE[template_id] = template_data
+    return template_data
 
-# --- Error Handling ---
+def invalidate_template_cache():
+    """Drops all cached templates; call after any template is created or changed."""
+    _TEMPLATE_CACHE.clear()
 
-@app.errorhandler(400)
-def bad_request(e):
-    logging.error(f"Bad Request: {e.description}")
-    return jsonify(error=e.description), 400
+# --- Initial Data Seeding Hook ---
 
-@app.errorhandler(401)
-def unauthorized(e):
-    logging.warning(f"Unauthorized: {e.description}")
-    return jsonify(error=e.description), 401
+@asynccontextmanager
+async def lifespan(app):
+    # Seeding from every worker multiplies cold-start cost and races, so it is
+    # opt-in here and otherwise done once by the seed entrypoint
+    if SEED_ON_STARTUP and get_db_clients():
+        await seed_initial_data()
+    yield
+    # Let queued evidence packs finish before the worker exits
+    _EVIDENCE_EXECUTOR.shutdown(wait=True)
 
-@app.errorhandler(403)
-def forbidden(e):
-    logging.warning(f"Forbidden: {e.description}")
-    return jsonify(error=e.description), 403
+# Initialize FastAPI app
+app = FastAPI(lifespan=lifespan)
 
-@app.errorhandler(404)
-def not_found(e):
-    logging.warning(f"Not Found: {e.description}")
-    return jsonify(error=e.description), 404
+# --- Error Handling ---
 
-@app.errorhandler(500)
-def internal_server_error(e):
-    logging.exception(f"Internal Server Error: {e.description}")
-    return jsonify(error=e.description), 500
+@app.exception_handler(StarletteHTTPException)
+async def http_exception_handler(request, e):
+    if e.status_code >= 500:
+        logging.error(f"Internal Server Error: {e.detail}")
+    elif e.status_code in (401, 403, 404):
+        logging.warning(f"{e.status_code}: {e.detail}")
+    else:
+        logging.error(f"Bad Request: {e.detail}")
+    return json_response({'error': e.detail}, status_code=e.status_code)
+
+# Endpoints only catch Firestore API errors, so anything else ends up here
+@app.exception_handler(Exception)
+async def unhandled_exception_handler(request, e):
+    logging.error(f"Unhandled error on {request.method} {request.url.path}: {e}", exc_info=e)
+    return json_response({'error': "Internal server error."}, status_code=500)
 
 # --- API Endpoints ---
 
-@app.route('/agent-templates', methods=['GET'])
-@requires_role('viewer')
-def list_agent_templates():
-    if not db:
-        abort(500, description="Database not initialized.")
+@app.get('/agent-templates')
+async def list_agent_templates(user_id: str = Depends(requires_role('viewer'))):
+    if not get_db_clients():
+        raise HTTPException(500, detail="Database not initialized.")
     try:
-        templates_ref = db.collection(AGENT_TEMPLATES_COLLECTION).stream()
-        templates = [template.to_dict() for template in templates_ref]
-        _generate_evidence_pack('list_agent_templates', AGENT_TEMPLATES_COLLECTION, 'all', None, templates, g.user_id)
-        return jsonify(templates), 200
-    except Exception as e:
+        templates = await _get_agent_templates()
+        submit_evidence_pack('list_agent_templates', AGENT_TEMPLATES_COLLECTION, 'all', None, templates, user_id)
+        return json_response(templates)
+    except GoogleAPICallError as e:
         logging.error(f"Error listing agent templates: {e}")
-        abort(500, description="Failed to retrieve agent templates.")
+        raise HTTPException(500, detail="Failed to retrieve agent templates.") from e
 
-@app.route('/agent-templates/<string:template_id>', methods=['GET'])
-@requires_role('viewer')
-def get_agent_template(template_id):
-    if not db:
-        abort(500, description="Database not initialized.")
+@app.get('/agent-templates/{template_id}')
+async def get_agent_template(template_id: str, user_id: str = Depends(requires_role('viewer'))):
+    if not get_db_clients():
+        raise HTTPException(500, detail="Database not initialized.")
     try:
-        template_ref = db.collection(AGENT_TEMPLATES_COLLECTION).document(template_id).get()
-        if not template_ref.exists:
-            abort(404, description=f"Agent template with ID {template_id} not found.")
-        template_data = template_ref.to_dict()
-        _generate_evidence_pack('get_agent_template', AGENT_TEMPLATES_COLLECTION, template_id, None, template_data, g.user_id)
-        return jsonify(template_data), 200
-    except Exception as e:
+        template_data = await _get_agent_template(template_id)
+        if template_data is None:
+            raise HTTPException(404, detail=f"Agent template with ID {template_id} not found.")
+        submit_evidence_pack('get_agent_template', AGENT_TEMPLATES_COLLECTION, template_id, None, template_data, user_id)
+        return json_response(template_data)
+    except GoogleAPICallError as e:
         logging.error(f"Error getting agent template {template_id}: {e}")
-        abort(500, description="Failed to retrieve agent template.")
-
-@app.route('/agent-instances', methods=['GET'])
-@requires_role('viewer')
-def list_agent_instances():
-    if not db:
-        abort(500, description="Database not initialized.")
+        raise HTTPException(500, detail="Failed to retrieve agent template.") from e
+
+@app.get('/agent-instances')
+async def list_agent_instances(limit: int = DEFAULT_PAGE_SIZE, start_after: str | None = None, user_id: str = Depends(requires_role('viewer'))):
+    """Streams one page of the caller's instances as a JSON array.
+
+    Pass the instance_id of the last item as start_after to fetch the next page.
+    Requires a composite index on (user_id, created_at).
+    """
+    if not get_db_clients():
+        raise HTTPException(500, detail="Database not initialized.")
+    limit = min(max(limit, 1), MAX_PAGE_SIZE)
+    instances_collection = get_db().collection(AGENT_INSTANCES_COLLECTION)
+    query = instances_collection.where('user_id', '==', user_id).order_by('created_at').limit(limit)
+    if start_after:
+        try:
+            # The cursor only needs its owner and the order_by field
+            cursor = await instances_collection.document(start_after).get(field_paths=['user_id', 'created_at'])
+        except GoogleAPICallError as e:
+            logging.error(f"Error reading cursor {start_after} for user {user_id}: {e}")
+            raise HTTPException(500, detail="Failed to retrieve agent instances.") from e
+        if not cursor.exists or cursor.to_dict().get('user_id') != user_id:
+            raise HTTPException(400, detail=f"Invalid start_after cursor: {start_after}.")
+        query = query.start_after(cursor)
+
+    # Wait for the first result before committing to a 200, so query errors
+    # (missing index, permissions, unavailable) still map to a 500
+    instances = query.stream()
     try:
-        # In a real app, filter by user_id for security
-        instances_ref = db.collection(AGENT_INSTANCES_COLLECTION).where('user_id', '==', g.user_id).stream()
-        instances = [instance.to_dict() for instance in instances_ref]
-        _generate_evidence_pack('list_agent_instances', AGENT_INSTANCES_COLLECTION, 'all', None, instances, g.user_id)
-        return jsonify(instances), 200
-    except Exception as e:
-        logging.error(f"Error listing agent instances for user {g.user_id}: {e}")
-        abort(500, description="Failed to retrieve agent instances.")
-
-@app.route('/agent-instances', methods=['POST'])
-@requires_role('developer')
-def create_agent_instance():
-    if not db:
-        abort(500, description="Database not initialized.")
-    data = request.get_json()
+        first = await anext(instances, None)
+    except GoogleAPICallError as e:
+        logging.error(f"Error listing agent instances for user {user_id}: {e}")
+        raise HTTPException(500, detail="Failed to retrieve agent instances.") from e
+
+    async def generate():
+        count = 0
+        yield b'['
+        if first is not None:
+            yield json_dumps({**first.to_dict(), 'instance_id': first.id})
+            count += 1
+            try:
+                async for instance in instances:
+                    yield b','
+                    yield json_dumps({**instance.to_dict(), 'instance_id': instance.id})
+                    count += 1
+            except Exception as e:
+                # The status line is already sent, so the error can only be logged
+                logging.error(f"Error listing agent instances for user {user_id}: {e}")
+        yield b']'
+        submit_evidence_pack('list_agent_instances', AGENT_INSTANCES_COLLECTION, 'all', {'limit': limit, 'start_after': start_after}, {'count': count}, user_id)
+
+    return StreamingResponse(generate(), media_type='application/json')
+
+@app.post('/agent-instances', status_code=201)
+async def create_agent_instance(data: dict | None = Depends(json_body), user_id: str = Depends(requires_role('developer'))):
+    if not get_db_clients():
+        raise HTTPException(500, detail="Database not initialized.")
     if not data:
-        abort(400, description="No input data provided.")
+        raise HTTPException(400, detail="No input data provided.")
 
     required_fields = ['template_id', 'name', 'autonomy_mode']
     if not all(field in data for field in required_fields):
-        abort(400, description=f"Missing required fields: {', '.join(required_fields)}.")
+        raise HTTPException(400, detail=f"Missing required fields: {', '.join(required_fields)}.")
 
     # Validate autonomy_mode
-    valid_autonomy_modes = ['Full Auto', 'Hybrid', 'Manual']
-    if data['autonomy_mode'] not in valid_autonomy_modes:
-        abort(400, description=f"Invalid autonomy_mode. Must be one of {valid_autonomy_modes}.")
+    if not _is_valid_autonomy_mode(data['autonomy_mode']):
+        raise HTTPException(400, detail=f"Invalid autonomy_mode. Must be one of {_VALID_AUTONOMY_MODES_TEXT}.")
 
     try:
         # Check if template_id exists
-        template_ref = db.collection(AGENT_TEMPLATES_COLLECTION).document(data['template_id']).get()
-        if not template_ref.exists:
-            abort(400, description=f"Agent template with ID {data['template_id']} does not exist.")
+        if await _get_agent_template(data['template_id']) is None:
+            raise HTTPException(400, detail=f"Agent template with ID {data['template_id']} does not exist.")
 
         instance_data = {
-            'user_id': g.user_id,
+            'user_id': user_id,
             'template_id': data['template_id'],
             'name': data['name'],
             'custom_parameters': data.get('custom_parameters', {}),
@@ -223,82 +398,103 @@ def create_agent_instance():
         instance_data = _add_firestore_metadata(instance_data)
 
         # Firestore automatically generates an ID if not provided
-        doc_ref = db.collection(AGENT_INSTANCES_COLLECTION).add(instance_data)
-        instance_id = doc_ref[1].id
+        update_time, doc_ref = await get_db().collection(AGENT_INSTANCES_COLLECTION).add(instance_data)
+        instance_id = doc_ref.id
+        instance_data = _resolve_server_timestamps(instance_data, update_time)
         instance_data['instance_id'] = instance_id # Add ID to the returned data
 
-        _generate_evidence_pack('create_agent_instance', AGENT_INSTANCES_COLLECTION, instance_id, data, instance_data, g.user_id)
-        return jsonify(instance_data), 201
-    except Exception as e:
-        logging.error(f"Error creating agent instance for user {g.user_id}: {e}")
-        abort(500, description="Failed to create agent instance.")
-
-@app.route('/agent-instances/<string:instance_id>', methods=['GET'])
-@requires_role('viewer')
-def get_agent_instance(instance_id):
-    if not db:
-        abort(500, description="Database not initialized.")
+        submit_evidence_pack('create_agent_instance', AGENT_INSTANCES_COLLECTION, instance_id, data, instance_data, user_id)
+        return json_response(instance_data, status_code=201)
+    except GoogleAPICallError as e:
+        logging.error(f"Error creating agent instance for user {user_id}: {e}")
+        raise HTTPException(500, detail="Failed to create agent instance.") from e
+
+@app.get('/agent-instances/{instance_id}')
+async def get_agent_instance(instance_id: str, request: Request, user_id: str = Depends(requires_role('viewer'))):
+    if not get_db_clients():
+        raise HTTPException(500, detail="Database not initialized.")
     try:
-        instance_ref = db.collection(AGENT_INSTANCES_COLLECTION).document(instance_id).get()
+        instance_ref = await get_db().collection(AGENT_INSTANCES_COLLECTION).document(instance_id).get()
         if not instance_ref.exists:
-            abort(404, description=f"Agent instance with ID {instance_id} not found.")
+            raise HTTPException(404, detail=f"Agent instance with ID {instance_id} not found.")
 
         instance_data = instance_ref.to_dict()
-        if instance_data.get('user_id') != g.user_id and _get_user_role(g.user_id) != 'admin':
-            abort(403, description="You do not have permission to access this agent instance.")
-
-        _generate_evidence_pack('get_agent_instance', AGENT_INSTANCES_COLLECTION, instance_id, None, instance_data, g.user_id)
-        return jsonify(instance_data), 200
-    except Exception as e:
-        logging.error(f"Error getting agent instance {instance_id} for user {g.user_id}: {e}")
-        abort(500, description="Failed to retrieve agent instance.")
-
-@app.route('/agent-instances/<string:instance_id>', methods=['PATCH'])
-@requires_role('developer')
-def update_agent_instance(instance_id):
-    if not db:
-        abort(500, description="Database not initialized.")
-    data = request.get_json()
+        if instance_data.get('user_id') != user_id and request.state.user_role != 'admin':
+            raise HTTPException(403, detail="You do not have permission to access this agent instance.")
+
+        submit_evidence_pack('get_agent_instance', AGENT_INSTANCES_COLLECTION, instance_id, None, instance_data, user_id)
+        return json_response(instance_data)
+    except GoogleAPICallError as e:
+        logging.error(f"Error getting agent instance {instance_id} for user {user_id}: {e}")
+        raise HTTPException(500, detail="Failed to retrieve agent instance.") from e
+
+@app.patch('/agent-instances/{instance_id}')
+async def update_agent_instance(instance_id: str, request: Request, data: dict | None = Depends(json_body), user_id: str = Depends(requires_role('developer'))):
+    if not get_db_clients():
+        raise HTTPException(500, detail="Database not initialized.")
     if not data:
-        abort(400, description="No input data provided for update.")
+        raise HTTPException(400, detail="No input data provided for update.")
 
     try:
-        instance_ref = db.collection(AGENT_INSTANCES_COLLECTION).document(instance_id)
-        instance_doc = instance_ref.get()
+        instance_ref = get_db().collection(AGENT_INSTANCES_COLLECTION).document(instance_id)
+        instance_doc = await instance_ref.get()
 
         if not instance_doc.exists:
-            abort(404, description=f"Agent instance with ID {instance_id} not found.")
+            raise HTTPException(404, detail=f"Agent instance with ID {instance_id} not found.")
 
         existing_data = instance_doc.to_dict()
-        if existing_data.get('user_id') != g.user_id and _get_user_role(g.user_id) != 'admin':
-            abort(403, description="You do not have permission to update this agent instance.")
+        if existing_data.get('user_id') != user_id and request.state.user_role != 'admin':
+            raise HTTPException(403, detail="You do not have permission to update this agent instance.")
 
-        # Only allow specific fields to be updated
-        updatable_fields = ['name', 'custom_parameters', 'autonomy_mode', 'persistent_memory', 'status']
-        update_payload = {k: v for k, v in data.items() if k in updatable_fields}
+        # Only allow specific fields to be updated; intersecting with the
+        # whitelist never walks keys outside it, however large the body is
+        update_payload = {k: data[k] for k in UPDATABLE_INSTANCE_FIELDS & data.keys()}
 
-        if 'autonomy_mode' in update_payload:
-            valid_autonomy_modes = ['Full Auto', 'Hybrid', 'Manual']
-            if update_payload['autonomy_mode'] not in valid_autonomy_modes:
-                abort(400, description=f"Invalid autonomy_mode. Must be one of {valid_autonomy_modes}.")
+        if 'autonomy_mode' in update_payload and not _is_valid_autonomy_mode(update_payload['autonomy_mode']):
+            raise HTTPException(400, detail=f"Invalid autonomy_mode. Must be one of {_VALID_AUTONOMY_MODES_TEXT}.")
 
         if not update_payload:
-            abort(400, description="No valid fields provided for update.")
+            raise HTTPException(400, detail="No valid fields provided for update.")
 
         update_payload = _update_firestore_metadata(update_payload)
-        instance_ref.update(update_payload)
-
-        updated_instance_data = instance_ref.get().to_dict()
-        _generate_evidence_pack('update_agent_instance', AGENT_INSTANCES_COLLECTION, instance_id, data, updated_instance_data, g.user_id)
-        return jsonify(updated_instance_data), 200
-    except Exception as e:
-        logging.error(f"Error updating agent instance {instance_id} for user {g.user_id}: {e}")
-        abort(500, description="Failed to update agent instance.")
+        write_result = await instance_ref.update(update_payload)
+        update_payload = _resolve_server_timestamps(update_payload, write_result.update_time)
+
+        # update() replaces each top-level field it names, so merging in memory
+        # reproduces the stored document without reading it back
+        updated_instance_data = {**existing_data, **update_payload}
+        submit_evidence_pack('update_agent_instance', AGENT_INSTANCES_COLLECTION, instance_id, data, updated_instance_data, user_id)
+        return json_response(updated_instance_data)
+    except GoogleAPICallError as e:
+        logging.error(f"Error updating agent instance {instance_id} for user {user_id}: {e}")
+        raise HTTPException(500, detail="Failed to update agent instance.") from e
 
 # --- Initial Data Seeding (for demonstration/development) ---
 
-def seed_agent_templates():
-    if not db:
+# Firestore rejects write batches larger than this
+FIRESTORE_BATCH_LIMIT = 500
+
+async def _seed_missing_documents(collection_name, id_field, documents):
+    """Creates the documents not yet present in collection_name and returns them.
+
+    Existence is checked with a single get_all() and the missing documents are
+    written in batched commits instead of one get()/set() round trip each.
+    """
+    # get_all and the batches must come from the same client as the references
+    db = get_db()
+    collection = db.collection(collection_name)
+    doc_refs = [collection.document(document[id_field]) for document in documents]
+    existing_ids = {snapshot.id async for snapshot in db.get_all(doc_refs) if snapshot.exists}
+    missing = [(doc_ref, document) for doc_ref, document in zip(doc_refs, documents, strict=True) if doc_ref.id not in existing_ids]
+    for start in range(0, len(missing), FIRESTORE_BATCH_LIMIT):
+        batch = db.batch()
+        for doc_ref, document in missing[start:start + FIRESTORE_BATCH_LIMIT]:
+            batch.set(doc_ref, _add_firestore_metadata(document))
+        await batch.commit()
+    return [document for _, document in missing]
+
+async def seed_agent_templates():
+    if not get_db_clients():
         logging.error("Firestore client not initialized, cannot seed templates.")
         return
 
@@ -446,16 +642,18 @@ def seed_agent_templates():
     ]
 
     logging.info(f"Seeding {len(templates_data)} agent templates...")
+    seeded = await _seed_missing_documents(AGENT_TEMPLATES_COLLECTION, 'template_id', templates_data)
+    if seeded:
+        invalidate_template_cache()
+    seeded_ids = {template['template_id'] for template in seeded}
     for template in templates_data:
-        doc_ref = db.collection(AGENT_TEMPLATES_COLLECTION).document(template['template_id'])
-        if not doc_ref.get().exists:
-            doc_ref.set(_add_firestore_metadata(template))
+        if template['template_id'] in seeded_ids:
             logging.info(f"Seeded template: {template['name']}")
         else:
             logging.info(f"Template '{template['name']}' already exists, skipping seeding.")
 
-def seed_users():
-    if not db:
+async def seed_users():
+    if not get_db_clients():
         logging.error("Firestore client not initialized, cannot seed users.")
         return
 
@@ -466,21 +664,32 @@ def seed_users():
     ]
 
     logging.info(f"Seeding {len(users_data)} users...")
+    seeded = await _seed_missing_documents(USERS_COLLECTION, 'user_id', users_data)
+    seeded_ids = {user['user_id'] for user in seeded}
+    for user_id in seeded_ids:
+        # Drop the default 'viewer' cached for a user looked up before it existed
+        invalidate_user_role(user_id)
     for user in users_data:
-        doc_ref = db.collection(USERS_COLLECTION).document(user['user_id'])
-        if not doc_ref.get().exists:
-            doc_ref.set(_add_firestore_metadata(user))
+        if user['user_id'] in seeded_ids:
             logging.info(f"Seeded user: {user['email']} with role {user['role']}")
         else:
             logging.info(f"User '{user['email']}' already exists, skipping seeding.")
 
-# Run seeding on app startup (for development/testing)
-with app.app_context():
-    if db:
-        seed_users()
-        seed_agent_templates()
-
-if __name__ == '__main__':
-    # For local development, use 'flask run' or a WSGI server like Gunicorn for production.
+async def seed_initial_data():
+    await seed_users()
+    await seed_agent_templates()
+
+if __name__ == '__main__' and sys.argv[1:] == ['seed']:
+    # Deploy-time seeding: python main.py seed
+    asyncio.run(seed_initial_data())
+elif __name__ == '__main__':
+    # Single-process server for local development only. Production runs under
+    # Gunicorn managing Uvicorn workers, one event loop per worker:
+    #   gunicorn -k uvicorn.workers.UvicornWorker -w $(($(nproc) * 2 + 1)) \
+    #       --bind 0.0.0.0:$PORT main:app
     # Ensure GOOGLE_APPLICATION_CREDENTIALS environment variable is set for local testing.
-    app.run(debug=True, host='0.0.0.0', port=int(os.environ.get('PORT', 8080)))
+    import uvicorn
+
+    development = os.environ.get('APP_ENV') == 'development'
+    uvicorn.run(app, host='0.0.0.0', port=int(os.environ.get('PORT', 8080)),
+                log_level='debug' if development else 'info')
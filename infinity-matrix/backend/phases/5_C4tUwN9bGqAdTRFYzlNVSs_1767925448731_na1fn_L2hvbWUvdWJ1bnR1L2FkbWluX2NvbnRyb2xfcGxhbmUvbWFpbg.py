@@ -1,13 +1,23 @@
 
+import atexit
+import bisect
 import hashlib
 import hmac
 import os
+import queue
+import threading
+import time
 from datetime import UTC, datetime
+from functools import wraps
 
 import firebase_admin
+import orjson
+from cachetools import TTLCache
 from evidence_pack_generator import EvidencePackGenerator
 from firebase_admin import credentials, firestore
-from flask import Flask, abort, jsonify, request
+from flask import Flask, abort, g, has_app_context, request
+from google.api_core.exceptions import AlreadyExists, NotFound
+from google.cloud import storage
 
 # Initialize Flask app
 app = Flask(__name__)
@@ -15,21 +25,20 @@ app = Flask(__name__)
 # Initialize Firebase Admin SDK
 def initialize_firebase():
     try:
-        # Load Firebase Admin SDK credentials from a JSON file
-        cred_path = os.environ.get("FIREBASE_ADMIN_SDK_PATH", "firebase_admin_config.json")
-        if not os.path.exists(cred_path):
-            raise FileNotFoundError(f"Firebase Admin SDK config file not found at {cred_path}")
-
-        cred = credentials.Certificate(cred_path)
-        firebase_admin.initialize_app(cred)
+        # Application Default Credentials (the metadata server on GCE/Cloud Run)
+        # unless a service account key file is explicitly configured
+        cred_path = os.environ.get("FIREBASE_ADMIN_SDK_PATH")
+        if cred_path:
+            if not os.path.exists(cred_path):
+                raise FileNotFoundError(f"Firebase Admin SDK config file not found at {cred_path}")
+            firebase_admin.initialize_app(credentials.Certificate(cred_path))
+        else:
+            firebase_admin.initialize_app()
         app.logger.info("Firebase Admin SDK initialized successfully.")
     except Exception as e:
         app.logger.error(f"Error initializing Firebase Admin SDK: {e}")
         raise
 
-initialize_firebase()
-db = firestore.client()
-
 # Configuration
 # This should ideally be loaded from environment variables or a secure config management system
 CONFIG = {
@@ -48,12 +57,110 @@ CONFIG = {
     "APP_LOGGER": app.logger # Pass app logger to generator
 }
 
-# Initialize Evidence Pack Generator
-evidence_pack_generator = EvidencePackGenerator(db, CONFIG["GCS_EVIDENCE_PACK_BUCKET"], CONFIG)
+# Firestore client and everything bound to it. These are created by
+# init_firestore() in each worker process, never at import, so a pre-forking
+# server does not hand inherited gRPC channels and threads to its workers.
+db = None
+evidence_pack_generator = None
+storage_client = None
+# Collection references, resolved once per process instead of per request
+CONTRACTS = None
+DEPLOYED_SERVICES = None
+CI_STATUSES = None
+AUTOPILOT_SETTINGS = None
+VISION_CORTEX_DATA = None
+EVIDENCE_PACKS = None
+AUDIT_LOGS = None
+RBAC_ROLES = None
+RBAC_USERS = None
+# Newest audit entries first; served by the automatic single-field index on timestamp
+AUDIT_LOG_QUERY = None
+# In-memory list views, see CollectionView
+CONTRACTS_VIEW = None
+DEPLOYED_SERVICES_VIEW = None
+CI_STATUSES_VIEW = None
+EVIDENCE_PACKS_VIEW = None
+RBAC_ROLES_VIEW = None
+RBAC_USERS_VIEW = None
+
+# The autopilot settings live in a single document with this fixed id
+AUTOPILOT_DOC_ID = "singleton"
+
+# Firestore's limit on writes per batch
+FIRESTORE_BATCH_LIMIT = 500
+
+# Page size bounds for list endpoints
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 500
 
 # Helper function for Firestore operations
+@app.before_request
+def stamp_request_time():
+    # One clock read per request, shared by every metadata and audit timestamp
+    g.request_now = datetime.now(UTC)
+
 def get_firestore_timestamp():
-    return datetime.now(UTC)
+    now = g.get("request_now") if has_app_context() else None
+    return now or datetime.now(UTC)
+
+def _json_default(value):
+    # orjson only serializes exact datetime instances, not subclasses such as
+    # the DatetimeWithNanoseconds values Firestore returns
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+def json_dumps(obj):
+    return orjson.dumps(obj, default=_json_default, option=orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS)
+
+# orjson-encoded replacement for jsonify
+def json_response(obj, status=200):
+    return app.response_class(json_dumps(obj), status=status, mimetype="application/json")
+
+# Clients may reuse a fetched document this long before revalidating with If-None-Match
+DOCUMENT_MAX_AGE = 30
+
+def document_etag(doc):
+    return doc.update_time.rfc3339()
+
+def get_document(doc_ref):
+    """Reads a document, skipping its fields when the client's cached copy is current.
+
+    With If-None-Match, a field-less read fetches only the update time; the
+    full document is read only if that does not match the client's ETag.
+    """
+    if request.if_none_match:
+        doc = doc_ref.get(field_paths=[])
+        if doc.exists and request.if_none_match.contains(document_etag(doc)):
+            return doc
+    return doc_ref.get()
+
+def document_response(doc):
+    """JSON response for a single document, or 304 if the client's copy is current.
+
+    The ETag is the document's update time, which Firestore changes on every write.
+    """
+    etag = document_etag(doc)
+    if request.if_none_match.contains(etag):
+        response = app.response_class(status=304)
+    else:
+        response = json_response({"id": doc.id, **doc.to_dict()})
+    response.set_etag(etag)
+    response.cache_control.private = True
+    response.cache_control.max_age = DOCUMENT_MAX_AGE
+    return response
+
+def get_json_body():
+    """Parses the request body once with orjson; None unless it is a JSON object.
+
+    The raw body is not cached on the request, and malformed bodies fall
+    through to each handler's own 400.
+    """
+    try:
+        data = orjson.loads(request.get_data(cache=False))
+    except orjson.JSONDecodeError:
+        return None
+    return data if isinstance(data, dict) else None
 
 def add_firestore_metadata(data):
     now = get_firestore_timestamp()
@@ -68,55 +175,323 @@ def update_firestore_metadata(data, provenance="api_update"):
     data["provenance"] = provenance
     return data
 
-def log_audit_event(actor, action, resource_type, resource_id, details=None):
-    audit_log_entry = {
-        "timestamp": get_firestore_timestamp(),
+def hash_contract_content(content):
+    # hashlib delegates to OpenSSL, which uses the SHA extensions (SHA-NI/ARMv8)
+    # when the CPU has them, and releases the GIL while hashing large bodies
+    if not isinstance(content, str):
+        abort(400, description="Contract content must be a string.")
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+def update_existing(doc_ref, data, not_found_message):
+    # update() fails with NotFound for a missing document, so no existence read is needed
+    try:
+        doc_ref.update(data)
+    except NotFound:
+        abort(404, description=not_found_message)
+
+def delete_existing(doc_ref, not_found_message):
+    # delete() is a no-op for missing documents unless it carries an exists precondition
+    try:
+        doc_ref.delete(option=db.write_option(exists=True))
+    except NotFound:
+        abort(404, description=not_found_message)
+
+def _page_args():
+    limit = min(max(request.args.get("limit", DEFAULT_PAGE_SIZE, type=int), 1), MAX_PAGE_SIZE)
+    fields = [field.strip() for field in request.args.get("fields", "").split(",") if field.strip()]
+    return limit, request.args.get("cursor"), fields
+
+def paginate(collection_ref, query=None):
+    """Returns one page of query (default: the whole collection) as {"items", "next_cursor"}.
+
+    Reads ?limit=, ?cursor= (the id of the last item of the previous page) and
+    ?fields= (comma-separated fields to project) from the request.
+    """
+    if query is None:
+        query = collection_ref
+    limit, cursor, fields = _page_args()
+    if fields:
+        query = query.select(fields)
+    query = query.limit(limit)
+
+    if cursor:
+        cursor_doc = collection_ref.document(cursor).get()
+        if not cursor_doc.exists:
+            abort(400, description=f"Invalid cursor: {cursor}")
+        query = query.start_after(cursor_doc)
+
+    items = [{"id": doc.id, **doc.to_dict()} for doc in query.stream()]
+    return {"items": items, "next_cursor": items[-1]["id"] if len(items) == limit else None}
+
+class CollectionView:
+    """In-memory copy of a collection, kept current by a Firestore snapshot listener.
+
+    page() serves the same pages as paginate() without any Firestore read, and
+    falls back to paginate() until the first snapshot arrives or while the
+    listener is down. Only suitable for small and medium collections.
+    """
+
+    def __init__(self, collection_ref):
+        self._collection_ref = collection_ref
+        self._docs = {}
+        self._sorted_ids = None
+        self._lock = threading.Lock()
+        self._restart_lock = threading.Lock()
+        self._ready = False
+        self._watch = self._collection_ref.on_snapshot(self._on_snapshot)
+
+    def _on_snapshot(self, snapshots, changes, read_time):
+        with self._lock:
+            if not self._ready:
+                # The first snapshot of a listener carries the whole collection
+                self._docs = {doc.id: doc.to_dict() for doc in snapshots}
+            else:
+                for change in changes:
+                    if change.type.name == "REMOVED":
+                        self._docs.pop(change.document.id, None)
+                    else:
+                        self._docs[change.document.id] = change.document.to_dict()
+            self._sorted_ids = None
+            self._ready = True
+
+    def _restart_if_stopped(self):
+        if self._watch.is_active:
+            return
+        with self._restart_lock:
+            if self._watch.is_active:
+                return
+            app.logger.warning(f"Snapshot listener for {self._collection_ref.id} stopped, restarting it")
+            self._watch.unsubscribe()
+            with self._lock:
+                self._ready = False
+            self._watch = self._collection_ref.on_snapshot(self._on_snapshot)
+
+    def page(self):
+        self._restart_if_stopped()
+        limit, cursor, fields = _page_args()
+        # Dotted field paths are only projected by Firestore itself
+        if not self._ready or any("." in field for field in fields):
+            return paginate(self._collection_ref)
+
+        with self._lock:
+            if self._sorted_ids is None:
+                # Matches Firestore's default document id ordering
+                self._sorted_ids = sorted(self._docs)
+            sorted_ids = self._sorted_ids
+            start = 0
+            if cursor:
+                if cursor not in self._docs:
+                    abort(400, description=f"Invalid cursor: {cursor}")
+                start = bisect.bisect_right(sorted_ids, cursor)
+            page_ids = sorted_ids[start:start + limit]
+            docs = [(doc_id, self._docs[doc_id]) for doc_id in page_ids]
+
+        if fields:
+            items = [{"id": doc_id, **{field: data[field] for field in fields if field in data}} for doc_id, data in docs]
+        else:
+            items = [{"id": doc_id, **data} for doc_id, data in docs]
+        return {"items": items, "next_cursor": items[-1]["id"] if len(items) == limit else None}
+
+# Audit events are queued and written by a background thread in batches, so
+# requests do not wait on the audit write
+AUDIT_QUEUE_MAXSIZE = 10000
+AUDIT_BATCH_SIZE = FIRESTORE_BATCH_LIMIT
+AUDIT_FLUSH_INTERVAL = 0.1 # Seconds to wait for a batch to fill
+
+_audit_queue = queue.Queue(maxsize=AUDIT_QUEUE_MAXSIZE)
+
+def make_audit_entry(actor, action, resource_type, resource_id, details=None):
+    now = get_firestore_timestamp()
+    return {
+        "timestamp": now,
         "actor": actor,
         "action": action,
         "resource_type": resource_type,
         "resource_id": resource_id,
         "details": details if details is not None else {},
         "schema_version": CONFIG["DEFAULT_SCHEMA_VERSION"],
-        "created_at": get_firestore_timestamp(),
-        "updated_at": get_firestore_timestamp(),
+        "created_at": now,
+        "updated_at": now,
         "provenance": "audit_system"
     }
+
+def log_audit_event(actor, action, resource_type, resource_id, details=None):
+    audit_log_entry = make_audit_entry(actor, action, resource_type, resource_id, details)
+    try:
+        _audit_queue.put_nowait(audit_log_entry)
+    except queue.Full:
+        app.logger.error(f"Audit queue full, dropping audit event: {action} {resource_type}/{resource_id} by {actor}")
+
+def _write_audit_batch(entries):
+    batch = db.batch()
+    for entry in entries:
+        batch.set(AUDIT_LOGS.document(), entry)
     try:
-        db.collection(CONFIG["AUDIT_LOG_COLLECTION"]).add(audit_log_entry)
+        batch.commit()
     except Exception as e:
-        app.logger.error(f"Failed to write audit log: {e}")
+        app.logger.error(f"Failed to write {len(entries)} audit log entries: {e}")
+
+def _next_batch(items, batch_size, flush_interval):
+    """Blocks for one item, then collects more until the batch is full or the interval ends."""
+    batch = [items.get()]
+    deadline = time.monotonic() + flush_interval
+    while len(batch) < batch_size:
+        timeout = deadline - time.monotonic()
+        if timeout <= 0:
+            break
+        try:
+            batch.append(items.get(timeout=timeout))
+        except queue.Empty:
+            break
+    return batch
+
+def _drain(items, batch_size, write_batch):
+    # Writers are daemon threads, so at exit write whatever they have not picked up yet
+    batch = []
+    while True:
+        try:
+            batch.append(items.get_nowait())
+        except queue.Empty:
+            break
+        if len(batch) == batch_size:
+            write_batch(batch)
+            batch = []
+    if batch:
+        write_batch(batch)
+
+def _audit_writer():
+    while True:
+        _write_audit_batch(_next_batch(_audit_queue, AUDIT_BATCH_SIZE, AUDIT_FLUSH_INTERVAL))
+
+@atexit.register
+def _flush_audit_queue():
+    _drain(_audit_queue, AUDIT_BATCH_SIZE, _write_audit_batch)
+
+_init_lock = threading.Lock()
+_init_pid = None
+
+def init_firestore():
+    """Creates the Firestore client and everything bound to it, once per process."""
+    global _init_pid, db, evidence_pack_generator, storage_client, AUDIT_LOG_QUERY
+    global CONTRACTS, DEPLOYED_SERVICES, CI_STATUSES, AUTOPILOT_SETTINGS, VISION_CORTEX_DATA
+    global EVIDENCE_PACKS, AUDIT_LOGS, RBAC_ROLES, RBAC_USERS
+    global CONTRACTS_VIEW, DEPLOYED_SERVICES_VIEW, CI_STATUSES_VIEW, EVIDENCE_PACKS_VIEW
+    global RBAC_ROLES_VIEW, RBAC_USERS_VIEW
+    if _init_pid == os.getpid():
+        return
+    with _init_lock:
+        if _init_pid == os.getpid():
+            return
+        if not firebase_admin._apps:
+            initialize_firebase()
+        db = firestore.client()
+
+        CONTRACTS = db.collection(CONFIG["CONTRACTS_COLLECTION"])
+        DEPLOYED_SERVICES = db.collection(CONFIG["DEPLOYED_SERVICES_COLLECTION"])
+        CI_STATUSES = db.collection(CONFIG["CI_STATUS_COLLECTION"])
+        AUTOPILOT_SETTINGS = db.collection(CONFIG["AUTOPILOT_SETTINGS_COLLECTION"])
+        VISION_CORTEX_DATA = db.collection(CONFIG["VISION_CORTEX_DATA_COLLECTION"])
+        EVIDENCE_PACKS = db.collection(CONFIG["EVIDENCE_PACKS_COLLECTION"])
+        AUDIT_LOGS = db.collection(CONFIG["AUDIT_LOG_COLLECTION"])
+        RBAC_ROLES = db.collection(CONFIG["RBAC_ROLES_COLLECTION"])
+        RBAC_USERS = db.collection(CONFIG["RBAC_USERS_COLLECTION"])
+        AUDIT_LOG_QUERY = AUDIT_LOGS.order_by("timestamp", direction=firestore.Query.DESCENDING)
+
+        # List endpoints for these collections are served from memory; audit logs and
+        # vision cortex data can grow without bound and keep reading Firestore
+        CONTRACTS_VIEW = CollectionView(CONTRACTS)
+        DEPLOYED_SERVICES_VIEW = CollectionView(DEPLOYED_SERVICES)
+        CI_STATUSES_VIEW = CollectionView(CI_STATUSES)
+        EVIDENCE_PACKS_VIEW = CollectionView(EVIDENCE_PACKS)
+        RBAC_ROLES_VIEW = CollectionView(RBAC_ROLES)
+        RBAC_USERS_VIEW = CollectionView(RBAC_USERS)
+
+        evidence_pack_generator = EvidencePackGenerator(db, CONFIG["GCS_EVIDENCE_PACK_BUCKET"], CONFIG)
+        storage_client = storage.Client()
+        threading.Thread(target=_audit_writer, name="audit-writer", daemon=True).start()
+        threading.Thread(target=_ci_status_writer, name="ci-status-writer", daemon=True).start()
+        _init_pid = os.getpid()
+
+# Runs lazily on the first request in each process; under gunicorn,
+# gunicorn_conf.py calls it when each worker starts instead
+app.before_request(init_firestore)
+
+# RBAC lookup caches. Role assignments and role permissions change rarely, so
+# each worker keeps them for a short TTL instead of reading Firestore on every
+# request. The RBAC write endpoints invalidate entries in this process; other
+# workers pick up changes once the TTL expires.
+_user_roles_cache = TTLCache(maxsize=4096, ttl=30)
+_role_permissions_cache = TTLCache(maxsize=1024, ttl=60)
+_rbac_cache_lock = threading.RLock()
+
+def get_user_roles(user_id):
+    """Returns the user's role ids, or None if the user has no RBAC record."""
+    with _rbac_cache_lock:
+        roles = _user_roles_cache.get(user_id)
+    if roles is not None:
+        return roles
+    user_doc = RBAC_USERS.document(user_id).get()
+    if not user_doc.exists:
+        return None
+    roles = tuple(user_doc.to_dict().get("roles", []))
+    with _rbac_cache_lock:
+        _user_roles_cache[user_id] = roles
+    return roles
+
+def get_roles_permissions(role_ids):
+    """Returns {role_id: frozenset of (resource, action) pairs} for the given roles.
+
+    Roles missing from the cache are fetched together in one get_all() call;
+    unknown roles map to an empty set.
+    """
+    with _rbac_cache_lock:
+        permissions = {role_id: _role_permissions_cache.get(role_id) for role_id in role_ids}
+    missing = [role_id for role_id, perms in permissions.items() if perms is None]
+    if missing:
+        fetched = {role_id: frozenset() for role_id in missing}
+        for role_doc in db.get_all([RBAC_ROLES.document(role_id) for role_id in missing]):
+            if role_doc.exists:
+                fetched[role_doc.id] = frozenset(
+                    (perm.get("resource"), perm.get("action")) for perm in role_doc.to_dict().get("permissions", [])
+                )
+        with _rbac_cache_lock:
+            _role_permissions_cache.update(fetched)
+        permissions.update(fetched)
+    return permissions
+
+def invalidate_user_roles(user_id):
+    with _rbac_cache_lock:
+        _user_roles_cache.pop(user_id, None)
+
+def invalidate_role_permissions(role_id):
+    with _rbac_cache_lock:
+        _role_permissions_cache.pop(role_id, None)
+
+ANONYMOUS = "anonymous"
+
+@app.before_request
+def load_user_id():
+    # In a real application, you would get the user\'s ID from the authenticated token
+    # For this example, we\'ll assume a user ID is passed in a header or context
+    g.user_id = request.headers.get("X-User-ID", ANONYMOUS) # Placeholder
 
 # RBAC Middleware (simplified for demonstration)
 def rbac_required(resource, action):
     def decorator(f):
+        @wraps(f)
         def wrapper(*args, **kwargs):
-            # In a real application, you would get the user\'s ID from the authenticated token
-            # For this example, we\'ll assume a user ID is passed in a header or context
-            user_id = request.headers.get("X-User-ID", "anonymous") # Placeholder
-
-            if user_id == "anonymous":
+            user_id = g.user_id
+            if user_id == ANONYMOUS:
                 abort(401, description="Authentication required.")
 
             # Fetch user\'s roles
-            user_doc = db.collection(CONFIG["RBAC_USERS_COLLECTION"]).document(user_id).get()
-            if not user_doc.exists:
+            user_roles = get_user_roles(user_id)
+            if user_roles is None:
                 abort(403, description="User not found or no roles assigned.")
-            user_roles = user_doc.to_dict().get("roles", [])
 
             # Check if any of the user\'s roles have the required permission
-            has_permission = False
-            for role_id in user_roles:
-                role_doc = db.collection(CONFIG["RBAC_ROLES_COLLECTION"]).document(role_id).get()
-                if role_doc.exists:
-                    permissions = role_doc.to_dict().get("permissions", [])
-                    for perm in permissions:
-                        if perm.get("resource") == resource and perm.get("action") == action:
-                            has_permission = True
-                            break
-                if has_permission:
-                    break
-
-            if not has_permission:
+            required = (resource, action)
+            if not any(required in perms for perms in get_roles_permissions(user_roles).values()):
                 abort(403, description=f"Permission denied: Requires {action} on {resource}.")
 
             return f(*args, **kwargs)
@@ -126,24 +501,28 @@ def rbac_required(resource, action):
 # Error Handling
 @app.errorhandler(400)
 def bad_request(error):
-    return jsonify({"code": 400, "message": error.description}), 400
+    return json_response({"code": 400, "message": error.description}, 400)
 
 @app.errorhandler(401)
 def unauthorized(error):
-    return jsonify({"code": 401, "message": error.description}), 401
+    return json_response({"code": 401, "message": error.description}, 401)
 
 @app.errorhandler(403)
 def forbidden(error):
-    return jsonify({"code": 403, "message": error.description}), 403
+    return json_response({"code": 403, "message": error.description}, 403)
 
 @app.errorhandler(404)
 def not_found(error):
-    return jsonify({"code": 404, "message": error.description}), 404
+    return json_response({"code": 404, "message": error.description}, 404)
+
+@app.errorhandler(503)
+def service_unavailable(error):
+    return json_response({"code": 503, "message": error.description}, 503)
 
 @app.errorhandler(500)
 def internal_server_error(error):
     app.logger.exception("Internal Server Error")
-    return jsonify({"code": 500, "message": "Internal Server Error"}), 500
+    return json_response({"code": 500, "message": "Internal Server Error"}, 500)
 
 # --- API Endpoints ---
 
@@ -151,282 +530,266 @@ def internal_server_error(error):
 @app.route("/contracts", methods=["GET"])
 @rbac_required("contracts", "read")
 def get_contracts():
-    contracts_ref = db.collection(CONFIG["CONTRACTS_COLLECTION"])
-    contracts = [doc.to_dict() for doc in contracts_ref.stream()]
-    log_audit_event(request.headers.get("X-User-ID", "anonymous"), "read", "contracts", "all")
-    return jsonify(contracts)
+    contracts = CONTRACTS_VIEW.page()
+    log_audit_event(g.user_id, "read", "contracts", "all")
+    return json_response(contracts)
 
 @app.route("/contracts", methods=["POST"])
 @rbac_required("contracts", "write")
 def create_contract():
-    data = request.get_json()
+    data = get_json_body()
     if not data or "name" not in data or "content" not in data:
         abort(400, description="Missing contract name or content.")
 
     # Calculate SHA-256 hash
-    content_hash = hashlib.sha256(data["content"].encode("utf-8")).hexdigest()
-    data["hash_value"] = content_hash
+    data["hash_value"] = hash_contract_content(data["content"])
     data["sha_validation"] = True # Assuming valid on creation
 
     data = add_firestore_metadata(data)
-    _, doc_ref = db.collection(CONFIG["CONTRACTS_COLLECTION"]).add(data)
-    log_audit_event(request.headers.get("X-User-ID", "anonymous"), "create", "contracts", doc_ref.id, data)
-    return jsonify({"id": doc_ref.id, **data}), 201
+    _, doc_ref = CONTRACTS.add(data)
+    log_audit_event(g.user_id, "create", "contracts", doc_ref.id, data)
+    return json_response({"id": doc_ref.id, **data}, 201)
 
 @app.route("/contracts/<string:contract_id>", methods=["GET"])
 @rbac_required("contracts", "read")
 def get_contract_by_id(contract_id):
-    contract_doc = db.collection(CONFIG["CONTRACTS_COLLECTION"]).document(contract_id).get()
+    contract_doc = get_document(CONTRACTS.document(contract_id))
     if not contract_doc.exists:
         abort(404, description="Contract not found.")
-    log_audit_event(request.headers.get("X-User-ID", "anonymous"), "read", "contracts", contract_id)
-    return jsonify({"id": contract_doc.id, **contract_doc.to_dict()})
+    log_audit_event(g.user_id, "read", "contracts", contract_id)
+    return document_response(contract_doc)
 
 @app.route("/contracts/<string:contract_id>", methods=["PUT"])
 @rbac_required("contracts", "write")
 def update_contract_by_id(contract_id):
-    data = request.get_json()
+    data = get_json_body()
     if not data:
         abort(400, description="No data provided for update.")
 
-    contract_ref = db.collection(CONFIG["CONTRACTS_COLLECTION"]).document(contract_id)
-    contract_doc = contract_ref.get()
-    if not contract_doc.exists:
-        abort(404, description="Contract not found.")
+    contract_ref = CONTRACTS.document(contract_id)
 
     # Update SHA-256 hash if content is updated
     if "content" in data:
-        content_hash = hashlib.sha256(data["content"].encode("utf-8")).hexdigest()
-        data["hash_value"] = content_hash
+        data["hash_value"] = hash_contract_content(data["content"])
         data["sha_validation"] = True # Re-validate on content update
 
     data = update_firestore_metadata(data)
-    contract_ref.update(data)
-    log_audit_event(request.headers.get("X-User-ID", "anonymous"), "update", "contracts", contract_id, data)
-    return jsonify({"id": contract_id, **data})
+    update_existing(contract_ref, data, "Contract not found.")
+    log_audit_event(g.user_id, "update", "contracts", contract_id, data)
+    return json_response({"id": contract_id, **data})
 
 @app.route("/contracts/<string:contract_id>", methods=["DELETE"])
 @rbac_required("contracts", "delete")
 def delete_contract_by_id(contract_id):
-    contract_ref = db.collection(CONFIG["CONTRACTS_COLLECTION"]).document(contract_id)
-    if not contract_ref.get().exists:
-        abort(404, description="Contract not found.")
-    contract_ref.delete()
-    log_audit_event(request.headers.get("X-User-ID", "anonymous"), "delete", "contracts", contract_id)
+    contract_ref = CONTRACTS.document(contract_id)
+    delete_existing(contract_ref, "Contract not found.")
+    log_audit_event(g.user_id, "delete", "contracts", contract_id)
     return "", 204
 
 # Deployed Services
 @app.route("/deployed-services", methods=["GET"])
 @rbac_required("deployed_services", "read")
 def get_deployed_services():
-    services_ref = db.collection(CONFIG["DEPLOYED_SERVICES_COLLECTION"])
-    services = [doc.to_dict() for doc in services_ref.stream()]
-    log_audit_event(request.headers.get("X-User-ID", "anonymous"), "read", "deployed_services", "all")
-    return jsonify(services)
+    services = DEPLOYED_SERVICES_VIEW.page()
+    log_audit_event(g.user_id, "read", "deployed_services", "all")
+    return json_response(services)
 
 @app.route("/deployed-services", methods=["POST"])
 @rbac_required("deployed_services", "write")
 def create_deployed_service():
-    data = request.get_json()
+    data = get_json_body()
     if not data or "service_name" not in data or "project_id" not in data or "region" not in data:
         abort(400, description="Missing service_name, project_id, or region.")
     data = add_firestore_metadata(data)
-    _, doc_ref = db.collection(CONFIG["DEPLOYED_SERVICES_COLLECTION"]).add(data)
-    log_audit_event(request.headers.get("X-User-ID", "anonymous"), "create", "deployed_services", doc_ref.id, data)
-    return jsonify({"id": doc_ref.id, **data}), 201
+    _, doc_ref = DEPLOYED_SERVICES.add(data)
+    log_audit_event(g.user_id, "create", "deployed_services", doc_ref.id, data)
+    return json_response({"id": doc_ref.id, **data}, 201)
 
 @app.route("/deployed-services/<string:service_id>", methods=["GET"])
 @rbac_required("deployed_services", "read")
 def get_deployed_service_by_id(service_id):
-    service_doc = db.collection(CONFIG["DEPLOYED_SERVICES_COLLECTION"]).document(service_id).get()
+    service_doc = get_document(DEPLOYED_SERVICES.document(service_id))
     if not service_doc.exists:
         abort(404, description="Deployed service not found.")
-    log_audit_event(request.headers.get("X-User-ID", "anonymous"), "read", "deployed_services", service_id)
-    return jsonify({"id": service_doc.id, **service_doc.to_dict()})
+    log_audit_event(g.user_id, "read", "deployed_services", service_id)
+    return document_response(service_doc)
 
 @app.route("/deployed-services/<string:service_id>", methods=["PUT"])
 @rbac_required("deployed_services", "write")
 def update_deployed_service_by_id(service_id):
-    data = request.get_json()
+    data = get_json_body()
     if not data:
         abort(400, description="No data provided for update.")
-    service_ref = db.collection(CONFIG["DEPLOYED_SERVICES_COLLECTION"]).document(service_id)
-    if not service_ref.get().exists:
-        abort(404, description="Deployed service not found.")
+    service_ref = DEPLOYED_SERVICES.document(service_id)
     data = update_firestore_metadata(data)
-    service_ref.update(data)
-    log_audit_event(request.headers.get("X-User-ID", "anonymous"), "update", "deployed_services", service_id, data)
-    return jsonify({"id": service_id, **data})
+    update_existing(service_ref, data, "Deployed service not found.")
+    log_audit_event(g.user_id, "update", "deployed_services", service_id, data)
+    return json_response({"id": service_id, **data})
 
 @app.route("/deployed-services/<string:service_id>", methods=["DELETE"])
 @rbac_required("deployed_services", "delete")
 def delete_deployed_service_by_id(service_id):
-    service_ref = db.collection(CONFIG["DEPLOYED_SERVICES_COLLECTION"]).document(service_id)
-    if not service_ref.get().exists:
-        abort(404, description="Deployed service not found.")
-    service_ref.delete()
-    log_audit_event(request.headers.get("X-User-ID", "anonymous"), "delete", "deployed_services", service_id)
+    service_ref = DEPLOYED_SERVICES.document(service_id)
+    delete_existing(service_ref, "Deployed service not found.")
+    log_audit_event(g.user_id, "delete", "deployed_services", service_id)
     return "", 204
 
 # CI Status
 @app.route("/ci-status", methods=["GET"])
 @rbac_required("ci_status", "read")
 def get_ci_statuses():
-    ci_status_ref = db.collection(CONFIG["CI_STATUS_COLLECTION"])
-    statuses = [doc.to_dict() for doc in ci_status_ref.stream()]
-    log_audit_event(request.headers.get("X-User-ID", "anonymous"), "read", "ci_status", "all")
-    return jsonify(statuses)
+    statuses = CI_STATUSES_VIEW.page()
+    log_audit_event(g.user_id, "read", "ci_status", "all")
+    return json_response(statuses)
 
 @app.route("/ci-status", methods=["POST"])
 @rbac_required("ci_status", "write")
 def create_ci_status():
-    data = request.get_json()
+    data = get_json_body()
     if not data or "workflow_name" not in data or "repository" not in data:
         abort(400, description="Missing workflow_name or repository.")
     data = add_firestore_metadata(data)
-    _, doc_ref = db.collection(CONFIG["CI_STATUS_COLLECTION"]).add(data)
-    log_audit_event(request.headers.get("X-User-ID", "anonymous"), "create", "ci_status", doc_ref.id, data)
-    return jsonify({"id": doc_ref.id, **data}), 201
+    _, doc_ref = CI_STATUSES.add(data)
+    log_audit_event(g.user_id, "create", "ci_status", doc_ref.id, data)
+    return json_response({"id": doc_ref.id, **data}, 201)
 
 @app.route("/ci-status/<string:ci_status_id>", methods=["GET"])
 @rbac_required("ci_status", "read")
 def get_ci_status_by_id(ci_status_id):
-    ci_status_doc = db.collection(CONFIG["CI_STATUS_COLLECTION"]).document(ci_status_id).get()
+    ci_status_doc = get_document(CI_STATUSES.document(ci_status_id))
     if not ci_status_doc.exists:
         abort(404, description="CI Status not found.")
-    log_audit_event(request.headers.get("X-User-ID", "anonymous"), "read", "ci_status", ci_status_id)
-    return jsonify({"id": ci_status_doc.id, **ci_status_doc.to_dict()})
+    log_audit_event(g.user_id, "read", "ci_status", ci_status_id)
+    return document_response(ci_status_doc)
 
 @app.route("/ci-status/<string:ci_status_id>", methods=["PUT"])
 @rbac_required("ci_status", "write")
 def update_ci_status_by_id(ci_status_id):
-    data = request.get_json()
+    data = get_json_body()
     if not data:
         abort(400, description="No data provided for update.")
-    ci_status_ref = db.collection(CONFIG["CI_STATUS_COLLECTION"]).document(ci_status_id)
-    if not ci_status_ref.get().exists:
-        abort(404, description="CI Status not found.")
+    ci_status_ref = CI_STATUSES.document(ci_status_id)
     data = update_firestore_metadata(data)
-    ci_status_ref.update(data)
-    log_audit_event(request.headers.get("X-User-ID", "anonymous"), "update", "ci_status", ci_status_id, data)
-    return jsonify({"id": ci_status_id, **data})
+    update_existing(ci_status_ref, data, "CI Status not found.")
+    log_audit_event(g.user_id, "update", "ci_status", ci_status_id, data)
+    return json_response({"id": ci_status_id, **data})
 
 @app.route("/ci-status/<string:ci_status_id>", methods=["DELETE"])
 @rbac_required("ci_status", "delete")
 def delete_ci_status_by_id(ci_status_id):
-    ci_status_ref = db.collection(CONFIG["CI_STATUS_COLLECTION"]).document(ci_status_id)
-    if not ci_status_ref.get().exists:
-        abort(404, description="CI Status not found.")
-    ci_status_ref.delete()
-    log_audit_event(request.headers.get("X-User-ID", "anonymous"), "delete", "ci_status", ci_status_id)
+    ci_status_ref = CI_STATUSES.document(ci_status_id)
+    delete_existing(ci_status_ref, "CI Status not found.")
+    log_audit_event(g.user_id, "delete", "ci_status", ci_status_id)
     return "", 204
 
 # Autopilot Settings
 @app.route("/autopilot-settings", methods=["GET"])
 @rbac_required("autopilot_settings", "read")
 def get_autopilot_settings():
-    # Assuming there\'s only one autopilot settings document, or we fetch the latest
-    settings_ref = db.collection(CONFIG["AUTOPILOT_SETTINGS_COLLECTION"])
-    settings_doc = next(settings_ref.limit(1).stream(), None)
+    settings_doc = get_document(AUTOPILOT_SETTINGS.document(AUTOPILOT_DOC_ID))
+    if not settings_doc.exists:
+        # Settings written before the fixed id was introduced
+        settings_doc = next(AUTOPILOT_SETTINGS.limit(1).stream(), None)
     if not settings_doc:
         abort(404, description="Autopilot settings not found.")
-    log_audit_event(request.headers.get("X-User-ID", "anonymous"), "read", "autopilot_settings", settings_doc.id)
-    return jsonify({"id": settings_doc.id, **settings_doc.to_dict()})
+    log_audit_event(g.user_id, "read", "autopilot_settings", settings_doc.id)
+    return document_response(settings_doc)
 
 @app.route("/autopilot-settings", methods=["PUT"])
 @rbac_required("autopilot_settings", "write")
 def update_autopilot_settings():
-    data = request.get_json()
+    data = get_json_body()
     if not data or "mode" not in data or "kill_switch_active" not in data:
         abort(400, description="Missing mode or kill_switch_active.")
 
-    settings_ref = db.collection(CONFIG["AUTOPILOT_SETTINGS_COLLECTION"])
-    settings_doc = next(settings_ref.limit(1).stream(), None)
-
-    if settings_doc:
+    settings_ref = AUTOPILOT_SETTINGS.document(AUTOPILOT_DOC_ID)
+    try:
         # Update existing document
-        settings_id = settings_doc.id
-        data = update_firestore_metadata(data, provenance="api_update")
-        settings_ref.document(settings_id).update(data)
-        log_audit_event(request.headers.get("X-User-ID", "anonymous"), "update", "autopilot_settings", settings_id, data)
-        return jsonify({"id": settings_id, **data})
-    else:
-        # Create new document if none exists
-        data = add_firestore_metadata(data)
-        _, doc_ref = settings_ref.add(data)
-        log_audit_event(request.headers.get("X-User-ID", "anonymous"), "create", "autopilot_settings", doc_ref.id, data)
-        return jsonify({"id": doc_ref.id, **data}), 201
+        update_data = update_firestore_metadata(dict(data), provenance="api_update")
+        settings_ref.update(update_data)
+        log_audit_event(g.user_id, "update", "autopilot_settings", AUTOPILOT_DOC_ID, update_data)
+        return json_response({"id": AUTOPILOT_DOC_ID, **update_data})
+    except NotFound:
+        pass
+
+    # Create the document if none exists
+    create_data = add_firestore_metadata(dict(data))
+    try:
+        settings_ref.create(create_data)
+    except AlreadyExists:
+        # A concurrent request created it first; apply this one as an update
+        update_data = update_firestore_metadata(dict(data), provenance="api_update")
+        settings_ref.update(update_data)
+        log_audit_event(g.user_id, "update", "autopilot_settings", AUTOPILOT_DOC_ID, update_data)
+        return json_response({"id": AUTOPILOT_DOC_ID, **update_data})
+    log_audit_event(g.user_id, "create", "autopilot_settings", AUTOPILOT_DOC_ID, create_data)
+    return json_response({"id": AUTOPILOT_DOC_ID, **create_data}, 201)
 
 # Vision Cortex Data
 @app.route("/vision-cortex-data", methods=["GET"])
 @rbac_required("vision_cortex_data", "read")
 def get_vision_cortex_data():
-    vc_data_ref = db.collection(CONFIG["VISION_CORTEX_DATA_COLLECTION"])
-    data = [doc.to_dict() for doc in vc_data_ref.stream()]
-    log_audit_event(request.headers.get("X-User-ID", "anonymous"), "read", "vision_cortex_data", "all")
-    return jsonify(data)
+    vc_data_ref = VISION_CORTEX_DATA
+    data = paginate(vc_data_ref)
+    log_audit_event(g.user_id, "read", "vision_cortex_data", "all")
+    return json_response(data)
 
 @app.route("/vision-cortex-data", methods=["POST"])
 @rbac_required("vision_cortex_data", "write")
 def create_vision_cortex_data():
-    data = request.get_json()
+    data = get_json_body()
     if not data or "data_type" not in data or "payload" not in data:
         abort(400, description="Missing data_type or payload.")
     data = add_firestore_metadata(data)
-    _, doc_ref = db.collection(CONFIG["VISION_CORTEX_DATA_COLLECTION"]).add(data)
-    log_audit_event(request.headers.get("X-User-ID", "anonymous"), "create", "vision_cortex_data", doc_ref.id, data)
-    return jsonify({"id": doc_ref.id, **data}), 201
+    _, doc_ref = VISION_CORTEX_DATA.add(data)
+    log_audit_event(g.user_id, "create", "vision_cortex_data", doc_ref.id, data)
+    return json_response({"id": doc_ref.id, **data}, 201)
 
 @app.route("/vision-cortex-data/<string:data_id>", methods=["GET"])
 @rbac_required("vision_cortex_data", "read")
 def get_vision_cortex_data_by_id(data_id):
-    vc_data_doc = db.collection(CONFIG["VISION_CORTEX_DATA_COLLECTION"]).document(data_id).get()
+    vc_data_doc = get_document(VISION_CORTEX_DATA.document(data_id))
     if not vc_data_doc.exists:
         abort(404, description="Vision Cortex data not found.")
-    log_audit_event(request.headers.get("X-User-ID", "anonymous"), "read", "vision_cortex_data", data_id)
-    return jsonify({"id": vc_data_doc.id, **vc_data_doc.to_dict()})
+    log_audit_event(g.user_id, "read", "vision_cortex_data", data_id)
+    return document_response(vc_data_doc)
 
 @app.route("/vision-cortex-data/<string:data_id>", methods=["PUT"])
 @rbac_required("vision_cortex_data", "write")
 def update_vision_cortex_data_by_id(data_id):
-    data = request.get_json()
+    data = get_json_body()
     if not data:
         abort(400, description="No data provided for update.")
-    vc_data_ref = db.collection(CONFIG["VISION_CORTEX_DATA_COLLECTION"]).document(data_id)
-    if not vc_data_ref.get().exists:
-        abort(404, description="Vision Cortex data not found.")
+    vc_data_ref = VISION_CORTEX_DATA.document(data_id)
     data = update_firestore_metadata(data)
-    vc_data_ref.update(data)
-    log_audit_event(request.headers.get("X-User-ID", "anonymous"), "update", "vision_cortex_data", data_id, data)
-    return jsonify({"id": data_id, **data})
+    update_existing(vc_data_ref, data, "Vision Cortex data not found.")
+    log_audit_event(g.user_id, "update", "vision_cortex_data", data_id, data)
+    return json_response({"id": data_id, **data})
 
 @app.route("/vision-cortex-data/<string:data_id>", methods=["DELETE"])
 @rbac_required("vision_cortex_data", "delete")
 def delete_vision_cortex_data_by_id(data_id):
-    vc_data_ref = db.collection(CONFIG["VISION_CORTEX_DATA_COLLECTION"]).document(data_id)
-    if not vc_data_ref.get().exists:
-        abort(404, description="Vision Cortex data not found.")
-    vc_data_ref.delete()
-    log_audit_event(request.headers.get("X-User-ID", "anonymous"), "delete", "vision_cortex_data", data_id)
+    vc_data_ref = VISION_CORTEX_DATA.document(data_id)
+    delete_existing(vc_data_ref, "Vision Cortex data not found.")
+    log_audit_event(g.user_id, "delete", "vision_cortex_data", data_id)
     return "", 204
 
 # Evidence Packs
 @app.route("/evidence-packs", methods=["GET"])
 @rbac_required("evidence_packs", "read")
 def get_evidence_packs():
-    packs_ref = db.collection(CONFIG["EVIDENCE_PACKS_COLLECTION"])
-    packs = [doc.to_dict() for doc in packs_ref.stream()]
-    log_audit_event(request.headers.get("X-User-ID", "anonymous"), "read", "evidence_packs", "all")
-    return jsonify(packs)
+    packs = EVIDENCE_PACKS_VIEW.page()
+    log_audit_event(g.user_id, "read", "evidence_packs", "all")
+    return json_response(packs)
 
 @app.route("/evidence-packs", methods=["POST"])
 @rbac_required("evidence_packs", "write")
 def create_evidence_pack():
-    data = request.get_json()
+    data = get_json_body()
     if not data or "pack_name" not in data:
         abort(400, description="Missing pack_name.")
 
-    actor = request.headers.get("X-User-ID", "anonymous")
+    actor = g.user_id
     data_query_params = data.get("data_query_params")
     expiration_days = data.get("expiration_days", 7)
 
@@ -438,7 +801,7 @@ def create_evidence_pack():
             expiration_days=expiration_days
         )
         log_audit_event(actor, "create", "evidence_packs", pack_info["id"], pack_info)
-        return jsonify(pack_info), 201
+        return json_response(pack_info, 201)
     except Exception as e:
         app.logger.error(f"Error generating evidence pack: {e}")
         abort(500, description=f"Failed to generate evidence pack: {e}")
@@ -446,11 +809,11 @@ def create_evidence_pack():
 @app.route("/evidence-packs/<string:pack_id>", methods=["GET"])
 @rbac_required("evidence_packs", "read")
 def get_evidence_pack_by_id(pack_id):
-    pack_doc = db.collection(CONFIG["EVIDENCE_PACKS_COLLECTION"]).document(pack_id).get()
+    pack_doc = get_document(EVIDENCE_PACKS.document(pack_id))
     if not pack_doc.exists:
         abort(404, description="Evidence pack not found.")
-    log_audit_event(request.headers.get("X-User-ID", "anonymous"), "read", "evidence_packs", pack_id)
-    return jsonify({"id": pack_doc.id, **pack_doc.to_dict()})
+    log_audit_event(g.user_id, "read", "evidence_packs", pack_id)
+    return document_response(pack_doc)
 
 @app.route("/evidence-packs/<string:pack_id>/signed-url", methods=["GET"])
 @rbac_required("evidence_packs", "read")
@@ -458,8 +821,8 @@ def get_evidence_pack_signed_url(pack_id):
     try:
         signed_url = evidence_pack_generator.get_signed_url(pack_id)
         if signed_url:
-            log_audit_event(request.headers.get("X-User-ID", "anonymous"), "get_signed_url", "evidence_packs", pack_id)
-            return jsonify({"pack_id": pack_id, "signed_url": signed_url})
+            log_audit_event(g.user_id, "get_signed_url", "evidence_packs", pack_id)
+            return json_response({"pack_id": pack_id, "signed_url": signed_url})
         else:
             abort(404, description="Evidence pack or signed URL not found.")
     except Exception as e:
@@ -469,172 +832,320 @@ def get_evidence_pack_signed_url(pack_id):
 @app.route("/evidence-packs/<string:pack_id>", methods=["PUT"])
 @rbac_required("evidence_packs", "write")
 def update_evidence_pack_by_id(pack_id):
-    data = request.get_json()
+    data = get_json_body()
     if not data:
         abort(400, description="No data provided for update.")
-    pack_ref = db.collection(CONFIG["EVIDENCE_PACKS_COLLECTION"]).document(pack_id)
-    if not pack_ref.get().exists:
-        abort(404, description="Evidence pack not found.")
+    pack_ref = EVIDENCE_PACKS.document(pack_id)
     data = update_firestore_metadata(data)
-    pack_ref.update(data)
-    log_audit_event(request.headers.get("X-User-ID", "anonymous"), "update", "evidence_packs", pack_id, data)
-    return jsonify({"id": pack_id, **data})
+    update_existing(pack_ref, data, "Evidence pack not found.")
+    log_audit_event(g.user_id, "update", "evidence_packs", pack_id, data)
+    return json_response({"id": pack_id, **data})
 
 @app.route("/evidence-packs/<string:pack_id>", methods=["DELETE"])
 @rbac_required("evidence_packs", "delete")
 def delete_evidence_pack_by_id(pack_id):
-    pack_ref = db.collection(CONFIG["EVIDENCE_PACKS_COLLECTION"]).document(pack_id)
-    if not pack_ref.get().exists:
-        abort(404, description="Evidence pack not found.")
-    pack_ref.delete()
-    log_audit_event(request.headers.get("X-User-ID", "anonymous"), "delete", "evidence_packs", pack_id)
+    pack_ref = EVIDENCE_PACKS.document(pack_id)
+    delete_existing(pack_ref, "Evidence pack not found.")
+    log_audit_event(g.user_id, "delete", "evidence_packs", pack_id)
     return "", 204
 
+# Cloud Storage batch requests are capped at 100 calls
+GCS_BATCH_LIMIT = 100
+
+def delete_evidence_pack_blobs(storage_paths):
+    """Deletes evidence pack blobs in Cloud Storage batch requests.
+
+    storage_path is either an object name in the evidence pack bucket or a
+    gs:// URI for it. Blobs that are already gone are ignored.
+    """
+    bucket = storage_client.bucket(CONFIG["GCS_EVIDENCE_PACK_BUCKET"])
+    bucket_uri = f"gs://{bucket.name}/"
+    names = []
+    for path in storage_paths:
+        if not path:
+            continue
+        if path.startswith("gs://") and not path.startswith(bucket_uri):
+            app.logger.warning(f"Not deleting evidence pack blob outside {bucket_uri}: {path}")
+            continue
+        names.append(path.removeprefix(bucket_uri))
+    for start in range(0, len(names), GCS_BATCH_LIMIT):
+        with storage_client.batch(raise_exception=False):
+            for name in names[start:start + GCS_BATCH_LIMIT]:
+                bucket.blob(name).delete()
+
+@app.route("/evidence-packs", methods=["DELETE"])
+@rbac_required("evidence_packs", "delete")
+def delete_evidence_packs_before():
+    before = request.args.get("before")
+    if not before:
+        abort(400, description="Missing before timestamp.")
+    try:
+        cutoff = datetime.fromisoformat(before)
+    except ValueError:
+        abort(400, description="Invalid before timestamp; expected ISO 8601.")
+    if cutoff.tzinfo is None:
+        cutoff = cutoff.replace(tzinfo=UTC)
+
+    # Delete a full write batch at a time, reading only each pack's storage path.
+    # Blobs go first, so a failed run leaves documents to retry from, not orphans.
+    query = EVIDENCE_PACKS.where("created_at", "<", cutoff).select(["storage_path"]).limit(FIRESTORE_BATCH_LIMIT)
+    deleted = 0
+    while True:
+        docs = list(query.stream())
+        if not docs:
+            break
+        delete_evidence_pack_blobs(doc.get("storage_path") for doc in docs)
+        batch = db.batch()
+        for doc in docs:
+            batch.delete(doc.reference)
+        batch.commit()
+        deleted += len(docs)
+
+    log_audit_event(g.user_id, "delete", "evidence_packs", "bulk", {"before": cutoff, "deleted": deleted})
+    return json_response({"deleted": deleted})
+
 # Audit Log (Read-only for most users, write via internal functions)
 @app.route("/audit-logs", methods=["GET"])
 @rbac_required("audit_logs", "read")
 def get_audit_logs():
-    logs_ref = db.collection(CONFIG["AUDIT_LOG_COLLECTION"])
-    logs = [doc.to_dict() for doc in logs_ref.order_by("timestamp", direction=firestore.Query.DESCENDING).stream()]
-    log_audit_event(request.headers.get("X-User-ID", "anonymous"), "read", "audit_logs", "all")
-    return jsonify(logs)
+    logs = paginate(AUDIT_LOGS, AUDIT_LOG_QUERY)
+    log_audit_event(g.user_id, "read", "audit_logs", "all")
+    return json_response(logs)
 
 @app.route("/audit-logs/<string:log_id>", methods=["GET"])
 @rbac_required("audit_logs", "read")
 def get_audit_log_by_id(log_id):
-    log_doc = db.collection(CONFIG["AUDIT_LOG_COLLECTION"]).document(log_id).get()
+    log_doc = get_document(AUDIT_LOGS.document(log_id))
     if not log_doc.exists:
         abort(404, description="Audit log entry not found.")
-    log_audit_event(request.headers.get("X-User-ID", "anonymous"), "read", "audit_logs", log_id)
-    return jsonify({"id": log_doc.id, **log_doc.to_dict()})
+    log_audit_event(g.user_id, "read", "audit_logs", log_id)
+    return document_response(log_doc)
 
 # RBAC Management
 @app.route("/rbac/roles", methods=["GET"])
 @rbac_required("rbac_roles", "read")
 def get_rbac_roles():
-    roles_ref = db.collection(CONFIG["RBAC_ROLES_COLLECTION"])
-    roles = [doc.to_dict() for doc in roles_ref.stream()]
-    log_audit_event(request.headers.get("X-User-ID", "anonymous"), "read", "rbac_roles", "all")
-    return jsonify(roles)
+    roles = RBAC_ROLES_VIEW.page()
+    log_audit_event(g.user_id, "read", "rbac_roles", "all")
+    return json_response(roles)
 
 @app.route("/rbac/roles", methods=["POST"])
 @rbac_required("rbac_roles", "write")
 def create_rbac_role():
-    data = request.get_json()
+    data = get_json_body()
     if not data or "role_name" not in data or "permissions" not in data:
         abort(400, description="Missing role_name or permissions.")
     data = add_firestore_metadata(data)
-    _, doc_ref = db.collection(CONFIG["RBAC_ROLES_COLLECTION"]).add(data)
-    log_audit_event(request.headers.get("X-User-ID", "anonymous"), "create", "rbac_roles", doc_ref.id, data)
-    return jsonify({"id": doc_ref.id, **data}), 201
+    _, doc_ref = RBAC_ROLES.add(data)
+    log_audit_event(g.user_id, "create", "rbac_roles", doc_ref.id, data)
+    return json_response({"id": doc_ref.id, **data}, 201)
 
 @app.route("/rbac/roles/<string:role_id>", methods=["GET"])
 @rbac_required("rbac_roles", "read")
 def get_rbac_role_by_id(role_id):
-    role_doc = db.collection(CONFIG["RBAC_ROLES_COLLECTION"]).document(role_id).get()
+    role_doc = get_document(RBAC_ROLES.document(role_id))
     if not role_doc.exists:
         abort(404, description="RBAC Role not found.")
-    log_audit_event(request.headers.get("X-User-ID", "anonymous"), "read", "rbac_roles", role_id)
-    return jsonify({"id": role_doc.id, **role_doc.to_dict()})
+    log_audit_event(g.user_id, "read", "rbac_roles", role_id)
+    return document_response(role_doc)
 
 @app.route("/rbac/roles/<string:role_id>", methods=["PUT"])
 @rbac_required("rbac_roles", "write")
 def update_rbac_role_by_id(role_id):
-    data = request.get_json()
+    data = get_json_body()
     if not data:
         abort(400, description="No data provided for update.")
-    role_ref = db.collection(CONFIG["RBAC_ROLES_COLLECTION"]).document(role_id)
-    if not role_ref.get().exists:
-        abort(404, description="RBAC Role not found.")
+    role_ref = RBAC_ROLES.document(role_id)
     data = update_firestore_metadata(data)
-    role_ref.update(data)
-    log_audit_event(request.headers.get("X-User-ID", "anonymous"), "update", "rbac_roles", role_id, data)
-    return jsonify({"id": role_id, **data})
+    update_existing(role_ref, data, "RBAC Role not found.")
+    invalidate_role_permissions(role_id)
+    log_audit_event(g.user_id, "update", "rbac_roles", role_id, data)
+    return json_response({"id": role_id, **data})
 
 @app.route("/rbac/roles/<string:role_id>", methods=["DELETE"])
 @rbac_required("rbac_roles", "delete")
 def delete_rbac_role_by_id(role_id):
-    role_ref = db.collection(CONFIG["RBAC_ROLES_COLLECTION"]).document(role_id)
-    if not role_ref.get().exists:
-        abort(404, description="RBAC Role not found.")
-    role_ref.delete()
-    log_audit_event(request.headers.get("X-User-ID", "anonymous"), "delete", "rbac_roles", role_id)
+    role_ref = RBAC_ROLES.document(role_id)
+    delete_existing(role_ref, "RBAC Role not found.")
+    invalidate_role_permissions(role_id)
+    log_audit_event(g.user_id, "delete", "rbac_roles", role_id)
     return "", 204
 
 @app.route("/rbac/users", methods=["GET"])
 @rbac_required("rbac_users", "read")
 def get_rbac_users():
-    users_ref = db.collection(CONFIG["RBAC_USERS_COLLECTION"])
-    users = [doc.to_dict() for doc in users_ref.stream()]
-    log_audit_event(request.headers.get("X-User-ID", "anonymous"), "read", "rbac_users", "all")
-    return jsonify(users)
+    users = RBAC_USERS_VIEW.page()
+    log_audit_event(g.user_id, "read", "rbac_users", "all")
+    return json_response(users)
 
 @app.route("/rbac/users", methods=["POST"])
 @rbac_required("rbac_users", "write")
 def create_rbac_user():
-    data = request.get_json()
+    data = get_json_body()
     if not data or "user_id" not in data or "roles" not in data:
         abort(400, description="Missing user_id or roles.")
     data = add_firestore_metadata(data)
-    _, doc_ref = db.collection(CONFIG["RBAC_USERS_COLLECTION"]).add(data)
-    log_audit_event(request.headers.get("X-User-ID", "anonymous"), "create", "rbac_users", doc_ref.id, data)
-    return jsonify({"id": doc_ref.id, **data}), 201
+    _, doc_ref = RBAC_USERS.add(data)
+    invalidate_user_roles(data["user_id"])
+    log_audit_event(g.user_id, "create", "rbac_users", doc_ref.id, data)
+    return json_response({"id": doc_ref.id, **data}, 201)
 
 @app.route("/rbac/users/<string:user_id>", methods=["GET"])
 @rbac_required("rbac_users", "read")
 def get_rbac_user_by_id(user_id):
-    user_doc = db.collection(CONFIG["RBAC_USERS_COLLECTION"]).document(user_id).get()
+    user_doc = get_document(RBAC_USERS.document(user_id))
     if not user_doc.exists:
         abort(404, description="RBAC User not found.")
-    log_audit_event(request.headers.get("X-User-ID", "anonymous"), "read", "rbac_users", user_id)
-    return jsonify({"id": user_doc.id, **user_doc.to_dict()})
+    log_audit_event(g.user_id, "read", "rbac_users", user_id)
+    return document_response(user_doc)
 
 @app.route("/rbac/users/<string:user_id>", methods=["PUT"])
 @rbac_required("rbac_users", "write")
 def update_rbac_user_by_id(user_id):
-    data = request.get_json()
+    data = get_json_body()
     if not data:
         abort(400, description="No data provided for update.")
-    user_ref = db.collection(CONFIG["RBAC_USERS_COLLECTION"]).document(user_id)
-    if not user_ref.get().exists:
-        abort(404, description="RBAC User not found.")
+    user_ref = RBAC_USERS.document(user_id)
     data = update_firestore_metadata(data)
-    user_ref.update(data)
-    log_audit_event(request.headers.get("X-User-ID", "anonymous"), "update", "rbac_users", user_id, data)
-    return jsonify({"id": user_id, **data})
+    update_existing(user_ref, data, "RBAC User not found.")
+    invalidate_user_roles(user_id)
+    log_audit_event(g.user_id, "update", "rbac_users", user_id, data)
+    return json_response({"id": user_id, **data})
 
 @app.route("/rbac/users/<string:user_id>", methods=["DELETE"])
 @rbac_required("rbac_users", "delete")
 def delete_rbac_user_by_id(user_id):
-    user_ref = db.collection(CONFIG["RBAC_USERS_COLLECTION"]).document(user_id)
-    if not user_ref.get().exists:
-        abort(404, description="RBAC User not found.")
-    user_ref.delete()
-    log_audit_event(request.headers.get("X-User-ID", "anonymous"), "delete", "rbac_users", user_id)
+    user_ref = RBAC_USERS.document(user_id)
+    delete_existing(user_ref, "RBAC User not found.")
+    invalidate_user_roles(user_id)
+    log_audit_event(g.user_id, "delete", "rbac_users", user_id)
     return "", 204
 
 # GitHub Webhook for CI Status updates
+# Keyed once; each request copies it so the secret's inner/outer pads are not rehashed
+_github_webhook_hmac = hmac.new(CONFIG["GITHUB_WEBHOOK_SECRET"].encode("utf-8"), digestmod=hashlib.sha256)
+# GitHub caps webhook payloads at 25 MB
+GITHUB_WEBHOOK_MAX_BYTES = 25 * 1024 * 1024
+WEBHOOK_READ_CHUNK_BYTES = 64 * 1024
+# The webhook's replies never change, so they are encoded once
+_WEBHOOK_ACCEPTED_BODY = json_dumps({"status": "accepted", "message": "CI status update queued."})
+_WEBHOOK_IGNORED_BODY = json_dumps({"status": "ignored", "message": "Event not handled or missing data."})
+
+def ci_status_doc_id(repository_full_name, workflow_name):
+    # Each (repository, workflow) pair has one status document, so its id is
+    # derived from the pair and the webhook never has to query for it
+    key = f"{repository_full_name}|{workflow_name}".encode()
+    return hashlib.sha1(key, usedforsecurity=False).hexdigest()
+
+def upsert_ci_status(doc_id, ci_data):
+    """Writes a CI status and its audit entry in one batch commit."""
+    doc_ref = CI_STATUSES.document(doc_id)
+    data = update_firestore_metadata(dict(ci_data), provenance="github_webhook")
+    batch = db.batch()
+    batch.update(doc_ref, data)
+    batch.set(AUDIT_LOGS.document(), make_audit_entry("github_webhook", "update", "ci_status", doc_id, data))
+    try:
+        batch.commit()
+        return
+    except NotFound:
+        pass
+    batch = db.batch()
+    # Statuses written before ids were derived have auto-generated ids; the
+    # workflow's latest one moves to the derived id and any others are removed
+    legacy_docs = list(CI_STATUSES.where("repository", "==", ci_data["repository"])
+                       .where("workflow_name", "==", ci_data["workflow_name"]).stream())
+    if legacy_docs:
+        legacy_doc = max(legacy_docs, key=lambda doc: doc.update_time)
+        data = {**legacy_doc.to_dict(), **data}
+        batch.create(doc_ref, data)
+        for doc in legacy_docs:
+            batch.delete(doc.reference)
+        details = {**data, "migrated_from": [doc.id for doc in legacy_docs]}
+        batch.set(AUDIT_LOGS.document(), make_audit_entry("github_webhook", "update", "ci_status", doc_id, details))
+        batch.commit()
+        return
+    # First run of this workflow
+    data = add_firestore_metadata(dict(ci_data))
+    batch.create(doc_ref, data)
+    batch.set(AUDIT_LOGS.document(), make_audit_entry("github_webhook", "create", "ci_status", doc_id, data))
+    batch.commit()
+
+# Webhook CI status updates are written by a background thread in batches, so
+# concurrent deliveries share a commit and the webhook answers 202 as soon as
+# the update is queued. Queued updates are flushed on shutdown; a write that
+# fails is logged, and the delivery can be redelivered from GitHub.
+CI_STATUS_QUEUE_MAXSIZE = 10000
+# Each status is written together with its audit entry, two writes per update
+CI_STATUS_BATCH_SIZE = FIRESTORE_BATCH_LIMIT // 2
+CI_STATUS_FLUSH_INTERVAL = 0.05 # Seconds to wait for a batch to fill
+
+_ci_status_queue = queue.Queue(maxsize=CI_STATUS_QUEUE_MAXSIZE)
+
+def _write_ci_status_batch(updates):
+    # Later events for a workflow supersede earlier ones in the same batch
+    latest = dict(updates)
+    batch = db.batch()
+    for doc_id, ci_data in latest.items():
+        data = update_firestore_metadata(dict(ci_data), provenance="github_webhook")
+        batch.update(CI_STATUSES.document(doc_id), data)
+        batch.set(AUDIT_LOGS.document(), make_audit_entry("github_webhook", "update", "ci_status", doc_id, data))
+    try:
+        batch.commit()
+        return
+    except NotFound:
+        # Some workflow has no status document yet; the batch was not applied
+        pass
+    except Exception as e:
+        app.logger.error(f"Failed to write {len(latest)} CI status updates: {e}")
+        return
+    for doc_id, ci_data in latest.items():
+        try:
+            upsert_ci_status(doc_id, ci_data)
+        except Exception as e:
+            app.logger.error(f"Failed to write CI status {doc_id}: {e}")
+
+def _ci_status_writer():
+    while True:
+        _write_ci_status_batch(_next_batch(_ci_status_queue, CI_STATUS_BATCH_SIZE, CI_STATUS_FLUSH_INTERVAL))
+
+@atexit.register
+def _flush_ci_status_queue():
+    _drain(_ci_status_queue, CI_STATUS_BATCH_SIZE, _write_ci_status_batch)
+
 @app.route("/github-webhook", methods=["POST"])
 def github_webhook():
     signature = request.headers.get("X-Hub-Signature-256")
     if not signature:
         abort(400, description="X-Hub-Signature-256 header missing.")
 
-    payload_body = request.get_data()
-    secret = CONFIG["GITHUB_WEBHOOK_SECRET"].encode("utf-8")
-
-    # Verify webhook signature
+    # GitHub always sends "sha256=<hex>"; a bare digest is not accepted
+    if not signature.startswith("sha256="):
+        abort(403, description="Invalid GitHub webhook signature.")
     try:
-        mac = hmac.new(secret, payload_body, hashlib.sha256)
-        expected_signature = "sha256=" + mac.hexdigest()
-        if not hmac.compare_digest(expected_signature, signature):
-            abort(403, description="Invalid GitHub webhook signature.")
-    except Exception as e:
-        app.logger.error(f"Error verifying GitHub webhook signature: {e}")
-        abort(500, description="Error verifying webhook signature.")
+        provided_digest = bytes.fromhex(signature.removeprefix("sha256="))
+    except ValueError:
+        abort(403, description="Invalid GitHub webhook signature.")
+    if request.content_length is not None and request.content_length > GITHUB_WEBHOOK_MAX_BYTES:
+        abort(413, description="Webhook payload too large.")
+
+    # Hash the body while reading it, so it is buffered once and parsed once
+    mac = _github_webhook_hmac.copy()
+    payload_body = bytearray()
+    for chunk in iter(lambda: request.stream.read(WEBHOOK_READ_CHUNK_BYTES), b""):
+        payload_body += chunk
+        if len(payload_body) > GITHUB_WEBHOOK_MAX_BYTES:
+            abort(413, description="Webhook payload too large.")
+        mac.update(chunk)
+
+    # Verify webhook signature, comparing raw digests rather than hex strings
+    if not hmac.compare_digest(mac.digest(), provided_digest):
+        abort(403, description="Invalid GitHub webhook signature.")
 
     event = request.headers.get("X-GitHub-Event", "unknown")
-    payload = request.get_json()
+    try:
+        payload = orjson.loads(payload_body)
+    except orjson.JSONDecodeError:
+        abort(400, description="Webhook payload is not valid JSON.")
 
     if event == "workflow_run":
         action = payload.get("action")
@@ -653,11 +1164,6 @@ def github_webhook():
             final_status = status
 
         if workflow_name and repository_full_name and run_id:
-            # Find existing CI status or create a new one
-            ci_status_ref = db.collection(CONFIG["CI_STATUS_COLLECTION"])
-            query = ci_status_ref.where("workflow_name", "==", workflow_name).where("repository", "==", repository_full_name).limit(1)
-            docs = list(query.stream())
-
             ci_data = {
                 "workflow_name": workflow_name,
                 "repository": repository_full_name,
@@ -666,20 +1172,18 @@ def github_webhook():
                 "last_run_url": html_url,
             }
 
-            if docs:
-                doc_id = docs[0].id
-                ci_data = update_firestore_metadata(ci_data, provenance="github_webhook")
-                ci_status_ref.document(doc_id).update(ci_data)
-                log_audit_event("github_webhook", "update", "ci_status", doc_id, ci_data)
-            else:
-                ci_data = add_firestore_metadata(ci_data)
-                _, doc_ref = ci_status_ref.add(ci_data)
-                log_audit_event("github_webhook", "create", "ci_status", doc_ref.id, ci_data)
+            doc_id = ci_status_doc_id(repository_full_name, workflow_name)
+            try:
+                _ci_status_queue.put_nowait((doc_id, ci_data))
+            except queue.Full:
+                # A 5xx marks the delivery as failed in GitHub, so it can be redelivered
+                app.logger.error(f"CI status queue full, rejecting update for {workflow_name} in {repository_full_name}")
+                abort(503, description="CI status writer is overloaded.")
 
-            app.logger.info(f"CI Status updated for {workflow_name} in {repository_full_name}: {final_status}")
-            return jsonify({"status": "success", "message": "CI status updated."}), 200
+            app.logger.info(f"CI Status queued for {workflow_name} in {repository_full_name}: {final_status}")
+            return app.response_class(_WEBHOOK_ACCEPTED_BODY, status=202, mimetype="application/json")
 
-    return jsonify({"status": "ignored", "message": "Event not handled or missing data."}), 200
+    return app.response_class(_WEBHOOK_IGNORED_BODY, status=200, mimetype="application/json")
 
 # Mirror Reality Validation (Placeholder - actual logic would be complex)
 @app.route("/mirror-reality-validation", methods=["POST"])
@@ -688,11 +1192,10 @@ def trigger_mirror_reality_validation():
     # In a real scenario, this would trigger a background process
     # to compare system state with external data sources.
     app.logger.info("Mirror reality validation triggered.")
-    log_audit_event(request.headers.get("X-User-ID", "anonymous"), "trigger", "mirror_reality_validation", "system")
-    return jsonify({"status": "accepted", "message": "Mirror reality validation initiated."}), 202
+    log_audit_event(g.user_id, "trigger", "mirror_reality_validation", "system")
+    return json_response({"status": "accepted", "message": "Mirror reality validation initiated."}, 202)
 
 
 if __name__ == "__main__":
-    # For local development, use Flask\'s built-in server
-    # In production, Gunicorn or similar WSGI server should be used
-    app.run(debug=True, host="0.0.0.0", port=8080)
+    # Local development only; production runs under gunicorn with gunicorn_conf.py
+    app.run(debug=os.environ.get("FLASK_DEBUG") == "1", host="0.0.0.0", port=8080)
@@ -0,0 +1,24 @@
+"""Gunicorn settings for the admin control plane (phase 5).
+
+    gunicorn -c gunicorn_conf.py 5_C4tUwN9bGqAdTRFYzlNVSs_1767925448731_na1fn_L2hvbWUvdWJ1bnR1L2FkbWluX2NvbnRyb2xfcGxhbmUvbWFpbg:app
+
+Handlers block on the synchronous Firestore client, so each worker runs a
+pool of threads that share one client and its gRPC channels.
+"""
+import multiprocessing
+import os
+import sys
+
+bind = os.environ.get("BIND", f"0.0.0.0:{os.environ.get('PORT', '8080')}")
+workers = int(os.environ.get("WEB_CONCURRENCY", 2 * multiprocessing.cpu_count() + 1))
+worker_class = "gthread"
+threads = int(os.environ.get("GUNICORN_THREADS", 16))
+# Keep connections from the load balancer open between requests
+keepalive = 30
+timeout = 60
+
+
+def post_worker_init(worker):
+    # Create the Firestore client as soon as the worker has loaded the app,
+    # rather than on its first request
+    sys.modules[worker.wsgi.import_name].init_firestore()
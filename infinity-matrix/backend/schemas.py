@@ -1,29 +1,50 @@
 """Pydantic schemas for API request/response models"""
 
-from datetime import datetime
-from typing import Any, dict
+from datetime import UTC, datetime
+from functools import lru_cache
+from typing import Annotated, Any
 
 import phonenumbers
-from pydantic import BaseModel, EmailStr, Field, field_validator
+from phonenumbers import NumberParseException, PhoneNumberFormat
+from pydantic import AfterValidator, BaseModel, ConfigDict, EmailStr, Field
+
+_E164 = PhoneNumberFormat.E164
+# Region assumed for numbers given without a country code
+DEFAULT_PHONE_REGION = "US"
+
+# phonenumbers loads each region's metadata on first use; load the US
+# metadata at import so the first request does not pay for it (and a
+# preloading server shares it with its workers)
+phonenumbers.is_valid_number(phonenumbers.parse("+14155552671"))
+
+
+@lru_cache(maxsize=10_000)
+def normalize_phone_number(phone_number: str) -> str:
+    """Parse and validate a phone number, returning it in E.164 format.
+
+    Results are cached, since the same numbers recur across leads, calls and
+    status polls. Invalid numbers raise and are not cached.
+    """
+    try:
+        parsed = phonenumbers.parse(phone_number, DEFAULT_PHONE_REGION)
+    except NumberParseException as e:
+        raise ValueError(f"Invalid phone number format: {e}") from None
+    if not phonenumbers.is_valid_number(parsed):
+        raise ValueError("Invalid phone number")
+    return phonenumbers.format_number(parsed, _E164)
+
+
+# Phone number field, normalized to E.164
+PhoneNumberE164 = Annotated[str, AfterValidator(normalize_phone_number)]
 
 
 class LeadBase(BaseModel):
     """Base lead schema"""
-    phone_number: str
+    phone_number: PhoneNumberE164
     name: str | None = None
     email: EmailStr | None = None
     company: str | None = None
 
-    @field_validator('phone_number')
-    def validate_phone(cls, v):
-        try:
-            parsed = phonenumbers.parse(v, "US")
-            if not phonenumbers.is_valid_number(parsed):
-                raise ValueError("Invalid phone number")
-            return phonenumbers.format_number(parsed, phonenumbers.PhoneNumberFormat.E164)
-        except Exception as e:
-            raise ValueError(f"Invalid phone number format: {str(e)}")
-
 
 class LeadCreate(LeadBase):
     """Schema for creating a new lead"""
@@ -57,23 +78,12 @@ class LeadResponse(LeadBase):
     created_at: datetime
     updated_at: datetime | None = None
 
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True, frozen=True, extra="forbid")
 
 
 class InitiateCallRequest(BaseModel):
     """Request to initiate a phone call"""
-    phone_number: str
-
-    @field_validator('phone_number')
-    def validate_phone(cls, v):
-        try:
-            parsed = phonenumbers.parse(v, "US")
-            if not phonenumbers.is_valid_number(parsed):
-                raise ValueError("Invalid phone number")
-            return phonenumbers.format_number(parsed, phonenumbers.PhoneNumberFormat.E164)
-        except Exception as e:
-            raise ValueError(f"Invalid phone number format: {str(e)}")
+    phone_number: PhoneNumberE164
 
 
 class CallStatusResponse(BaseModel):
@@ -106,8 +116,7 @@ class InteractionResponse(BaseModel):
     created_at: datetime
     created_by: str | None = None
 
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True, frozen=True, extra="forbid")
 
 
 class NoteCreate(BaseModel):
@@ -125,8 +134,7 @@ class NoteResponse(BaseModel):
     created_at: datetime
     created_by: str | None = None
 
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True, frozen=True, extra="forbid")
 
 
 class CalendarEventCreate(BaseModel):
@@ -167,15 +175,14 @@ class CalendarEventResponse(BaseModel):
     created_at: datetime
     updated_at: datetime | None = None
 
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True, frozen=True, extra="forbid")
 
 
 class WebSocketMessage(BaseModel):
     """WebSocket message schema"""
     type: str  # lead_created, call_started, call_updated, data_enriched, calendar_updated
     data: dict[str, Any]
-    timestamp: datetime = Field(default_factory=datetime.utcnow)
+    timestamp: datetime = Field(default_factory=lambda: datetime.now(UTC))
 
 
 class EnrichmentResult(BaseModel):
@@ -5,9 +5,12 @@ Integrates Manus Core, Agent Endpoints, and Admin Control Plane
 import logging
 import os
 import sys
+from contextlib import asynccontextmanager
 
-from fastapi import FastAPI
+import orjson
+from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 
 # Add current directory to path for imports
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
@@ -20,36 +23,76 @@ from manus_core import router as manus_router
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Interactive docs and the OpenAPI schema are only served outside production
+IS_PRODUCTION = os.getenv("ENVIRONMENT") == "production"
+
+# Browser origins allowed to call the API, comma-separated. The localhost
+# default is for local development only; production refuses to start without
+# an explicit list.
+CORS_ORIGINS = [
+    origin.strip()
+    for origin in os.getenv("CORS_ORIGINS", "" if IS_PRODUCTION else "http://localhost:3000").split(",")
+    if origin.strip()
+]
+if IS_PRODUCTION and not CORS_ORIGINS:
+    raise RuntimeError("CORS_ORIGINS must be set when ENVIRONMENT=production")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Application lifespan manager"""
+    logger.info("=" * 60)
+    logger.info("Infinity Matrix Backend Starting")
+    logger.info("=" * 60)
+    logger.info("✅ Manus Core Intelligence Loops: ACTIVE")
+    logger.info("✅ Autonomous Agent Endpoints: ACTIVE")
+    logger.info("✅ Admin Control Plane: ACTIVE")
+    logger.info("=" * 60)
+    if not IS_PRODUCTION:
+        logger.info("API Documentation: http://localhost:8000/docs")
+    logger.info("=" * 60)
+    yield
+
+    logger.info("Infinity Matrix Backend Shutting Down")
+
 # Create FastAPI app
 app = FastAPI(
     title="Infinity Matrix API",
     description="Complete backend for infinityxai.com with Manus Core, Autonomous Agents, and Admin Control Plane",
     version="1.0.0",
-    docs_url="/docs",
-    redoc_url="/redoc"
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse,
+    docs_url=None if IS_PRODUCTION else "/docs",
+    redoc_url=None if IS_PRODUCTION else "/redoc",
+    openapi_url=None if IS_PRODUCTION else "/openapi.json"
 )
 
 # Configure CORS
+# Every method the routers register is allowed, so preflights for PUT and
+# PATCH succeed too. Browsers may cache a preflight response for up to a day.
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=["*"],
+    allow_origins=CORS_ORIGINS,
     allow_credentials=True,
     allow_methods=["*"],
-    allow_headers=["*"],
+    allow_headers=["Authorization", "Content-Type"],
+    max_age=86400,
 )
 
 # ============================================================================
 # Core Endpoints
 # ============================================================================
 
+# Health checks are polled constantly and the body never changes
+_HEALTH_BODY = orjson.dumps({
+    "status": "healthy",
+    "service": "Infinity Matrix",
+    "version": "1.0.0"
+})
+
 @app.get("/health")
 async def health():
     """Health check endpoint"""
-    return {
-        "status": "healthy",
-        "service": "Infinity Matrix",
-        "version": "1.0.0"
-    }
+    return Response(_HEALTH_BODY, media_type="application/json")
 
 @app.get("/")
 async def root():
@@ -86,28 +129,6 @@ app.include_router(agent_router)
 logger.info("Registering Admin Control Plane router...")
 app.include_router(admin_router)
 
-# ============================================================================
-# Startup and Shutdown
-# ============================================================================
-
-@app.on_event("startup")
-async def startup_event():
-    """Initialize on startup"""
-    logger.info("=" * 60)
-    logger.info("Infinity Matrix Backend Starting")
-    logger.info("=" * 60)
-    logger.info("✅ Manus Core Intelligence Loops: ACTIVE")
-    logger.info("✅ Autonomous Agent Endpoints: ACTIVE")
-    logger.info("✅ Admin Control Plane: ACTIVE")
-    logger.info("=" * 60)
-    logger.info("API Documentation: http://localhost:8000/docs")
-    logger.info("=" * 60)
-
-@app.on_event("shutdown")
-async def shutdown_event():
-    """Cleanup on shutdown"""
-    logger.info("Infinity Matrix Backend Shutting Down")
-
 # ============================================================================
 # Main
 # ============================================================================
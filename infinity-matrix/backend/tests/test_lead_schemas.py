@@ -0,0 +1,84 @@
+from datetime import datetime
+from types import SimpleNamespace
+
+import pytest
+from pydantic import ValidationError
+from schemas import InitiateCallRequest, LeadCreate, NoteResponse, normalize_phone_number
+
+
+@pytest.mark.parametrize("raw, expected", [
+    ("+14155552671", "+14155552671"),
+    ("(415) 555-2671", "+14155552671"),
+    ("415.555.2671", "+14155552671"),
+    ("+44 20 7946 0958", "+442079460958"),
+])
+def test_phone_number_normalized_to_e164(raw, expected):
+    """Test phone numbers are normalized to E.164, assuming US without a country code"""
+    assert LeadCreate(phone_number=raw).phone_number == expected
+    assert InitiateCallRequest(phone_number=raw).phone_number == expected
+
+
+@pytest.mark.parametrize("raw", ["", "not a number", "123", "+1 555 000 0000"])
+def test_phone_number_invalid(raw):
+    """Test unparseable and invalid phone numbers are rejected"""
+    with pytest.raises(ValidationError):
+        LeadCreate(phone_number=raw)
+    with pytest.raises(ValidationError):
+        InitiateCallRequest(phone_number=raw)
+
+
+def test_phone_number_invalid_not_cached():
+    """Test only valid numbers enter the normalization cache"""
+    normalize_phone_number.cache_clear()
+    with pytest.raises(ValueError):
+        normalize_phone_number("123")
+    normalize_phone_number("+14155552671")
+
+    assert normalize_phone_number.cache_info().currsize == 1
+
+
+def _note_row(**overrides):
+    """Stand-in for an ORM row, with a column the schema does not declare"""
+    row = {
+        "id": 1,
+        "lead_id": 7,
+        "content": "Call back next week",
+        "created_at": datetime(2026, 1, 5, 9, 30),
+        "created_by": "rep-1",
+        "internal_flag": True,
+    }
+    row.update(overrides)
+    return SimpleNamespace(**row)
+
+
+def test_response_schema_reads_orm_attributes():
+    """Test response schemas build from ORM rows, ignoring undeclared attributes"""
+    note = NoteResponse.model_validate(_note_row())
+
+    assert note.id == 1
+    assert note.content == "Call back next week"
+    assert not hasattr(note, "internal_flag")
+
+
+def test_response_schema_is_frozen():
+    """Test response schemas reject mutation after construction"""
+    note = NoteResponse.model_validate(_note_row())
+
+    with pytest.raises(ValidationError):
+        note.content = "Edited"
+
+    edited = note.model_copy(update={"content": "Edited"})
+    assert edited.content == "Edited"
+    assert note.content == "Call back next week"
+
+
+def test_response_schema_forbids_extra_fields():
+    """Test response schemas reject undeclared keys in mappings"""
+    with pytest.raises(ValidationError):
+        NoteResponse(
+            id=1,
+            lead_id=7,
+            content="Call back next week",
+            created_at=datetime(2026, 1, 5, 9, 30),
+            internal_flag=True,
+        )
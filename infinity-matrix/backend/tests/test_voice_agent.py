@@ -0,0 +1,362 @@
+import asyncio
+import json
+from types import SimpleNamespace
+
+import fakeredis
+import pytest
+from voice_agent import CALL_STATE_TTL, FALLBACK_REPLY, MAX_HISTORY_MESSAGES, VoiceAgent
+
+
+class FakeCompletions:
+    """Stand-in for openai.AsyncOpenAI().chat.completions returning canned content"""
+
+    def __init__(self, *contents):
+        self.contents = list(contents)
+        self.requests = []
+
+    async def create(self, **kwargs):
+        self.requests.append(kwargs)
+        message = SimpleNamespace(content=self.contents.pop(0))
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+
+
+@pytest.fixture
+def agent(monkeypatch):
+    for name in ("OPENAI_API_KEY", "TWILIO_ACCOUNT_SID", "TWILIO_AUTH_TOKEN", "REDIS_URL"):
+        monkeypatch.delenv(name, raising=False)
+    return VoiceAgent()
+
+
+@pytest.fixture
+def redis_agent(agent):
+    """Agent keeping call state in (fake) Redis, as with REDIS_URL set"""
+    server = fakeredis.FakeServer()
+    agent.redis = fakeredis.aioredis.FakeRedis(server=server, decode_responses=True)
+    agent._sync_redis = fakeredis.FakeRedis(server=server, decode_responses=True)
+    return agent
+
+
+@pytest.fixture(params=["memory", "redis"])
+def state_agent(request):
+    """Agent keeping call state in process memory, then in Redis"""
+    return request.getfixturevalue("redis_agent" if request.param == "redis" else "agent")
+
+
+def _turn(reply, **lead_info):
+    return json.dumps({"reply": reply, "lead_info": lead_info})
+
+
+def _with_completions(agent, *contents):
+    completions = FakeCompletions(*contents)
+    agent.openai_client = SimpleNamespace(chat=SimpleNamespace(completions=completions))
+    return completions
+
+
+@pytest.mark.asyncio
+async def test_process_speech_reply_and_lead_info(agent):
+    """Test a JSON-mode turn returns the reply and merges lead fields"""
+    _with_completions(agent, json.dumps({
+        "reply": "Nice to meet you, Ada. Which company are you with?",
+        "lead_info": {"name": "Ada Lovelace", "company": None},
+    }))
+
+    result = await agent.process_speech("CA1", "Hi, I'm Ada Lovelace")
+
+    assert result["response"] == "Nice to meet you, Ada. Which company are you with?"
+    assert result["extracted_info"]["name"] == "Ada Lovelace"
+    assert result["conversation_complete"] is False
+    assert "error" not in result
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("content", [
+    '{"reply": "Thanks, and which compa',
+    json.dumps({"lead_info": {"name": "Ada Lovelace"}}),
+    json.dumps({"reply": ""}),
+    json.dumps(["not", "an", "object"]),
+    None,
+])
+async def test_process_speech_falls_back_on_unusable_reply(agent, content):
+    """Test truncated, non-object or reply-less completions keep the call going"""
+    _with_completions(agent, content)
+
+    result = await agent.process_speech("CA1", "Hi, I'm Ada Lovelace")
+
+    assert result["response"] == FALLBACK_REPLY
+    assert result["conversation_complete"] is False
+    assert "error" not in result
+    assert (await agent._get_history("CA1"))[-1] == {"role": "assistant", "content": FALLBACK_REPLY}
+
+
+class FakeRecordings:
+    """Stand-in for twilio Client().recordings"""
+
+    def __init__(self, recordings=(), error=None):
+        self.recordings = list(recordings)
+        self.error = error
+        self.calls = []
+
+    def list(self, **kwargs):
+        self.calls.append(kwargs)
+        if self.error:
+            raise self.error
+        return self.recordings
+
+
+def _with_recordings(agent, recordings=(), error=None):
+    fake = FakeRecordings(recordings, error)
+    agent.twilio_client = SimpleNamespace(recordings=fake)
+    return fake
+
+
+RECORDING_URL = "https://api.twilio.com/2010-04-01/Accounts/AC1/Recordings/RE1.mp3"
+
+
+def test_get_call_recording_url(agent):
+    """Test the recording URL points at the MP3 of the call's first recording"""
+    recordings = _with_recordings(agent, [SimpleNamespace(uri="/2010-04-01/Accounts/AC1/Recordings/RE1.json")])
+
+    assert agent.get_call_recording_url("CA1") == RECORDING_URL
+    assert recordings.calls == [{"call_sid": "CA1", "limit": 1}]
+
+
+@pytest.mark.asyncio
+async def test_get_call_recording_url_async(agent):
+    """Test the async variant returns the same URL as the blocking call"""
+    _with_recordings(agent, [SimpleNamespace(uri="/2010-04-01/Accounts/AC1/Recordings/RE1.json")])
+
+    assert await agent.get_call_recording_url_async("CA1") == RECORDING_URL
+
+
+@pytest.mark.asyncio
+async def test_get_call_recording_url_missing(agent):
+    """Test no URL without Twilio, without a recording or when the API fails"""
+    assert agent.get_call_recording_url("CA1") is None
+    assert await agent.get_call_recording_url_async("CA1") is None
+
+    _with_recordings(agent)
+    assert agent.get_call_recording_url("CA1") is None
+
+    _with_recordings(agent, error=RuntimeError("Twilio unavailable"))
+    assert await agent.get_call_recording_url_async("CA1") is None
+
+
+@pytest.mark.asyncio
+async def test_call_state_across_turns(state_agent):
+    """Test lead fields accumulate across turns and history stays bounded"""
+    agent = state_agent
+    turns = MAX_HISTORY_MESSAGES
+    _with_completions(
+        agent,
+        _turn("Nice to meet you, Ada.", name="Ada Lovelace"),
+        *[_turn("Go on.") for _ in range(turns - 2)],
+        _turn("Great, Analytical Engines it is.", company="Analytical Engines"),
+    )
+
+    for index in range(turns - 1):
+        result = await agent.process_speech("CA1", f"turn {index}")
+        assert result["conversation_complete"] is False
+    result = await agent.process_speech("CA1", "I work at Analytical Engines")
+
+    assert result["extracted_info"]["name"] == "Ada Lovelace"
+    assert result["extracted_info"]["company"] == "Analytical Engines"
+    assert result["conversation_complete"] is True
+
+    history = await agent._get_history("CA1")
+    assert len(history) == MAX_HISTORY_MESSAGES
+    assert history[-1] == {"role": "assistant", "content": "Great, Analytical Engines it is."}
+    assert await agent._get_history("CA2") == []
+
+
+@pytest.mark.asyncio
+async def test_redis_call_state_expires(redis_agent):
+    """Test Redis call state carries a TTL so abandoned calls are dropped"""
+    _with_completions(redis_agent, _turn("Hello Ada.", name="Ada Lovelace"))
+
+    await redis_agent.process_speech("CA1", "Hi, I'm Ada Lovelace")
+
+    for key in ("voice:CA1:msgs", "voice:CA1:extracted"):
+        assert 0 < await redis_agent.redis.ttl(key) <= CALL_STATE_TTL
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("variant", ["sync", "async"])
+async def test_cleanup_conversation(state_agent, variant):
+    """Test both cleanup variants drop the call's history and lead fields"""
+    agent = state_agent
+    _with_completions(agent, _turn("Hello Ada.", name="Ada Lovelace"), _turn("Hello Bob.", name="Bob"))
+    await agent.process_speech("CA1", "Hi, I'm Ada Lovelace")
+    await agent.process_speech("CA2", "Hi, I'm Bob")
+
+    if variant == "sync":
+        agent.cleanup_conversation("CA1")
+    else:
+        await agent.cleanup_conversation_async("CA1")
+
+    assert await agent._get_history("CA1") == []
+    assert (await agent._merge_extracted_info("CA1", None))["name"] is None
+    assert len(await agent._get_history("CA2")) == 2
+    if agent.redis:
+        assert await agent.redis.exists("voice:CA1:msgs", "voice:CA1:extracted") == 0
+
+
+class FakeFiles:
+    """Stand-in for openai.AsyncOpenAI().files"""
+
+    def __init__(self, outputs=None):
+        self.uploads = []
+        self.outputs = outputs or {}
+
+    async def create(self, file, purpose):
+        self.uploads.append({"file": file, "purpose": purpose})
+        return SimpleNamespace(id=f"file-{len(self.uploads)}")
+
+    async def content(self, file_id):
+        return SimpleNamespace(text=self.outputs[file_id])
+
+
+class FakeBatches:
+    """Stand-in for openai.AsyncOpenAI().batches"""
+
+    def __init__(self, statuses=None, error=None):
+        self.created = []
+        self.statuses = statuses or {}
+        self.error = error
+
+    async def create(self, **kwargs):
+        if self.error:
+            raise self.error
+        self.created.append(kwargs)
+        return SimpleNamespace(id=f"batch-{len(self.created)}")
+
+    async def retrieve(self, batch_id):
+        status, output_file_id = self.statuses[batch_id]
+        return SimpleNamespace(id=batch_id, status=status, output_file_id=output_file_id)
+
+
+def _with_batch_api(agent, files=None, batches=None):
+    files = files or FakeFiles()
+    batches = batches or FakeBatches()
+    agent.openai_client = SimpleNamespace(files=files, batches=batches)
+    return files, batches
+
+
+def _batch_output(call_sid, content):
+    body = {"choices": [{"message": {"content": content}}]}
+    return json.dumps({"custom_id": call_sid, "response": {"status_code": 200, "body": body}})
+
+
+async def _with_history(agent, call_sid):
+    await agent._append_history(call_sid, {"role": "user", "content": "Hi, I'm Ada Lovelace"})
+
+
+@pytest.mark.asyncio
+async def test_summary_queued_for_batch(agent):
+    """Test summaries are queued for the Batch API rather than requested inline"""
+    await _with_history(agent, "CA1")
+    files, batches = _with_batch_api(agent)
+
+    result = await agent.generate_conversation_summary("CA1")
+    agent._summary_worker.cancel()
+
+    assert result["pending"] is True
+    assert files.uploads == [] and batches.created == []
+    [request] = agent._summary_queue
+    assert request["custom_id"] == "CA1"
+    assert request["url"] == "/v1/chat/completions"
+    assert request["body"]["messages"][1] == {"role": "user", "content": "user: Hi, I'm Ada Lovelace"}
+
+
+@pytest.mark.asyncio
+async def test_summary_batch_submitted_when_full(agent, monkeypatch):
+    """Test a full queue is submitted as one 24h batch"""
+    monkeypatch.setattr("voice_agent.SUMMARY_BATCH_SIZE", 2)
+    files, batches = _with_batch_api(agent)
+    for call_sid in ("CA1", "CA2"):
+        await _with_history(agent, call_sid)
+        await agent.generate_conversation_summary(call_sid)
+    agent._summary_worker.cancel()
+
+    assert agent._summary_queue == []
+    assert agent._summary_batches == {"batch-1"}
+    [upload] = files.uploads
+    assert upload["purpose"] == "batch"
+    assert [json.loads(line)["custom_id"] for line in upload["file"][1].splitlines()] == ["CA1", "CA2"]
+    assert batches.created == [{
+        "input_file_id": "file-1",
+        "endpoint": "/v1/chat/completions",
+        "completion_window": "24h",
+    }]
+
+
+@pytest.mark.asyncio
+async def test_summary_batch_requeued_on_failure(agent):
+    """Test requests stay queued when a batch cannot be submitted"""
+    await _with_history(agent, "CA1")
+    _with_batch_api(agent, batches=FakeBatches(error=RuntimeError("rate limited")))
+    await agent.generate_conversation_summary("CA1")
+    agent._summary_worker.cancel()
+
+    assert await agent.submit_summary_batch() is None
+    assert [request["custom_id"] for request in agent._summary_queue] == ["CA1"]
+    assert agent._summary_batches == set()
+
+
+@pytest.mark.asyncio
+async def test_collect_summary_batches(state_agent):
+    """Test completed batches store each call's summary and notify on_summary"""
+    agent = state_agent
+    output = "\n".join([
+        _batch_output("CA1", json.dumps({"summary": "Interested", "sentiment": "positive", "score": 80})),
+        _batch_output("CA2", '{"summary": "Cut o'),
+    ])
+    _with_batch_api(
+        agent,
+        files=FakeFiles({"file-out": output}),
+        batches=FakeBatches({"batch-1": ("completed", "file-out"), "batch-2": ("in_progress", None)}),
+    )
+    agent._summary_batches = {"batch-1", "batch-2"}
+    notified = []
+
+    async def on_summary(call_sid, summary):
+        notified.append(call_sid)
+
+    agent.on_summary = on_summary
+
+    assert await agent.collect_summary_batches() == 2
+
+    assert agent._summary_batches == {"batch-2"}
+    assert (await agent.get_conversation_summary("CA1"))["score"] == 80
+    assert (await agent.get_conversation_summary("CA2"))["summary"] == "Error generating summary"
+    assert await agent.get_conversation_summary("CA3") is None
+    assert sorted(notified) == ["CA1", "CA2"]
+
+
+@pytest.mark.asyncio
+async def test_failed_summary_batch_dropped(agent):
+    """Test failed batches are dropped instead of polled forever"""
+    _with_batch_api(agent, batches=FakeBatches({"batch-1": ("expired", None)}))
+    agent._summary_batches = {"batch-1"}
+
+    assert await agent.collect_summary_batches() == 0
+    assert agent._summary_batches == set()
+
+
+@pytest.mark.asyncio
+async def test_summary_worker_submits_and_collects(agent, monkeypatch):
+    """Test the worker submits aged requests, collects the results and then stops"""
+    monkeypatch.setattr("voice_agent.SUMMARY_POLL_INTERVAL", 0)
+    monkeypatch.setattr("voice_agent.SUMMARY_BATCH_INTERVAL", 0)
+    output = _batch_output("CA1", json.dumps({"summary": "Interested", "sentiment": "positive", "score": 80}))
+    _with_batch_api(
+        agent,
+        files=FakeFiles({"file-out": output}),
+        batches=FakeBatches({"batch-1": ("completed", "file-out")}),
+    )
+    await _with_history(agent, "CA1")
+
+    await agent.generate_conversation_summary("CA1")
+    await asyncio.wait_for(agent._summary_worker, timeout=1)
+
+    assert (await agent.get_conversation_summary("CA1"))["summary"] == "Interested"
+    assert agent._summary_queue == [] and agent._summary_batches == set()
@@ -0,0 +1,134 @@
+import asyncio
+
+import orjson
+import pytest
+from websocket_manager import MAX_PENDING_MESSAGES, ConnectionManager
+
+
+class FakeWebSocket:
+    """Stand-in for fastapi.WebSocket recording sent frames and close codes"""
+
+    def __init__(self, blocked=False, error=None):
+        self.accepted = False
+        self.sent = []
+        self.close_codes = []
+        self.error = error
+        # A blocked socket never finishes sending, like a client that stopped reading
+        self.unblocked = asyncio.Event()
+        if not blocked:
+            self.unblocked.set()
+
+    async def accept(self):
+        self.accepted = True
+
+    async def send_text(self, data):
+        await self.unblocked.wait()
+        if self.error:
+            raise self.error
+        self.sent.append(orjson.loads(data))
+
+    async def close(self, code=1000):
+        self.close_codes.append(code)
+
+
+async def _drain():
+    """Let writer and close tasks run until they are waiting again"""
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+async def _connect(manager, client_id, **kwargs):
+    websocket = FakeWebSocket(**kwargs)
+    await manager.connect(websocket, client_id)
+    await _drain()
+    return websocket
+
+
+@pytest.mark.asyncio
+async def test_connect_sends_confirmation():
+    """Test connecting accepts the socket and confirms with the client id"""
+    manager = ConnectionManager()
+
+    websocket = await _connect(manager, "client-1")
+
+    assert websocket.accepted
+    assert websocket.sent[0]["type"] == "connection_established"
+    assert websocket.sent[0]["client_id"] == "client-1"
+    assert manager.get_connected_clients() == 1
+
+
+@pytest.mark.asyncio
+async def test_broadcast_delivered_in_order():
+    """Test each client receives broadcasts in the order they were sent"""
+    manager = ConnectionManager()
+    first = await _connect(manager, "client-1")
+    second = await _connect(manager, "client-2")
+
+    for index in range(10):
+        await manager.broadcast_lead_created({"index": index})
+    await _drain()
+
+    for websocket in (first, second):
+        events = websocket.sent[1:]
+        assert [event["type"] for event in events] == ["lead_created"] * 10
+        assert [event["data"]["index"] for event in events] == list(range(10))
+
+
+@pytest.mark.asyncio
+async def test_slow_consumer_evicted():
+    """Test a client that falls too far behind is closed without delaying others"""
+    manager = ConnectionManager()
+    slow = await _connect(manager, "slow", blocked=True)
+    fast = await _connect(manager, "fast")
+
+    # The slow writer is stuck sending the confirmation, so the queue holds the rest
+    for index in range(MAX_PENDING_MESSAGES):
+        await manager.broadcast({"index": index})
+        await _drain()
+
+    assert manager.get_connected_clients() == 2
+    await manager.broadcast({"index": MAX_PENDING_MESSAGES})
+    await _drain()
+
+    assert slow.close_codes == [1013]
+    assert slow not in manager.connections
+    assert manager.get_connected_clients() == 1
+    assert not manager._closing
+    assert [event["index"] for event in fast.sent[1:]] == list(range(MAX_PENDING_MESSAGES + 1))
+
+
+@pytest.mark.asyncio
+async def test_disconnect_cancels_writer():
+    """Test disconnecting removes the client and stops its writer task"""
+    manager = ConnectionManager()
+    websocket = await _connect(manager, "client-1")
+    writer = manager.connections[websocket].writer
+
+    manager.disconnect(websocket)
+    await _drain()
+
+    assert writer.cancelled()
+    assert manager.get_connected_clients() == 0
+
+    # Messages for a removed client are dropped rather than queued
+    await manager.send_personal_message({"type": "late"}, websocket)
+    await manager.broadcast({"type": "late"})
+    await _drain()
+    assert [event["type"] for event in websocket.sent] == ["connection_established"]
+
+    # Disconnecting twice is harmless
+    manager.disconnect(websocket)
+
+
+@pytest.mark.asyncio
+async def test_send_error_disconnects_client():
+    """Test a failed send removes the client and ends its writer"""
+    manager = ConnectionManager()
+    websocket = FakeWebSocket(error=RuntimeError("connection reset"))
+    await manager.connect(websocket, "client-1")
+    writer = manager.connections[websocket].writer
+    await _drain()
+
+    assert writer.done() and not writer.cancelled()
+    assert websocket not in manager.connections
+    assert manager.get_connected_clients() == 0
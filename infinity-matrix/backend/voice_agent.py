@@ -1,17 +1,91 @@
 """AI Voice Agent Integration using OpenAI and Twilio"""
 
+import asyncio
 import json
 import os
+import time
+from collections import deque
+from collections.abc import Awaitable, Callable
 from datetime import datetime
-from typing import Any, dict
+from typing import Any
 
 import openai
+import redis.asyncio as redis
 from dotenv import load_dotenv
+from redis import Redis as SyncRedis
 from twilio.rest import Client
 from twilio.twiml.voice_response import Gather, VoiceResponse
 
 load_dotenv()
 
+# Lead fields the agent collects during a call
+LEAD_INFO_FIELDS = (
+    "name",
+    "company",
+    "role",
+    "needs",
+    "interest_level",
+    "preferred_callback_time",
+    "email",
+)
+
+# Prompts are fixed module-level messages placed before anything call
+# specific, so every request starts with an identical prefix that the
+# provider's prompt cache can match
+SYSTEM_MESSAGE = {
+    "role": "system",
+    "content": (
+        "You are a professional, friendly AI sales assistant conducting a lead "
+        "qualification call. Your goal is to:\n"
+        "1. Get the person's name\n"
+        "2. Understand their company and role\n"
+        "3. Learn about their needs and pain points\n"
+        "4. Assess their interest level\n"
+        "5. Schedule a callback with a human sales representative\n\n"
+        "Be conversational, empathetic, and professional. Keep responses concise "
+        "(2-3 sentences). Extract key information naturally without being pushy.\n\n"
+        "Respond with a JSON object with two fields:\n"
+        "- reply: what you say next to the caller\n"
+        "- lead_info: an object with name (full name), company, role (job title), "
+        "needs (expressed needs or pain points), interest_level (low/medium/high "
+        "based on engagement), preferred_callback_time and email, using null for "
+        "anything not learned yet"
+    )
+}
+
+SUMMARY_SYSTEM_MESSAGE = {
+    "role": "system",
+    "content": (
+        "Analyze the sales call conversation you are given and provide:\n"
+        "1. A concise summary (2-3 sentences)\n"
+        "2. Sentiment (positive/neutral/negative)\n"
+        "3. Lead quality score (0-100)\n"
+        "4. Key takeaways\n\n"
+        "Return as JSON with fields: summary, sentiment, score, takeaways (array)"
+    )
+}
+
+# Said when a completion has no usable reply (e.g. JSON cut off at max_tokens),
+# keeping the call going instead of ending it
+FALLBACK_REPLY = "Sorry, I didn't quite catch that. Could you say that again?"
+
+# Messages kept per call besides the system prompt (10 caller/agent
+# exchanges), so the prompt stops growing on long calls
+MAX_HISTORY_MESSAGES = 20
+
+# Seconds call state is kept in Redis after its last update
+CALL_STATE_TTL = 3600
+
+# Post-call summaries go through the OpenAI Batch API at half the price.
+# Queued requests are submitted together once SUMMARY_BATCH_SIZE are waiting or
+# the oldest has waited SUMMARY_BATCH_INTERVAL seconds, and submitted batches
+# (which complete within 24 hours) are polled every SUMMARY_POLL_INTERVAL seconds
+SUMMARY_BATCH_SIZE = 100
+SUMMARY_BATCH_INTERVAL = 300
+SUMMARY_POLL_INTERVAL = 60
+# Seconds a finished summary is kept in Redis
+SUMMARY_TTL = 7 * 24 * 3600
+
 
 class VoiceAgent:
     """AI-powered voice agent for lead qualification calls"""
@@ -26,7 +100,7 @@ class VoiceAgent:
         self.openai_client = None
         if openai_key:
             try:
-                self.openai_client = openai.OpenAI(api_key=openai_key)
+                self.openai_client = openai.AsyncOpenAI(api_key=openai_key)
             except Exception as e:
                 print(f"Warning: Failed to initialize OpenAI client: {e}")
 
@@ -39,7 +113,36 @@ class VoiceAgent:
                 print(f"Warning: Failed to initialize Twilio client: {e}")
 
         self.twilio_phone = os.getenv("TWILIO_PHONE_NUMBER")
-        self.conversation_history: dict[str, list] = {}
+        # Voice turns need a low time to first token; the same model handles
+        # extraction and summaries
+        self.model = os.getenv("AI_VOICE_MODEL", "gpt-4o-mini")
+        self.temperature = float(os.getenv("AI_VOICE_TEMPERATURE", "0.7"))
+
+        # Per-call state lives in Redis when REDIS_URL is set, so any worker
+        # can serve any turn of a call; otherwise it is kept in this process
+        self.redis = None
+        # Blocking client for cleanup_conversation, created on first use
+        self._sync_redis = None
+        self.redis_url = os.getenv("REDIS_URL")
+        if self.redis_url:
+            try:
+                self.redis = redis.from_url(self.redis_url, decode_responses=True)
+            except Exception as e:
+                print(f"Warning: Failed to initialize Redis client: {e}")
+        self.conversation_history: dict[str, deque] = {}
+        # Lead fields extracted so far, per call
+        self.extracted_info: dict[str, dict[str, Any]] = {}
+
+        # Batch API summary requests not yet submitted, and submitted batch IDs
+        self._summary_queue: list[dict[str, Any]] = []
+        self._summary_queued_at = 0.0
+        self._summary_batches: set[str] = set()
+        self._summary_worker: asyncio.Task | None = None
+        # Finished summaries by call SID, when Redis is not configured
+        self.summaries: dict[str, dict[str, Any]] = {}
+        # Awaited with (call_sid, summary) as each summary arrives, e.g. to
+        # store it on the lead
+        self.on_summary: Callable[[str, dict[str, Any]], Awaitable[None]] | None = None
 
     async def initiate_call(self, phone_number: str, callback_url: str) -> dict[str, Any]:
         """Initiate an outbound call to a lead"""
@@ -50,7 +153,9 @@ class VoiceAgent:
             raise Exception("Twilio phone number not configured. Please set TWILIO_PHONE_NUMBER environment variable.")
 
         try:
-            call = self.twilio_client.calls.create(
+            # The Twilio client is synchronous; run it off the event loop
+            call = await asyncio.to_thread(
+                self.twilio_client.calls.create,
                 to=phone_number,
                 from_=self.twilio_phone,
                 url=callback_url,
@@ -94,31 +199,6 @@ class VoiceAgent:
     ) -> dict[str, Any]:
         """Process speech input and generate AI response"""
 
-        # Initialize conversation history if needed
-        if call_sid not in self.conversation_history:
-            self.conversation_history[call_sid] = [
-                {
-                    "role": "system",
-                    "content": (
-                        "You are a professional, friendly AI sales assistant conducting a lead "
-                        "qualification call. Your goal is to:\n"
-                        "1. Get the person's name\n"
-                        "2. Understand their company and role\n"
-                        "3. Learn about their needs and pain points\n"
-                        "4. Assess their interest level\n"
-                        "5. Schedule a callback with a human sales representative\n\n"
-                        "Be conversational, empathetic, and professional. Keep responses concise "
-                        "(2-3 sentences). Extract key information naturally without being pushy."
-                    )
-                }
-            ]
-
-        # Add user's speech to history
-        self.conversation_history[call_sid].append({
-            "role": "user",
-            "content": speech_result
-        })
-
         # Get AI response
         if not self.openai_client:
             return {
@@ -129,24 +209,34 @@ class VoiceAgent:
             }
 
         try:
-            completion = self.openai_client.chat.completions.create(
-                model=os.getenv("AI_VOICE_MODEL", "gpt-4-turbo-preview"),
-                messages=self.conversation_history[call_sid],
-                temperature=float(os.getenv("AI_VOICE_TEMPERATURE", "0.7")),
-                max_tokens=150
+            # Add user's speech to history
+            history = await self._append_history(call_sid, {
+                "role": "user",
+                "content": speech_result
+            })
+
+            # One completion returns both the reply and the lead fields, so a
+            # turn costs a single round trip
+            completion = await self.openai_client.chat.completions.create(
+                model=self.model,
+                messages=[SYSTEM_MESSAGE, *history],
+                temperature=self.temperature,
+                max_tokens=300,
+                response_format={"type": "json_object"}
             )
 
-            ai_response = completion.choices[0].message.content
+            result = self._parse_turn(completion.choices[0].message.content)
+            ai_response = result.get("reply")
+            if not isinstance(ai_response, str) or not ai_response.strip():
+                ai_response = FALLBACK_REPLY
+            extracted_info = await self._merge_extracted_info(call_sid, result.get("lead_info"))
 
             # Add AI response to history
-            self.conversation_history[call_sid].append({
+            await self._append_history(call_sid, {
                 "role": "assistant",
                 "content": ai_response
             })
 
-            # Extract structured information from conversation
-            extracted_info = await self._extract_information(call_sid)
-
             return {
                 "response": ai_response,
                 "extracted_info": extracted_info,
@@ -160,6 +250,15 @@ class VoiceAgent:
                 "conversation_complete": True
             }
 
+    @staticmethod
+    def _parse_turn(content: str | None) -> dict[str, Any]:
+        """Parse a JSON-mode completion, empty if it is missing, truncated or not an object"""
+        try:
+            result = json.loads(content)
+        except (json.JSONDecodeError, TypeError):
+            return {}
+        return result if isinstance(result, dict) else {}
+
     def generate_response_twiml(self, ai_response: str, is_complete: bool = False) -> str:
         """Generate TwiML for AI response"""
         response = VoiceResponse()
@@ -184,45 +283,51 @@ class VoiceAgent:
 
         return str(response)
 
-    async def _extract_information(self, call_sid: str) -> dict[str, Any]:
-        """Extract structured information from conversation using AI"""
-
-        if not self.openai_client:
-            return {}
-
-        conversation_text = "\n".join([
-            f"{msg['role']}: {msg['content']}"
-            for msg in self.conversation_history[call_sid]
-            if msg['role'] != 'system'
-        ])
-
-        extraction_prompt = f"""
-        From the following conversation, extract and return a JSON object with these fields:
-        - name: person's full name
-        - company: company name
-        - role: job title/role
-        - needs: their expressed needs or pain points
-        - interest_level: low/medium/high based on engagement
-        - preferred_callback_time: any mentioned preferred time
-        - email: email address if provided
-
-        Conversation:
-        {conversation_text}
-
-        Return only valid JSON, use null for missing fields.
-        """
-
-        try:
-            completion = self.openai_client.chat.completions.create(
-                model="gpt-4-turbo-preview",
-                messages=[{"role": "user", "content": extraction_prompt}],
-                response_format={"type": "json_object"}
-            )
-
-            extracted = json.loads(completion.choices[0].message.content)
-            return extracted
-        except Exception:
-            return {}
+    async def _append_history(self, call_sid: str, message: dict[str, str]) -> list[dict[str, str]]:
+        """Append a message to the call's bounded history and return the history"""
+        if not self.redis:
+            # Start a bounded history for a new call; older turns fall off the front
+            history = self.conversation_history.setdefault(call_sid, deque(maxlen=MAX_HISTORY_MESSAGES))
+            history.append(message)
+            return list(history)
+
+        key = f"voice:{call_sid}:msgs"
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.rpush(key, json.dumps(message))
+            pipe.ltrim(key, -MAX_HISTORY_MESSAGES, -1)
+            pipe.expire(key, CALL_STATE_TTL)
+            pipe.lrange(key, 0, -1)
+            *_, messages = await pipe.execute()
+        return [json.loads(msg) for msg in messages]
+
+    async def _get_history(self, call_sid: str) -> list[dict[str, str]]:
+        """Get the call's history, empty for an unknown call"""
+        if not self.redis:
+            return list(self.conversation_history.get(call_sid, ()))
+        messages = await self.redis.lrange(f"voice:{call_sid}:msgs", 0, -1)
+        return [json.loads(msg) for msg in messages]
+
+    async def _merge_extracted_info(self, call_sid: str, lead_info: Any) -> dict[str, Any]:
+        """Merge newly extracted lead fields into what is known about the call"""
+        updates = {}
+        if isinstance(lead_info, dict):
+            updates = {field: lead_info[field] for field in LEAD_INFO_FIELDS if lead_info.get(field)}
+
+        if not self.redis:
+            extracted = self.extracted_info.setdefault(call_sid, dict.fromkeys(LEAD_INFO_FIELDS))
+            extracted.update(updates)
+            return dict(extracted)
+
+        key = f"voice:{call_sid}:extracted"
+        async with self.redis.pipeline(transaction=True) as pipe:
+            if updates:
+                pipe.hset(key, mapping={field: json.dumps(value) for field, value in updates.items()})
+            pipe.expire(key, CALL_STATE_TTL)
+            pipe.hgetall(key)
+            *_, stored = await pipe.execute()
+        extracted = dict.fromkeys(LEAD_INFO_FIELDS)
+        extracted.update((field, json.loads(value)) for field, value in stored.items())
+        return extracted
 
     def _is_conversation_complete(self, extracted_info: dict[str, Any]) -> bool:
         """Determine if enough information has been collected"""
@@ -230,9 +335,16 @@ class VoiceAgent:
         return all(extracted_info.get(field) for field in required_fields)
 
     async def generate_conversation_summary(self, call_sid: str) -> dict[str, Any]:
-        """Generate a summary and sentiment analysis of the conversation"""
+        """Queue a summary and sentiment analysis of the conversation
 
-        if call_sid not in self.conversation_history:
+        Nobody waits on post-call summaries, so they are generated through
+        the Batch API. The transcript is captured now, so the call can be
+        cleaned up right away. When the batch completes the summary is
+        stored for get_conversation_summary and passed to on_summary.
+        """
+
+        history = await self._get_history(call_sid)
+        if not history:
             return {
                 "summary": "No conversation data available",
                 "sentiment": "neutral",
@@ -248,42 +360,128 @@ class VoiceAgent:
 
         conversation_text = "\n".join([
             f"{msg['role']}: {msg['content']}"
-            for msg in self.conversation_history[call_sid]
-            if msg['role'] != 'system'
+            for msg in history
         ])
 
-        summary_prompt = f"""
-        Analyze this sales call conversation and provide:
-        1. A concise summary (2-3 sentences)
-        2. Sentiment (positive/neutral/negative)
-        3. Lead quality score (0-100)
-        4. Key takeaways
-
-        Conversation:
-        {conversation_text}
-
-        Return as JSON with fields: summary, sentiment, score, takeaways (array)
-        """
+        if not self._summary_queue:
+            self._summary_queued_at = time.monotonic()
+        self._summary_queue.append({
+            "custom_id": call_sid,
+            "method": "POST",
+            "url": "/v1/chat/completions",
+            "body": {
+                "model": self.model,
+                "messages": [SUMMARY_SYSTEM_MESSAGE, {"role": "user", "content": conversation_text}],
+                "response_format": {"type": "json_object"}
+            }
+        })
+        if len(self._summary_queue) >= SUMMARY_BATCH_SIZE:
+            await self.submit_summary_batch()
+        self._start_summary_worker()
+
+        return {
+            "summary": "Summary pending",
+            "sentiment": "neutral",
+            "score": 50,
+            "pending": True
+        }
+
+    async def get_conversation_summary(self, call_sid: str) -> dict[str, Any] | None:
+        """Get the call's summary, or None until its batch completes"""
+        if not self.redis:
+            return self.summaries.get(call_sid)
+        summary = await self.redis.get(f"voice:{call_sid}:summary")
+        return json.loads(summary) if summary else None
+
+    async def submit_summary_batch(self) -> str | None:
+        """Submit the queued summary requests as one batch and return its ID"""
+        if not self._summary_queue or not self.openai_client:
+            return None
 
+        requests, self._summary_queue = self._summary_queue, []
         try:
-            completion = self.openai_client.chat.completions.create(
-                model="gpt-4-turbo-preview",
-                messages=[{"role": "user", "content": summary_prompt}],
-                response_format={"type": "json_object"}
+            batch_file = await self.openai_client.files.create(
+                file=("summaries.jsonl", "\n".join(json.dumps(request) for request in requests).encode()),
+                purpose="batch"
+            )
+            batch = await self.openai_client.batches.create(
+                input_file_id=batch_file.id,
+                endpoint="/v1/chat/completions",
+                completion_window="24h"
             )
-
-            result = json.loads(completion.choices[0].message.content)
-            return result
         except Exception as e:
-            return {
-                "summary": "Error generating summary",
-                "sentiment": "neutral",
-                "score": 50,
-                "error": str(e)
-            }
+            print(f"Warning: Failed to submit summary batch: {e}")
+            # Retried with the next submission
+            self._summary_queue[:0] = requests
+            return None
+
+        self._summary_batches.add(batch.id)
+        return batch.id
+
+    async def collect_summary_batches(self) -> int:
+        """Store the summaries of every completed batch and return how many were stored"""
+        stored = 0
+        for batch_id in list(self._summary_batches):
+            try:
+                batch = await self.openai_client.batches.retrieve(batch_id)
+                if batch.status in ("failed", "expired", "cancelled"):
+                    print(f"Warning: Summary batch {batch_id} {batch.status}")
+                    self._summary_batches.discard(batch_id)
+                    continue
+                if batch.status != "completed":
+                    continue
+                output = None
+                if batch.output_file_id:
+                    output = await self.openai_client.files.content(batch.output_file_id)
+            except Exception as e:
+                print(f"Warning: Failed to collect summary batch {batch_id}: {e}")
+                continue
+
+            self._summary_batches.discard(batch_id)
+            for line in output.text.splitlines() if output else ():
+                result = json.loads(line)
+                try:
+                    content = result["response"]["body"]["choices"][0]["message"]["content"]
+                    summary = json.loads(content)
+                except (KeyError, IndexError, TypeError, ValueError):
+                    summary = {
+                        "summary": "Error generating summary",
+                        "sentiment": "neutral",
+                        "score": 50
+                    }
+                await self._store_summary(result["custom_id"], summary)
+                stored += 1
+        return stored
+
+    async def _store_summary(self, call_sid: str, summary: dict[str, Any]):
+        if self.redis:
+            await self.redis.set(f"voice:{call_sid}:summary", json.dumps(summary), ex=SUMMARY_TTL)
+        else:
+            self.summaries[call_sid] = summary
+        if self.on_summary:
+            try:
+                await self.on_summary(call_sid, summary)
+            except Exception as e:
+                print(f"Warning: Failed to handle summary for call {call_sid}: {e}")
+
+    def _start_summary_worker(self):
+        if self._summary_worker is None or self._summary_worker.done():
+            self._summary_worker = asyncio.create_task(self._run_summary_worker())
+
+    async def _run_summary_worker(self):
+        """Submit queued summaries and collect completed batches until none are outstanding"""
+        while self._summary_queue or self._summary_batches:
+            await asyncio.sleep(SUMMARY_POLL_INTERVAL)
+            if self._summary_queue and time.monotonic() - self._summary_queued_at >= SUMMARY_BATCH_INTERVAL:
+                await self.submit_summary_batch()
+            await self.collect_summary_batches()
 
     def get_call_recording_url(self, call_sid: str) -> str | None:
-        """Get the URL of the call recording"""
+        """Get the URL of the call recording
+
+        Blocks on the Twilio REST API; from async code use
+        get_call_recording_url_async instead.
+        """
         if not self.twilio_client:
             return None
         try:
@@ -295,10 +493,29 @@ class VoiceAgent:
         except Exception:
             return None
 
+    async def get_call_recording_url_async(self, call_sid: str) -> str | None:
+        """Get the URL of the call recording without blocking the event loop"""
+        return await asyncio.to_thread(self.get_call_recording_url, call_sid)
+
     def cleanup_conversation(self, call_sid: str):
-        """Clean up conversation history after call completion"""
-        if call_sid in self.conversation_history:
-            del self.conversation_history[call_sid]
+        """Clean up conversation history after call completion
+
+        Blocks on Redis when it holds call state; from async code use
+        cleanup_conversation_async instead.
+        """
+        if self.redis:
+            if self._sync_redis is None:
+                self._sync_redis = SyncRedis.from_url(self.redis_url, decode_responses=True)
+            self._sync_redis.delete(f"voice:{call_sid}:msgs", f"voice:{call_sid}:extracted")
+        self.conversation_history.pop(call_sid, None)
+        self.extracted_info.pop(call_sid, None)
+
+    async def cleanup_conversation_async(self, call_sid: str):
+        """Clean up conversation history after call completion without blocking the event loop"""
+        if self.redis:
+            await self.redis.delete(f"voice:{call_sid}:msgs", f"voice:{call_sid}:extracted")
+        self.conversation_history.pop(call_sid, None)
+        self.extracted_info.pop(call_sid, None)
 
 
 # Global instance
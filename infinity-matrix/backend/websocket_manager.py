@@ -1,30 +1,47 @@
 """WebSocket manager for real-time updates"""
 
-from datetime import datetime
-from typing import dict, list
+import asyncio
+from datetime import UTC, datetime
 
+import orjson
 from fastapi import WebSocket
 
+# Messages that may wait for a slow client before it is disconnected
+MAX_PENDING_MESSAGES = 100
+
+
+class ClientConnection:
+    """A connected client and the queue its writer task sends from"""
+
+    __slots__ = ("client_id", "queue", "writer")
+
+    def __init__(self, client_id: str | None):
+        self.client_id = client_id
+        self.queue: asyncio.Queue[str] = asyncio.Queue(maxsize=MAX_PENDING_MESSAGES)
+        self.writer: asyncio.Task | None = None
+
 
 class ConnectionManager:
     """Manages WebSocket connections and broadcasts"""
 
     def __init__(self):
-        self.active_connections: list[WebSocket] = []
-        self.connection_ids: dict[WebSocket, str] = {}
+        # Connected sockets and their client state
+        self.connections: dict[WebSocket, ClientConnection] = {}
+        # Keeps close tasks for evicted clients referenced until they finish
+        self._closing: set[asyncio.Task] = set()
 
     async def connect(self, websocket: WebSocket, client_id: str = None):
         """Accept and register a new WebSocket connection"""
         await websocket.accept()
-        self.active_connections.append(websocket)
-        if client_id:
-            self.connection_ids[websocket] = client_id
+        connection = ClientConnection(client_id)
+        connection.writer = asyncio.create_task(self._writer(websocket, connection.queue))
+        self.connections[websocket] = connection
 
         # Send connection confirmation
         await self.send_personal_message(
             {
                 "type": "connection_established",
-                "timestamp": datetime.utcnow().isoformat(),
+                "timestamp": datetime.now(UTC).isoformat(),
                 "client_id": client_id
             },
             websocket
@@ -32,84 +49,87 @@ class ConnectionManager:
 
     def disconnect(self, websocket: WebSocket):
         """Remove a WebSocket connection"""
-        if websocket in self.active_connections:
-            self.active_connections.remove(websocket)
-        if websocket in self.connection_ids:
-            del self.connection_ids[websocket]
+        connection = self.connections.pop(websocket, None)
+        if connection and connection.writer is not asyncio.current_task():
+            connection.writer.cancel()
 
-    async def send_personal_message(self, message: dict, websocket: WebSocket):
-        """Send a message to a specific client"""
+    async def _writer(self, websocket: WebSocket, queue: asyncio.Queue):
+        """Send queued messages to one client, so a slow client only delays itself"""
         try:
-            await websocket.send_json(message)
+            while True:
+                await websocket.send_text(await queue.get())
         except Exception as e:
             print(f"Error sending message: {e}")
             self.disconnect(websocket)
 
+    def _enqueue(self, websocket: WebSocket, payload: str):
+        """Queue a payload for a client, disconnecting it if it has fallen too far behind"""
+        connection = self.connections.get(websocket)
+        if not connection:
+            return
+        try:
+            connection.queue.put_nowait(payload)
+        except asyncio.QueueFull:
+            print(f"Client {connection.client_id} is not keeping up, disconnecting")
+            self.disconnect(websocket)
+            task = asyncio.create_task(self._close(websocket))
+            self._closing.add(task)
+            task.add_done_callback(self._closing.discard)
+
+    async def _close(self, websocket: WebSocket):
+        try:
+            # 1013: try again later
+            await websocket.close(code=1013)
+        except Exception:
+            pass
+
+    async def send_personal_message(self, message: dict, websocket: WebSocket):
+        """Send a message to a specific client"""
+        self._enqueue(websocket, orjson.dumps(message).decode())
+
     async def broadcast(self, message: dict):
         """Broadcast a message to all connected clients"""
-        disconnected = []
-        for connection in self.active_connections:
-            try:
-                await connection.send_json(message)
-            except Exception as e:
-                print(f"Error broadcasting to client: {e}")
-                disconnected.append(connection)
-
-        # Clean up disconnected clients
-        for connection in disconnected:
-            self.disconnect(connection)
+        # Serialize once for all clients, sent as a text frame so browsers
+        # still receive a string
+        payload = orjson.dumps(message).decode()
+        for websocket in list(self.connections):
+            self._enqueue(websocket, payload)
+
+    async def _emit(self, event_type: str, data: dict):
+        """Broadcast an event with the standard type/data/timestamp envelope"""
+        await self.broadcast({
+            "type": event_type,
+            "data": data,
+            "timestamp": datetime.now(UTC).isoformat()
+        })
 
     async def broadcast_lead_created(self, lead_data: dict):
         """Broadcast new lead creation event"""
-        await self.broadcast({
-            "type": "lead_created",
-            "data": lead_data,
-            "timestamp": datetime.utcnow().isoformat()
-        })
+        await self._emit("lead_created", lead_data)
 
     async def broadcast_call_started(self, call_data: dict):
         """Broadcast call initiation event"""
-        await self.broadcast({
-            "type": "call_started",
-            "data": call_data,
-            "timestamp": datetime.utcnow().isoformat()
-        })
+        await self._emit("call_started", call_data)
 
     async def broadcast_call_updated(self, call_data: dict):
         """Broadcast call status update"""
-        await self.broadcast({
-            "type": "call_updated",
-            "data": call_data,
-            "timestamp": datetime.utcnow().isoformat()
-        })
+        await self._emit("call_updated", call_data)
 
     async def broadcast_data_enriched(self, enrichment_data: dict):
         """Broadcast data enrichment completion"""
-        await self.broadcast({
-            "type": "data_enriched",
-            "data": enrichment_data,
-            "timestamp": datetime.utcnow().isoformat()
-        })
+        await self._emit("data_enriched", enrichment_data)
 
     async def broadcast_calendar_updated(self, calendar_data: dict):
         """Broadcast calendar event update"""
-        await self.broadcast({
-            "type": "calendar_updated",
-            "data": calendar_data,
-            "timestamp": datetime.utcnow().isoformat()
-        })
+        await self._emit("calendar_updated", calendar_data)
 
     async def broadcast_crm_updated(self, crm_data: dict):
         """Broadcast CRM update event"""
-        await self.broadcast({
-            "type": "crm_updated",
-            "data": crm_data,
-            "timestamp": datetime.utcnow().isoformat()
-        })
+        await self._emit("crm_updated", crm_data)
 
     def get_connected_clients(self) -> int:
         """Return number of connected clients"""
-        return len(self.active_connections)
+        return len(self.connections)
 
 
 # Global connection manager instance
@@ -4,9 +4,10 @@ Command-line interface for the Infinity Matrix system.
 """
 
 import argparse
-import json
 import sys
-from typing import Any, dict, list
+from typing import Any
+
+import orjson
 
 from infinity_matrix import InfinityMatrix, System, create_sample_systems
 
@@ -21,8 +22,8 @@ def load_systems_from_file(filepath: str) -> list[System]:
     Returns:
         list of System objects
     """
-    with open(filepath) as f:
-        config = json.load(f)
+    with open(filepath, 'rb') as f:
+        config = orjson.loads(f.read())
 
     systems = []
     for sys_config in config.get('systems', []):
@@ -45,8 +46,8 @@ def save_result(result: dict[str, Any], filepath: str) -> None:
         result: The merged result dictionary
         filepath: Path to save the JSON file
     """
-    with open(filepath, 'w') as f:
-        json.dump(result, f, indent=2)
+    with open(filepath, 'wb') as f:
+        f.write(orjson.dumps(result, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS))
     print(f"Result saved to: {filepath}")
 
 
@@ -1,6 +1,7 @@
 """
 Infinity-Matrix CLI tool.
 """
+import atexit
 import json
 
 import click
@@ -8,6 +9,17 @@ import httpx
 
 BASE_URL = "http://localhost:8000"
 
+_http_client = None
+
+
+def http_client() -> httpx.Client:
+    """Shared client, so requests in one process reuse pooled connections."""
+    global _http_client
+    if _http_client is None:
+        _http_client = httpx.Client(base_url=BASE_URL)
+        atexit.register(_http_client.close)
+    return _http_client
+
 
 @click.group()
 def cli():
@@ -17,7 +29,7 @@ def cli():
 @cli.command()
 def status():
     """Check system status."""
-    response = httpx.get(f"{BASE_URL}/health")
+    response = http_client().get("/health")
     if response.status_code == 200:
         data = response.json()
         click.echo(f"Status: {data['status']}")
@@ -36,8 +48,8 @@ def security():
 def scan(full):
     """Run security scan."""
     click.echo("Running security scan...")
-    response = httpx.post(
-        f"{BASE_URL}/api/security/scan",
+    response = http_client().post(
+        "/api/security/scan",
         json={"include_containers": full}
     )
 
@@ -60,7 +72,7 @@ def cost():
 def analyze(period):
     """Analyze costs."""
     click.echo(f"Analyzing costs for period: {period}")
-    response = httpx.get(f"{BASE_URL}/api/monitoring/costs/realtime")
+    response = http_client().get("/api/monitoring/costs/realtime")
 
     if response.status_code == 200:
         data = response.json()
@@ -82,8 +94,8 @@ def dr():
 def backup(type):
     """Create backup."""
     click.echo(f"Creating {type} backup...")
-    response = httpx.post(
-        f"{BASE_URL}/api/dr/backup",
+    response = http_client().post(
+        "/api/dr/backup",
         json={"backup_type": type, "description": f"{type} backup via CLI"}
     )
 
@@ -101,8 +113,8 @@ def backup(type):
 def restore(backup_id):
     """Restore from backup."""
     click.echo(f"Restoring from backup: {backup_id}")
-    response = httpx.post(
-        f"{BASE_URL}/api/dr/restore",
+    response = http_client().post(
+        "/api/dr/restore",
         json={"backup_id": backup_id}
     )
 
@@ -124,8 +136,8 @@ def docs():
 def search(query):
     """Search documentation."""
     click.echo(f"Searching for: {query}")
-    response = httpx.get(
-        f"{BASE_URL}/api/docs/search",
+    response = http_client().get(
+        "/api/docs/search",
         params={"query": query}
     )
 
@@ -149,8 +161,8 @@ def feedback():
 def submit(type, message):
     """Submit feedback."""
     click.echo("Submitting feedback...")
-    response = httpx.post(
-        f"{BASE_URL}/api/feedback/submit",
+    response = http_client().post(
+        "/api/feedback/submit",
         json={
             "user_id": "cli-user",
             "type": type,
@@ -175,7 +187,7 @@ def incidents():
 @click.option('--severity', default='medium', help='Incident severity')
 def list(severity):
     """list incidents."""
-    response = httpx.get(f"{BASE_URL}/api/security/incidents")
+    response = http_client().get("/api/security/incidents")
 
     if response.status_code == 200:
         incidents = response.json()
@@ -190,7 +202,7 @@ def list(severity):
 @click.argument('incident_id')
 def get(incident_id):
     """Get incident details."""
-    response = httpx.get(f"{BASE_URL}/api/security/incidents/{incident_id}")
+    response = http_client().get(f"/api/security/incidents/{incident_id}")
 
     if response.status_code == 200:
         inc = response.json()
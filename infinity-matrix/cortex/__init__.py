@@ -4,9 +4,22 @@ Cortex Package
 Central orchestration system for multi-agent operations.
 """
 
-from .agents import VisionCortex
+import importlib
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from .agents import VisionCortex
 
 __version__ = "1.0.0"
 __author__ = "Infinity X One Systems"
 
 __all__ = ["VisionCortex"]
+
+
+def __getattr__(name):
+    # Loaded on first access, like the agents themselves (see cortex.agents)
+    if name == "VisionCortex":
+        value = importlib.import_module(".agents", __name__).VisionCortex
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -5,15 +5,33 @@ Multi-agent system for autonomous operations inspired by Manus.im and
 FAANG-grade distributed systems.
 """
 
-from .ceo_agent import CEOAgent
-from .crawler_agent import CrawlerAgent
-from .documentor_agent import DocumentorAgent
-from .ingestion_agent import IngestionAgent
-from .organizer_agent import OrganizerAgent
-from .predictor_agent import PredictorAgent
-from .strategist_agent import StrategistAgent
-from .validator_agent import ValidatorAgent
-from .vision_cortex import VisionCortex
+import importlib
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from .ceo_agent import CEOAgent
+    from .crawler_agent import CrawlerAgent
+    from .documentor_agent import DocumentorAgent
+    from .ingestion_agent import IngestionAgent
+    from .organizer_agent import OrganizerAgent
+    from .predictor_agent import PredictorAgent
+    from .strategist_agent import StrategistAgent
+    from .validator_agent import ValidatorAgent
+    from .vision_cortex import VisionCortex
+
+# Agents are imported on first access, so importing one does not load
+# every other agent module and its dependencies
+_AGENT_MODULES = {
+    "CEOAgent": ".ceo_agent",
+    "CrawlerAgent": ".crawler_agent",
+    "DocumentorAgent": ".documentor_agent",
+    "IngestionAgent": ".ingestion_agent",
+    "OrganizerAgent": ".organizer_agent",
+    "PredictorAgent": ".predictor_agent",
+    "StrategistAgent": ".strategist_agent",
+    "ValidatorAgent": ".validator_agent",
+    "VisionCortex": ".vision_cortex",
+}
 
 __version__ = "1.0.0"
 __author__ = "Infinity X One Systems"
@@ -29,3 +47,15 @@ __all__ = [
     "ValidatorAgent",
     "DocumentorAgent"
 ]
+
+
+def __getattr__(name):
+    if name in _AGENT_MODULES:
+        value = getattr(importlib.import_module(_AGENT_MODULES[name], __name__), name)
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__():
+    return sorted(list(globals()) + list(_AGENT_MODULES))